@@ -0,0 +1,286 @@
+"""
+Benchmark end-to-end da ingestão MQTT e do pipeline de twinning.
+
+Gera leituras sintéticas para N sistemas x M sensores, injeta-as em MQTTBrokerAdapter/EventDrivenController
+por meio de um broker local substituto e mede:
+  - vazão de ingestão e latência p50/p99 do handler;
+  - duração do tick do pipeline em função do tamanho da frota;
+  - crescimento de memória (RSS) de cada fase.
+
+Por padrão os repositórios são substituídos por implementações em memória. Com --mongodb-uri as leituras e os
+sistemas são gravados em um MongoDB local (banco --mongodb-database, cujas coleções são apagadas ao final).
+
+Uso (a partir da raiz do repositório):
+    python -m benchmarks.end_to_end_benchmark --messages 50000 --fleet-sizes 10,100,1000
+    python -m benchmarks.end_to_end_benchmark --mongodb-uri mongodb://localhost:27017 --ingestion-mode batch
+
+Os resultados são gravados em JSON (--output) para comparação entre commits.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from typing import List, Optional
+
+import numpy
+from bson import ObjectId
+
+BENCHMARK_ENV_DEFAULTS = {
+    "MONGODB_CONNECTION_STRING": "mongodb://localhost:27017",
+    "MONGODB_DATABASE_NAME": "waterwise_benchmark",
+    "MONGODB_SENSOR_READINGS_COLLECTION": "sensor_readings",
+    "MONGODB_WATER_SYSTEMS_COLLECTION": "water_systems",
+    "MQTT_BROKER_URL": "localhost",
+    "MQTT_BROKER_PORT": "1883",
+    "MQTT_BROKER_CLIENT_ID": "waterwise-benchmark",
+    "LOG_LEVEL": "WARNING",
+}
+
+# Definidas antes de importar src: alguns módulos criam loggers (e leem LOG_LEVEL) na importação
+for _key, _value in BENCHMARK_ENV_DEFAULTS.items():
+    os.environ.setdefault(_key, _value)
+
+from benchmarks.local_stand_ins import LocalBrokerStandIn, InMemorySensorReadingRepository, \
+    InMemoryWaterSystemRepository
+from benchmarks.synthetic_sensor_load import SyntheticSensorLoad
+
+
+def current_rss_bytes() -> int:
+    """RSS atual do processo (Linux); nos demais sistemas, o pico reportado por getrusage."""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def percentiles(samples: List[float]) -> dict:
+    if not samples:
+        return {"p50": None, "p99": None, "max": None}
+    values = numpy.asarray(samples)
+    return {
+        "p50": float(numpy.percentile(values, 50)),
+        "p99": float(numpy.percentile(values, 99)),
+        "max": float(values.max()),
+    }
+
+
+async def drop_benchmark_collections(mongodb_adapter):
+    database = mongodb_adapter.get_database()
+    for entry in ("MONGODB_SENSOR_READINGS_COLLECTION", "MONGODB_WATER_SYSTEMS_COLLECTION"):
+        await database.drop_collection(os.environ[entry])
+
+
+async def run_ingestion(args, mongodb_adapter) -> dict:
+    from src.controllers.event_driven_controller import EventDrivenController
+
+    edc = EventDrivenController(mongodb_adapter=mongodb_adapter)
+    in_memory_repository = None
+    if mongodb_adapter is None:
+        in_memory_repository = InMemorySensorReadingRepository()
+        edc.event_service.sensor_reading_repository = in_memory_repository
+        if edc.event_service.sensor_reading_spill_service is not None:
+            # Com o spill, o buffer já grava pelo caminho de documentos do EventService, que usa o repositório acima
+            edc.event_service.sensor_reading_spill_service.sensor_reading_repository = in_memory_repository
+        elif edc.event_service.sensor_reading_buffer is not None:
+            edc.event_service.sensor_reading_buffer.flush_handler = in_memory_repository.insert_sensor_readings
+
+    handler_latencies = []
+
+    async def timed_handler(topic: str, payload: bytes):
+        started_at = time.perf_counter()
+        try:
+            await edc._handler(topic, payload)
+        finally:
+            handler_latencies.append(time.perf_counter() - started_at)
+
+    loop = asyncio.get_running_loop()
+    edc.mqtt_broker.register_handler("waterwise/+", timed_handler)
+    edc.mqtt_broker.set_event_loop(loop)
+    edc.mqtt_broker.dispatch_queue.start(loop)
+
+    load = SyntheticSensorLoad(args.water_systems, args.sensors)
+    broker = LocalBrokerStandIn(edc.mqtt_broker, load, args.rate)
+
+    rss_before = current_rss_bytes()
+    started_at = time.perf_counter()
+    broker.start(args.messages)
+    await loop.run_in_executor(None, broker.join)
+    edc.mqtt_broker.dispatch_queue.close()
+    await edc.mqtt_broker.drain()
+    await edc.event_service.stop()
+    elapsed = time.perf_counter() - started_at
+    rss_after = current_rss_bytes()
+
+    if in_memory_repository is not None:
+        stored = in_memory_repository.inserted
+    else:
+        stored = await edc.event_service.sensor_reading_repository.collection.count_documents({})
+
+    return {
+        "messages": args.messages,
+        "stored_readings": stored,
+        "dispatch": edc.mqtt_broker.get_dispatch_stats(),
+        "elapsed_seconds": elapsed,
+        "publish_seconds": broker.publish_seconds,
+        "throughput_messages_per_second": stored / elapsed if elapsed > 0 else None,
+        "handler_latency_seconds": percentiles(handler_latencies),
+        "rss_before_bytes": rss_before,
+        "rss_after_bytes": rss_after,
+        "rss_growth_bytes": rss_after - rss_before,
+    }
+
+
+async def seed_mongodb(mongodb_adapter, load: SyntheticSensorLoad, readings) -> tuple:
+    from src.domain.repositories.sensor_reading_repository import SensorReadingRepository
+    from src.domain.repositories.water_system_repository import WaterSystemRepository
+
+    await drop_benchmark_collections(mongodb_adapter)
+    sensor_reading_repository = SensorReadingRepository(mongodb_adapter)
+    water_system_repository = WaterSystemRepository(mongodb_adapter)
+    await sensor_reading_repository.ensure_indexes()
+    await water_system_repository.ensure_indexes()
+
+    documents = []
+    for water_system in load.water_systems():
+        document = water_system.model_dump(exclude={"id"})
+        document["_id"] = ObjectId(water_system.id)
+        documents.append(document)
+    await water_system_repository.collection.insert_many(documents)
+    for start in range(0, len(readings), 10000):
+        await sensor_reading_repository.insert_sensor_readings(readings[start:start + 10000])
+    return sensor_reading_repository, water_system_repository
+
+
+async def run_pipeline_ticks(args, mongodb_adapter) -> List[dict]:
+    from src.application.services.processing_pipeline.processing_pipeline_service import ProcessingPipelineService
+
+    results = []
+    for fleet_size in args.fleet_sizes:
+        load = SyntheticSensorLoad(fleet_size, args.sensors, seed=fleet_size)
+        readings = load.window_readings(datetime.now(timezone.utc), 60, args.readings_per_sensor)
+
+        rss_before = current_rss_bytes()
+        pipeline = ProcessingPipelineService(mongodb_adapter=mongodb_adapter)
+        if mongodb_adapter is None:
+            sensor_reading_repository = InMemorySensorReadingRepository()
+            await sensor_reading_repository.insert_sensor_readings(readings)
+            water_system_repository = InMemoryWaterSystemRepository(load.water_systems())
+        else:
+            sensor_reading_repository, water_system_repository = await seed_mongodb(mongodb_adapter, load, readings)
+        pipeline.sensor_reading_repository = sensor_reading_repository
+        pipeline.water_system_repository = water_system_repository
+        del readings
+
+        tick_durations = []
+        for _ in range(args.ticks):
+            water_systems = await water_system_repository.list_water_systems({"status": "online"})
+            started_at = time.perf_counter()
+            await pipeline.process_water_systems(water_systems)
+            tick_durations.append(time.perf_counter() - started_at)
+        pipeline.stop()
+
+        results.append({
+            "fleet_size": fleet_size,
+            "sensors_per_system": args.sensors,
+            "readings_per_window": fleet_size * args.sensors * args.readings_per_sensor,
+            "window_source": pipeline.window_source.value,
+            "tick_seconds": tick_durations,
+            "tick_seconds_median": statistics.median(tick_durations),
+            "per_system_milliseconds": 1000 * statistics.median(tick_durations) / fleet_size,
+            "rss_growth_bytes": current_rss_bytes() - rss_before,
+        })
+        print(f"fleet {fleet_size:>6}: tick median {results[-1]['tick_seconds_median']:.3f} s")
+    return results
+
+
+async def run(args) -> dict:
+    mongodb_adapter = None
+    if args.mongodb_uri:
+        from src.infrastructure.adapters.mongodb_adapter import MongoDBAdapter
+        mongodb_adapter = MongoDBAdapter()
+        await drop_benchmark_collections(mongodb_adapter)
+
+    try:
+        rss_start = current_rss_bytes()
+        ingestion = await run_ingestion(args, mongodb_adapter)
+        print(f"ingestion: {ingestion['throughput_messages_per_second']:,.0f} msgs/s, handler p50 "
+              f"{ingestion['handler_latency_seconds']['p50'] * 1000:.3f} ms, "
+              f"p99 {ingestion['handler_latency_seconds']['p99'] * 1000:.3f} ms")
+        pipeline = await run_pipeline_ticks(args, mongodb_adapter)
+    finally:
+        if mongodb_adapter is not None:
+            await drop_benchmark_collections(mongodb_adapter)
+            await mongodb_adapter.close()
+
+    return {
+        "metadata": {
+            "commit": git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "storage": "mongodb" if args.mongodb_uri else "in_memory",
+            "arguments": {key: value for key, value in vars(args).items() if key != "mongodb_uri"},
+        },
+        "ingestion": ingestion,
+        "pipeline": pipeline,
+        "memory": {"rss_start_bytes": rss_start, "rss_end_bytes": current_rss_bytes()},
+    }
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=50000, help="Mensagens injetadas na fase de ingestão")
+    parser.add_argument("--water-systems", type=int, default=10, help="Sistemas simulados na fase de ingestão")
+    parser.add_argument("--sensors", type=int, default=5, help="Sensores por sistema")
+    parser.add_argument("--rate", type=float, default=0, help="Mensagens por segundo (0 = sem limite)")
+    parser.add_argument("--ingestion-mode", choices=["single", "batch"], default="single")
+    parser.add_argument("--window-source", choices=["query", "aggregation"], default="query")
+    parser.add_argument("--fleet-sizes", type=lambda value: [int(size) for size in value.split(",")],
+                        default=[10, 100, 1000], help="Tamanhos de frota para o tick do pipeline (ex.: 10,100,1000)")
+    parser.add_argument("--readings-per-sensor", type=int, default=60, help="Leituras por sensor na janela de twinning")
+    parser.add_argument("--ticks", type=int, default=3, help="Ticks medidos por tamanho de frota")
+    parser.add_argument("--mongodb-uri", help="Usa um MongoDB local em vez dos repositórios em memória")
+    parser.add_argument("--mongodb-database", default="waterwise_benchmark")
+    parser.add_argument("--output", help="Arquivo JSON de resultados (padrão: benchmarks/results/<commit>-<data>.json)")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+    os.environ["INGESTION_MODE"] = args.ingestion_mode
+    os.environ["PIPELINE_WINDOW_SOURCE"] = args.window_source
+    if args.mongodb_uri:
+        os.environ["MONGODB_CONNECTION_STRING"] = args.mongodb_uri
+        os.environ["MONGODB_DATABASE_NAME"] = args.mongodb_database
+
+    results = asyncio.run(run(args))
+
+    output = args.output or os.path.join(
+        "benchmarks", "results",
+        f"{results['metadata']['commit'] or 'unknown'}-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    )
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as results_file:
+        json.dump(results, results_file, indent=2)
+    print(f"results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
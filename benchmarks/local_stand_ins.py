@@ -0,0 +1,206 @@
+"""
+Substitutos locais do broker MQTT e dos repositórios MongoDB usados pelo benchmark end-to-end e pelos testes.
+"""
+import copy
+import threading
+import time
+from collections import defaultdict
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Tuple
+
+from bson import ObjectId
+
+from benchmarks.synthetic_sensor_load import SyntheticSensorLoad
+from src.application.services.processing_pipeline.processing_pipeline_service import ProcessingPipelineService
+from src.application.utils.object_util import ObjectUtil
+from src.domain.entities.sensor_window_statistics import SensorWindowStatistics
+from src.domain.entities.water_system import WaterSystem
+from src.domain.events.sensor_reading_event import SensorReadingEvent
+from src.domain.repositories.sensor_reading_repository import SensorReadingsQuery
+from src.infrastructure.adapters.mqtt_broker_adapter import MQTTBrokerAdapter
+
+
+class _StandInMessage:
+    __slots__ = ("topic", "payload")
+
+    def __init__(self, topic: str, payload: bytes):
+        self.topic = topic
+        self.payload = payload
+
+
+class LocalBrokerStandIn:
+    def __init__(self, mqtt_broker: MQTTBrokerAdapter, load: SyntheticSensorLoad, rate_per_second: float = 0):
+        """
+        Publica mensagens sintéticas chamando MQTTBrokerAdapter._on_message a partir de uma thread própria,
+        como faria a thread de rede do paho.
+        :param rate_per_second: Taxa alvo de publicação; 0 publica o mais rápido possível.
+        """
+        self.mqtt_broker = mqtt_broker
+        self.load = load
+        self.rate_per_second = rate_per_second
+        self.published = 0
+        self.publish_seconds = 0.0
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, messages: int):
+        self._thread = threading.Thread(target=self._publish, args=(messages,), name="broker-stand-in", daemon=True)
+        self._thread.start()
+
+    def join(self):
+        if self._thread is not None:
+            self._thread.join()
+
+    def _publish(self, messages: int):
+        started_at = time.perf_counter()
+        for index in range(messages):
+            if self.rate_per_second > 0 and index % 100 == 0:
+                ahead = started_at + index / self.rate_per_second - time.perf_counter()
+                if ahead > 0:
+                    time.sleep(ahead)
+            topic, payload = self.load.next_message()
+            self.mqtt_broker._on_message(None, None, _StandInMessage(topic, payload))
+            self.published += 1
+        self.publish_seconds = time.perf_counter() - started_at
+
+
+class InMemorySensorReadingRepository:
+    """Implementa em memória as operações de SensorReadingRepository usadas pela ingestão e pelo pipeline."""
+
+    def __init__(self):
+        self.readings: Dict[str, List[SensorReadingEvent]] = defaultdict(list)
+        self.inserted = 0
+        self._document_ids: Set[ObjectId] = set()
+
+    async def insert_sensor_reading(self, sensor_reading: SensorReadingEvent) -> str:
+        self.readings[sensor_reading.water_system_id].append(sensor_reading)
+        self.inserted += 1
+        return str(self.inserted)
+
+    async def insert_sensor_readings(self, sensor_readings: List[SensorReadingEvent]) -> List[str]:
+        return [await self.insert_sensor_reading(sensor_reading) for sensor_reading in sensor_readings]
+
+    async def insert_sensor_reading_documents(self, documents: List[dict], deduplicate: bool = False) -> int:
+        # Como a coleção real, ignora os _id já gravados: a reinserção pelo drainer do spill é idempotente
+        inserted = 0
+        for document in documents:
+            if document["_id"] in self._document_ids:
+                continue
+            self._document_ids.add(document["_id"])
+            fields = {key: value for key, value in document.items() if key != "_id"}
+            self.readings[document.get("water_system_id")].append(SensorReadingEvent(**fields, id=str(document["_id"])))
+            inserted += 1
+        self.inserted += inserted
+        return inserted
+
+    async def is_time_series_collection(self) -> bool:
+        return False
+
+    async def find_readings(self, query: SensorReadingsQuery) -> List[SensorReadingEvent]:
+        return [
+            reading for reading in self.readings.get(query.water_system_id, [])
+            if (query.sensor_id is None or reading.sensor_id == query.sensor_id)
+            and (query.start_date is None or reading.create_date >= query.start_date)
+            and (query.end_date is None or reading.create_date <= query.end_date)
+        ]
+
+    async def aggregate_window_statistics(self, query: SensorReadingsQuery) -> Dict[str, SensorWindowStatistics]:
+        sensor_readings = await self.find_readings(query)
+        if not sensor_readings:
+            return {}
+        return ProcessingPipelineService.compute_sensors_statistics(sensor_readings)
+
+
+class InMemoryWaterSystemRepository:
+    """
+    Implementa em memória as operações de WaterSystemRepository usadas pelo pipeline e pela API REST.
+    Como no MongoDB, armazena documentos brutos (chaveados pelo ID) e valida os modelos a cada leitura.
+    """
+
+    def __init__(self, water_systems: Optional[List[WaterSystem]] = None):
+        self.documents: Dict[str, dict] = {}
+        self.bulk_writes = 0
+        for water_system in water_systems or []:
+            self.documents[water_system.id] = ObjectUtil.remove_fields(water_system.model_dump(), ["id"])
+
+    def add(self, **fields) -> str:
+        water_system_id = str(ObjectId())
+        self.documents[water_system_id] = fields
+        return water_system_id
+
+    @staticmethod
+    def _matches(document: dict, filter_query: Optional[dict]) -> bool:
+        return all(document.get(field) == value for field, value in (filter_query or {}).items())
+
+    def _to_water_system(self, water_system_id: str) -> WaterSystem:
+        return WaterSystem.model_validate({**self.documents[water_system_id], "id": water_system_id})
+
+    async def create_water_systems(self, water_systems: List[WaterSystem]) -> Tuple[List[str], Dict[int, str]]:
+        water_system_ids = []
+        for water_system in water_systems:
+            water_system_ids.append(self.add(**ObjectUtil.remove_fields(water_system.model_dump(), ["id"])))
+        return water_system_ids, {}
+
+    async def get_water_system_by_id(self, water_system_id: str) -> Optional[WaterSystem]:
+        return self._to_water_system(water_system_id) if water_system_id in self.documents else None
+
+    async def find_existing_ids(self, water_system_ids: List[str]) -> Set[str]:
+        return {water_system_id for water_system_id in water_system_ids if water_system_id in self.documents}
+
+    async def find_water_system_documents_by_ids(self, water_system_ids: List[str]) -> Dict[str, dict]:
+        return {
+            water_system_id: {**copy.deepcopy(self.documents[water_system_id]), "id": water_system_id}
+            for water_system_id in water_system_ids if water_system_id in self.documents
+        }
+
+    async def bulk_update_water_systems(self, updates: List[Tuple[str, Dict[str, Any]]]) -> Dict[int, str]:
+        self.bulk_writes += 1
+        for water_system_id, fields in updates:
+            self.documents[water_system_id].update(copy.deepcopy(fields))
+        return {}
+
+    async def bulk_delete_water_systems(self, water_system_ids: List[str]) -> Dict[int, str]:
+        self.bulk_writes += 1
+        for water_system_id in water_system_ids:
+            self.documents.pop(water_system_id, None)
+        return {}
+
+    async def list_water_systems(self, filter_query=None) -> List[WaterSystem]:
+        return [
+            self._to_water_system(water_system_id) for water_system_id, document in self.documents.items()
+            if self._matches(document, filter_query)
+        ]
+
+    async def list_water_systems_by_ids(self, water_system_ids: List[str], filter_query=None) -> List[WaterSystem]:
+        return [
+            self._to_water_system(water_system_id) for water_system_id in water_system_ids
+            if water_system_id in self.documents and self._matches(self.documents[water_system_id], filter_query)
+        ]
+
+    async def iterate_water_system_documents(self, filter_query=None, after_id: Optional[str] = None,
+                                             limit: Optional[int] = None, projection: Optional[dict] = None,
+                                             batch_size: int = 500) -> AsyncIterator[dict]:
+        # Ordenado pelo ID, como o cursor real; apenas projeções de exclusão ({"campo": 0}) são suportadas
+        returned = 0
+        for water_system_id in sorted(self.documents):
+            if after_id is not None and water_system_id <= after_id:
+                continue
+            if limit and returned >= limit:
+                return
+            document = self.documents[water_system_id]
+            if not self._matches(document, filter_query):
+                continue
+            returned += 1
+            yield {**{key: copy.deepcopy(value) for key, value in document.items() if (projection or {}).get(key) != 0},
+                   "id": water_system_id}
+
+    async def bulk_update_sensor_fields(self, sensor_updates: Dict[str, Dict[str, Dict[str, Any]]]) -> int:
+        self.bulk_writes += 1
+        modified = 0
+        for water_system_id, sensors in sensor_updates.items():
+            document = self.documents.get(water_system_id)
+            if document is None:
+                continue
+            sensors_by_id = {sensor["sensor_id"]: sensor for sensor in document.get("sensors", [])}
+            for sensor_id, fields in sensors.items():
+                sensors_by_id[sensor_id].update(fields)
+            modified += 1
+        return modified
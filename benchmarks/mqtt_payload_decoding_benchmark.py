@@ -0,0 +1,75 @@
+"""
+Micro-benchmark da decodificação de payloads MQTT de leituras de sensores.
+
+Compara o caminho anterior (decode + json.loads + model_validate + model_dump) com o caminho
+atual (model_validate_json sobre os bytes + to_document).
+
+Uso (a partir da raiz do repositório):
+    python -m benchmarks.mqtt_payload_decoding_benchmark --messages 200000
+"""
+import argparse
+import json
+import random
+import time
+from datetime import datetime, timezone, timedelta
+
+from src.application.utils.object_util import ObjectUtil
+from src.domain.events.sensor_reading_event import SensorReadingEvent, SENSOR_MEASURE_UNITS
+
+
+def generate_payloads(count: int, seed: int = 42) -> list:
+    rng = random.Random(seed)
+    sensors = list(SENSOR_MEASURE_UNITS.items())
+    start = datetime.now(timezone.utc)
+    payloads = []
+    for i in range(count):
+        sensor, unit = sensors[i % len(sensors)]
+        payloads.append(json.dumps({
+            "sensor": sensor.value,
+            "value": round(rng.uniform(0, 100), 3),
+            "measureUnit": unit.value,
+            "createDate": (start + timedelta(milliseconds=i)).isoformat(),
+            "sensorId": f"sensor-{i % 50}",
+            "waterSystemId": f"water-system-{i % 10}",
+        }).encode())
+    return payloads
+
+
+def legacy_path(payload: bytes) -> dict:
+    sensor_reading_event = SensorReadingEvent.model_validate(json.loads(payload.decode()))
+    return ObjectUtil.remove_fields(sensor_reading_event.model_dump(), ["id"])
+
+
+def fast_path(payload: bytes) -> dict:
+    return SensorReadingEvent.model_validate_json(payload).to_document()
+
+
+def measure(path, payloads: list, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        for payload in payloads:
+            path(payload)
+        best = min(best, time.perf_counter() - started_at)
+    return len(payloads) / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    payloads = generate_payloads(args.messages)
+    assert all(legacy_path(p) == fast_path(p) for p in payloads[:1000]), "Caminhos produziram documentos diferentes"
+
+    legacy = measure(legacy_path, payloads, args.repeat)
+    fast = measure(fast_path, payloads, args.repeat)
+    print(f"messages: {args.messages}")
+    print(f"legacy (decode + json.loads + model_validate + model_dump): {legacy:,.0f} msgs/s")
+    print(f"fast (model_validate_json + to_document):                  {fast:,.0f} msgs/s")
+    print(f"speedup: {fast / legacy:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Micro-benchmark da exportação de leituras de sensores.
+
+Compara o caminho anterior (find_readings -> modelos SensorReadingEvent -> JSON) com a exportação colunar
+(lotes de documentos brutos -> record batches Arrow IPC / Parquet) sobre documentos sintéticos servidos por
+um repositório em memória, no formato em que o driver os entrega.
+
+Uso (a partir da raiz do repositório; requer pyarrow):
+    python -m benchmarks.sensor_reading_export_benchmark --readings 1000000
+"""
+import argparse
+import asyncio
+import random
+import sys
+import time
+from datetime import datetime, timezone, timedelta
+from typing import List
+
+from bson import ObjectId
+from pydantic_core import to_json
+
+from src.domain.events.sensor_reading_event import SensorReadingEvent, SENSOR_MEASURE_UNITS
+from src.domain.repositories.sensor_reading_repository import SensorReadingsQuery
+
+
+def generate_documents(count: int, sensors: int = 5, seed: int = 42) -> List[dict]:
+    rng = random.Random(seed)
+    sensor_types = list(SENSOR_MEASURE_UNITS.items())
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    documents = []
+    for i in range(count):
+        sensor, unit = sensor_types[i % sensors % len(sensor_types)]
+        documents.append({
+            "_id": ObjectId(),
+            "sensor": sensor.value,
+            "value": round(rng.uniform(0, 100), 3),
+            "measure_unit": unit.value,
+            "create_date": start + timedelta(milliseconds=i * 100),
+            "sensor_id": f"sensor-{i % sensors}",
+            "water_system_id": "water-system-0",
+        })
+    return documents
+
+
+class InMemoryReadingRepository:
+    def __init__(self, documents: List[dict]):
+        self.documents = documents
+
+    async def iterate_reading_documents(self, query: SensorReadingsQuery, batch_size: int = 65536):
+        for start in range(0, len(self.documents), batch_size):
+            yield self.documents[start:start + batch_size]
+
+
+def export_json(documents: List[dict]) -> int:
+    """Caminho anterior: um modelo por leitura e a lista inteira serializada de uma vez."""
+    readings = [SensorReadingEvent(**document, id=str(document["_id"])) for document in documents]
+    return len(to_json([reading.model_dump() for reading in readings]))
+
+
+async def export_columnar(documents: List[dict], export_format, batch_size: int) -> int:
+    from src.application.services.export.sensor_reading_export_service import SensorReadingExportService
+    export_service = SensorReadingExportService(InMemoryReadingRepository(documents), batch_size)
+    exported_bytes = 0
+    async for data in export_service.stream(SensorReadingsQuery(water_system_id="water-system-0"), export_format):
+        exported_bytes += len(data)
+    return exported_bytes
+
+
+def measure(label: str, readings: int, function):
+    started_at = time.perf_counter()
+    exported_bytes = function()
+    elapsed = time.perf_counter() - started_at
+    print(f"{label:<10} {elapsed:8.2f} s {readings / elapsed:12.0f} readings/s {exported_bytes / 1024 / 1024:10.1f} MiB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--readings", type=int, default=1000000)
+    parser.add_argument("--batch-size", type=int, default=65536)
+    args = parser.parse_args()
+
+    try:
+        import pyarrow
+    except ImportError:
+        sys.exit("pyarrow is not installed; install it to run the columnar exports")
+    from src.application.services.export.sensor_reading_export_service import ExportFormat
+
+    documents = generate_documents(args.readings)
+    measure("json", args.readings, lambda: export_json(documents))
+    for export_format in ExportFormat:
+        pyarrow.default_memory_pool().release_unused()
+        measure(export_format.value, args.readings,
+                lambda: asyncio.run(export_columnar(documents, export_format, args.batch_size)))
+        print(f"{'':<10} Arrow peak memory: {pyarrow.default_memory_pool().max_memory() / 1024 / 1024:.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
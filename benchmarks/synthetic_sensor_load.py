@@ -0,0 +1,97 @@
+"""
+Gerador de carga sintética: N sistemas x M sensores publicando leituras realistas em `waterwise/<id>`.
+"""
+import json
+import random
+from datetime import datetime, timezone, timedelta
+from typing import List, Tuple
+
+from src.domain.entities.water_system import WaterSystem, WaterSystemType
+from src.domain.entities.water_system_sensor import WaterSystemSensor, SensorType
+from src.domain.events.sensor_reading_event import SensorReadingEvent, SENSOR_MEASURE_UNITS
+
+# (valor inicial, passo máximo do passeio aleatório, mínimo, máximo)
+SENSOR_PROFILES = {
+    SensorType.TEMPERATURE: (22.0, 0.2, 5.0, 35.0),
+    SensorType.PH: (7.2, 0.02, 6.0, 9.0),
+    SensorType.TURBIDITY: (3.0, 0.1, 0.0, 50.0),
+    SensorType.DISSOLVED_OXYGEN: (8.0, 0.05, 0.0, 15.0),
+    SensorType.CONDUCTIVITY: (500.0, 5.0, 50.0, 2000.0),
+}
+
+
+class _SyntheticSensor:
+    __slots__ = ("water_system_id", "sensor_id", "sensor_type", "value", "topic")
+
+    def __init__(self, water_system_id: str, sensor_id: str, sensor_type: SensorType):
+        self.water_system_id = water_system_id
+        self.sensor_id = sensor_id
+        self.sensor_type = sensor_type
+        self.value = SENSOR_PROFILES[sensor_type][0]
+        self.topic = f"waterwise/{water_system_id}"
+
+
+class SyntheticSensorLoad:
+    def __init__(self, water_systems: int, sensors_per_system: int, seed: int = 42):
+        """
+        :param water_systems: Quantidade de sistemas simulados.
+        :param sensors_per_system: Quantidade de sensores por sistema (os tipos são alternados).
+        """
+        self._random = random.Random(seed)
+        sensor_types = list(SENSOR_PROFILES.keys())
+        self.water_system_ids = [f"{index + 1:024x}" for index in range(water_systems)]
+        self.sensors = [
+            _SyntheticSensor(water_system_id, f"sensor-{index}", sensor_types[index % len(sensor_types)])
+            for water_system_id in self.water_system_ids
+            for index in range(sensors_per_system)
+        ]
+        self._position = 0
+
+    def _step(self, sensor: _SyntheticSensor) -> float:
+        _, step, minimum, maximum = SENSOR_PROFILES[sensor.sensor_type]
+        sensor.value = min(maximum, max(minimum, sensor.value + self._random.uniform(-step, step)))
+        return round(sensor.value, 3)
+
+    def water_systems(self) -> List[WaterSystem]:
+        """Gêmeos digitais correspondentes aos sensores simulados."""
+        sensors_by_system = {water_system_id: [] for water_system_id in self.water_system_ids}
+        for sensor in self.sensors:
+            sensors_by_system[sensor.water_system_id].append(WaterSystemSensor(
+                sensor_id=sensor.sensor_id, sensor_type=sensor.sensor_type, unit=SENSOR_MEASURE_UNITS[sensor.sensor_type]
+            ))
+        return [
+            WaterSystem(id=water_system_id, name=f"Benchmark {water_system_id[-6:]}", system_type=WaterSystemType.RESERVOIR,
+                        sensors=sensors)
+            for water_system_id, sensors in sensors_by_system.items()
+        ]
+
+    def next_message(self) -> Tuple[str, bytes]:
+        """Próxima mensagem (tópico, payload JSON), alternando entre os sensores."""
+        sensor = self.sensors[self._position]
+        self._position = (self._position + 1) % len(self.sensors)
+        payload = json.dumps({
+            "sensor": sensor.sensor_type.value,
+            "value": self._step(sensor),
+            "measureUnit": SENSOR_MEASURE_UNITS[sensor.sensor_type].value,
+            "createDate": datetime.now(timezone.utc).isoformat(),
+            "sensorId": sensor.sensor_id,
+            "waterSystemId": sensor.water_system_id,
+        })
+        return sensor.topic, payload.encode()
+
+    def window_readings(self, end: datetime, window_seconds: int, readings_per_sensor: int) -> List[SensorReadingEvent]:
+        """Leituras distribuídas uniformemente na janela que termina em `end`, para todos os sensores."""
+        interval = window_seconds / readings_per_sensor
+        readings = []
+        for sensor in self.sensors:
+            unit = SENSOR_MEASURE_UNITS[sensor.sensor_type]
+            for index in range(readings_per_sensor):
+                readings.append(SensorReadingEvent(
+                    sensor=sensor.sensor_type,
+                    value=self._step(sensor),
+                    measureUnit=unit,
+                    createDate=end - timedelta(seconds=window_seconds - (index + 0.5) * interval),
+                    sensorId=sensor.sensor_id,
+                    waterSystemId=sensor.water_system_id,
+                ))
+        return readings
@@ -0,0 +1,142 @@
+"""
+Benchmark da agregação da janela de twinning.
+
+Compara a implementação anterior com pandas (DataFrame + groupby().agg() + iterrows(), um sistema por vez)
+com o kernel NumPy de reduções segmentadas, por sistema e em lote com todos os sistemas do tick.
+Também mede o tempo de importação de pandas e NumPy em um processo novo.
+
+pandas é opcional e só é necessário para este benchmark:
+    pip install pandas
+
+Uso (a partir da raiz do repositório):
+    python -m benchmarks.twinning_aggregation_benchmark --water-systems 500 --sensors 5 --readings 12
+"""
+import argparse
+import math
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Dict, List
+
+from benchmarks.synthetic_sensor_load import SyntheticSensorLoad
+from src.application.services.processing_pipeline.processing_pipeline_service import ProcessingPipelineService
+from src.domain.entities.sensor_window_statistics import SensorWindowStatistics
+from src.domain.events.sensor_reading_event import SensorReadingEvent
+
+
+def legacy_compute_sensors_statistics(sensor_readings: List[SensorReadingEvent]) -> Dict[str, SensorWindowStatistics]:
+    """Implementação anterior com pandas, mantida como referência."""
+    import pandas
+
+    readings_raw_data = [r.model_dump() for r in sensor_readings]
+    dataframe = pandas.DataFrame(readings_raw_data)
+    dataframe["create_date"] = pandas.to_datetime(dataframe["create_date"])
+    dataframe = dataframe.sort_values(by=["sensor_id", "create_date"])
+
+    sensors_statistics = dataframe.groupby("sensor_id").agg(
+        mean_value=("value", "mean"),
+        min_value=("value", "min"),
+        max_value=("value", "max"),
+        last_value=("value", "last"),
+        last_value_date=("create_date", "last"),
+        readings_count=("value", "count")
+    )
+
+    return {
+        sensor_id: SensorWindowStatistics(
+            sensor_id=sensor_id,
+            mean_value=row["mean_value"],
+            min_value=row["min_value"],
+            max_value=row["max_value"],
+            last_value=row["last_value"],
+            last_value_date=row["last_value_date"].to_pydatetime(),
+            readings_count=int(row["readings_count"])
+        )
+        for sensor_id, row in sensors_statistics.iterrows()
+    }
+
+
+def generate_readings(water_systems: int, sensors: int, readings: int, seed: int = 42) \
+        -> Dict[str, List[SensorReadingEvent]]:
+    """Leituras de uma janela por sistema, embaralhadas e com alguns timestamps repetidos."""
+    load = SyntheticSensorLoad(water_systems, sensors, seed)
+    window_readings = load.window_readings(datetime.now(timezone.utc), 60, readings)
+    rng = random.Random(seed)
+    for index in range(0, len(window_readings) - 1, 7):
+        # Empates de timestamp exercitam a escolha da "última" leitura
+        window_readings[index + 1].create_date = window_readings[index].create_date
+    rng.shuffle(window_readings)
+
+    readings_by_water_system = {water_system_id: [] for water_system_id in load.water_system_ids}
+    for reading in window_readings:
+        readings_by_water_system[reading.water_system_id].append(reading)
+    return readings_by_water_system
+
+
+def assert_equivalent(expected: Dict[str, SensorWindowStatistics], actual: Dict[str, SensorWindowStatistics]):
+    assert list(expected) == list(actual), f"Sensores diferentes: {list(expected)} != {list(actual)}"
+    for sensor_id, expected_statistics in expected.items():
+        actual_statistics = actual[sensor_id]
+        for field in ("mean_value", "min_value", "max_value", "last_value"):
+            expected_value, actual_value = getattr(expected_statistics, field), getattr(actual_statistics, field)
+            assert math.isclose(expected_value, actual_value, rel_tol=1e-12), \
+                f"{sensor_id}.{field}: {expected_value} != {actual_value}"
+        assert expected_statistics.last_value_date == actual_statistics.last_value_date, sensor_id
+        assert expected_statistics.readings_count == actual_statistics.readings_count, sensor_id
+
+
+def measure(function, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - started_at)
+    return best
+
+
+def import_seconds(module: str) -> float:
+    started_at = time.perf_counter()
+    subprocess.run([sys.executable, "-c", f"import {module}"], check=True)
+    return time.perf_counter() - started_at
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--water-systems", type=int, default=500)
+    parser.add_argument("--sensors", type=int, default=5, help="Sensores por sistema")
+    parser.add_argument("--readings", type=int, default=12, help="Leituras por sensor na janela")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    try:
+        import pandas  # noqa: F401
+    except ImportError:
+        sys.exit("pandas não está instalado; instale-o para comparar com a implementação anterior")
+
+    readings_by_water_system = generate_readings(args.water_systems, args.sensors, args.readings)
+    batched = ProcessingPipelineService.compute_water_systems_statistics(readings_by_water_system)
+    for water_system_id, sensor_readings in readings_by_water_system.items():
+        expected = legacy_compute_sensors_statistics(sensor_readings)
+        assert_equivalent(expected, ProcessingPipelineService.compute_sensors_statistics(sensor_readings))
+        assert_equivalent(expected, batched[water_system_id])
+
+    legacy = measure(lambda: [legacy_compute_sensors_statistics(r) for r in readings_by_water_system.values()],
+                     args.repeat)
+    per_system = measure(lambda: [ProcessingPipelineService.compute_sensors_statistics(r)
+                                  for r in readings_by_water_system.values()], args.repeat)
+    batch = measure(lambda: ProcessingPipelineService.compute_water_systems_statistics(readings_by_water_system),
+                    args.repeat)
+
+    total_readings = sum(len(r) for r in readings_by_water_system.values())
+    print(f"water systems: {args.water_systems}, readings per tick: {total_readings}")
+    print(f"pandas, per Water System:      {legacy * 1000:9.1f} ms")
+    print(f"numpy kernel, per Water System:{per_system * 1000:9.1f} ms ({legacy / per_system:.1f}x)")
+    print(f"numpy kernel, batched:         {batch * 1000:9.1f} ms ({legacy / batch:.1f}x)")
+    print(f"import pandas: {import_seconds('pandas') * 1000:.0f} ms, "
+          f"import numpy: {import_seconds('numpy') * 1000:.0f} ms (processo novo, inclui o interpretador)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+import asyncio
+import hashlib
+import os
+import socket
+import uuid
+from typing import Callable, List, Optional
+
+from src.domain.repositories.cluster_member_repository import ClusterMemberRepository
+from src.infrastructure.adapters.mongodb_adapter import MongoDBAdapter
+from src.infrastructure.config.env_config import EnvConfig, EnvEntry
+from src.logging_config import get_custom_logger
+
+
+def _rendezvous_score(member_id: str, key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(f"{member_id}/{key}".encode(), digest_size=8).digest(), "big")
+
+
+class ClusterMembershipService:
+    def __init__(self, mongodb_adapter: Optional[MongoDBAdapter] = None):
+        """
+        Mantém o lease desta réplica no MongoDB e a lista de réplicas ativas.
+        Cada sistema pertence à réplica ativa de maior peso (rendezvous hashing), de modo que uma entrada
+        ou saída de réplica só redistribui os sistemas que pertenciam a ela.
+        """
+        env_config = EnvConfig()
+        self.logger = get_custom_logger(ClusterMembershipService.__name__)
+        self.cluster_member_repository = ClusterMemberRepository(mongodb_adapter)
+        self.member_id = env_config.get(EnvEntry.CLUSTER_MEMBER_ID) \
+            or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.lease_seconds = float(env_config.get(EnvEntry.CLUSTER_LEASE_SECONDS, "15"))
+        self.heartbeat_seconds = float(env_config.get(EnvEntry.CLUSTER_HEARTBEAT_SECONDS, "5"))
+
+        self.members: List[str] = [self.member_id]
+        self._listeners: List[Callable[[List[str]], None]] = []
+        self._task: Optional[asyncio.Task] = None
+
+    def subscribe(self, listener: Callable[[List[str]], None]):
+        """Registra um callback chamado com a nova lista de réplicas sempre que ela muda."""
+        self._listeners.append(listener)
+
+    def unsubscribe(self, listener: Callable[[List[str]], None]):
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def owns(self, water_system_id: str) -> bool:
+        """Indica se esta réplica é responsável pelo twinning do sistema."""
+        if len(self.members) == 1:
+            return self.members[0] == self.member_id
+        owner = max(self.members, key=lambda member_id: _rendezvous_score(member_id, water_system_id))
+        return owner == self.member_id
+
+    async def start(self):
+        """Registra o lease, carrega as réplicas ativas e inicia o heartbeat."""
+        await self.cluster_member_repository.ensure_indexes()
+        await self.heartbeat()
+        self._task = asyncio.get_event_loop().create_task(self._heartbeat_loop())
+        self.logger.info(f"Joined cluster as {self.member_id} ({len(self.members)} active members)")
+
+    async def stop(self):
+        """Interrompe o heartbeat e libera o lease, para que as demais réplicas assumam os sistemas imediatamente."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        try:
+            await self.cluster_member_repository.release_lease(self.member_id)
+        except Exception as e:
+            self.logger.warning(f"Could not release cluster lease of {self.member_id}: {e}")
+
+    async def heartbeat(self):
+        """Renova o lease e atualiza a lista de réplicas, notificando os listeners se ela mudou."""
+        await self.cluster_member_repository.renew_lease(self.member_id, self.lease_seconds)
+        members = await self.cluster_member_repository.list_active_members()
+        if self.member_id not in members:
+            members = sorted(members + [self.member_id])
+        if members != self.members:
+            self.logger.info(f"Cluster membership changed: {len(self.members)} -> {len(members)} members {members}")
+            self.members = members
+            for listener in list(self._listeners):
+                listener(members)
+
+    async def _heartbeat_loop(self):
+        while True:
+            await asyncio.sleep(self.heartbeat_seconds)
+            try:
+                await self.heartbeat()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Mantém a última lista conhecida; se o lease expirar, outras réplicas assumem os sistemas desta
+                self.logger.error(f"Error when renewing cluster lease: {e}")
@@ -1,17 +1,70 @@
+import asyncio
+import logging
 from datetime import timezone, timedelta
+from enum import Enum
+from typing import List, Optional
 
+from bson import ObjectId
+from pymongo.errors import BulkWriteError, PyMongoError
+
+from src.application.services.event.sensor_reading_buffer import SensorReadingBuffer
+from src.application.services.event.sensor_reading_spill_service import SensorReadingSpillService
+from src.application.services.processing_pipeline.hot_window_store import HotWindowStore
+from src.application.services.processing_pipeline.sensor_window_aggregator import SensorWindowAggregator
 from src.domain.events.sensor_reading_event import SensorReadingEvent
 from src.domain.repositories.sensor_reading_repository import SensorReadingRepository
+from src.infrastructure.adapters.mongodb_adapter import MongoDBAdapter
+from src.infrastructure.adapters.segmented_spill_log import SegmentedSpillLog
 from src.infrastructure.config.env_config import EnvConfig, EnvEntry
-from src.logging_config import get_custom_logger
+from src.logging_config import get_custom_logger, get_hot_path_rate_limiter
+
+
+class IngestionMode(str, Enum):
+    SINGLE = "single"
+    BATCH = "batch"
 
 
 class EventService:
-    def __init__(self):
+    def __init__(
+            self,
+            sensor_window_aggregator: Optional[SensorWindowAggregator] = None,
+            mongodb_adapter: Optional[MongoDBAdapter] = None,
+            hot_window_store: Optional[HotWindowStore] = None
+    ):
         env_config = EnvConfig()
         self.logger = get_custom_logger(EventService.__name__)
-        self.sensor_reading_repository = SensorReadingRepository()
+        self.reading_log_limiter = get_hot_path_rate_limiter()
+        self.sensor_reading_repository = SensorReadingRepository(mongodb_adapter)
         self.default_water_system_id = env_config.get(EnvEntry.DEFAULT_WATER_SYSTEM_ID)
+        self.sensor_window_aggregator = sensor_window_aggregator
+        self.hot_window_store = hot_window_store
+
+        # Com o spill habilitado, leituras que não são gravadas no MongoDB em até spill_write_timeout_seconds
+        # (ou enquanto ainda houver leituras no spill) vão para o log local e são reinseridas depois
+        self.sensor_reading_spill_service = None
+        self.spill_write_timeout_seconds = float(env_config.get(EnvEntry.INGESTION_SPILL_WRITE_TIMEOUT_SECONDS, "5"))
+        if env_config.get(EnvEntry.INGESTION_SPILL_ENABLED, "false").lower() == "true":
+            self.sensor_reading_spill_service = SensorReadingSpillService(
+                SegmentedSpillLog.open_first_available(
+                    env_config.get(EnvEntry.INGESTION_SPILL_DIRECTORY, "spill"),
+                    segment_max_bytes=int(env_config.get(EnvEntry.INGESTION_SPILL_SEGMENT_BYTES, str(64 * 1024 * 1024)))
+                ),
+                self.sensor_reading_repository,
+                drain_batch_size=int(env_config.get(EnvEntry.INGESTION_SPILL_DRAIN_BATCH_SIZE, "1000")),
+                retry_interval_seconds=float(env_config.get(EnvEntry.INGESTION_SPILL_RETRY_SECONDS, "5")),
+                write_timeout_seconds=self.spill_write_timeout_seconds
+            )
+
+        self.ingestion_mode = IngestionMode(env_config.get(EnvEntry.INGESTION_MODE, IngestionMode.SINGLE.value))
+        self.sensor_reading_buffer = None
+        if self.ingestion_mode == IngestionMode.BATCH:
+            self.sensor_reading_buffer = SensorReadingBuffer(
+                flush_handler=self.sensor_reading_repository.insert_sensor_readings
+                if self.sensor_reading_spill_service is None else self._persist_sensor_readings,
+                max_batch_size=int(env_config.get(EnvEntry.INGESTION_BATCH_SIZE, "500")),
+                max_batch_age_seconds=float(env_config.get(EnvEntry.INGESTION_BATCH_MAX_AGE_SECONDS, "1")),
+                capacity=int(env_config.get(EnvEntry.INGESTION_BUFFER_CAPACITY, "10000"))
+            )
 
     async def process_sensor_reading(self, sensor_reading: SensorReadingEvent):
         if sensor_reading.water_system_id is None:
@@ -20,8 +73,60 @@ class EventService:
         utc_minus_3 = timezone(timedelta(hours=-3))
         sensor_reading.create_date = sensor_reading.create_date.replace(tzinfo=utc_minus_3)
 
-        inserted_id = await self.sensor_reading_repository.insert_sensor_reading(sensor_reading)
-        self.logger.info(f"Successfully processed sensor reading ({inserted_id}): "
-                         f"Water System = {sensor_reading.water_system_id}, "
-                         f"Sensor = {sensor_reading.sensor_id} ({sensor_reading.sensor.value}), "
-                         f"Value = {sensor_reading.value} {sensor_reading.measure_unit.value}")
+        if self.sensor_reading_buffer is not None:
+            await self.sensor_reading_buffer.add(sensor_reading)
+            self._feed_in_memory_windows(sensor_reading)
+            return
+
+        if self.sensor_reading_spill_service is not None:
+            inserted_id = (await self._persist_sensor_readings([sensor_reading]))[0]
+        else:
+            inserted_id = await self.sensor_reading_repository.insert_sensor_reading(sensor_reading)
+        self._feed_in_memory_windows(sensor_reading)
+        if self.logger.isEnabledFor(logging.INFO) and self.reading_log_limiter.allow():
+            self.logger.info("Successfully processed sensor reading (%s): Water System = %s, Sensor = %s (%s), "
+                             "Value = %s %s (%d similar messages suppressed)",
+                             inserted_id, sensor_reading.water_system_id, sensor_reading.sensor_id,
+                             sensor_reading.sensor.value, sensor_reading.value, sensor_reading.measure_unit.value,
+                             self.reading_log_limiter.take_suppressed())
+
+    async def _persist_sensor_readings(self, sensor_readings: List[SensorReadingEvent]) -> List[str]:
+        """
+        Grava as leituras no MongoDB ou, se ele não responder a tempo, no spill local.
+        O `_id` é atribuído antes da primeira tentativa, para que a reinserção pelo drainer seja idempotente.
+        """
+        documents = [{"_id": ObjectId(), **sensor_reading.to_document()} for sensor_reading in sensor_readings]
+        if self.sensor_reading_spill_service.has_backlog():
+            # Enquanto o spill não é drenado, as leituras novas entram no fim do log, na ordem de chegada
+            await self.sensor_reading_spill_service.spill(documents)
+        else:
+            try:
+                await asyncio.wait_for(
+                    self.sensor_reading_repository.insert_sensor_reading_documents(documents),
+                    self.spill_write_timeout_seconds
+                )
+            except BulkWriteError:
+                raise
+            except (asyncio.TimeoutError, PyMongoError) as e:
+                self.logger.warning(f"Spilling {len(documents)} sensor readings to the local log: "
+                                    f"{str(e) or 'MongoDB write timed out'}")
+                await self.sensor_reading_spill_service.spill(documents)
+        return [str(document["_id"]) for document in documents]
+
+    def start(self):
+        """Inicia o drainer do spill, que retoma o que tiver ficado no log em uma execução anterior."""
+        if self.sensor_reading_spill_service is not None:
+            self.sensor_reading_spill_service.start()
+
+    def _feed_in_memory_windows(self, sensor_reading: SensorReadingEvent):
+        if self.sensor_window_aggregator is not None:
+            self.sensor_window_aggregator.add(sensor_reading)
+        if self.hot_window_store is not None:
+            self.hot_window_store.add(sensor_reading)
+
+    async def stop(self):
+        """Persiste as leituras ainda pendentes no buffer de ingestão (no spill, se o MongoDB não responder)."""
+        if self.sensor_reading_buffer is not None:
+            await self.sensor_reading_buffer.stop()
+        if self.sensor_reading_spill_service is not None:
+            await self.sensor_reading_spill_service.stop()
@@ -0,0 +1,120 @@
+import asyncio
+import time
+from typing import Callable, Coroutine, Any, List, Optional
+
+from pymongo.errors import BulkWriteError
+
+from src.domain.events.sensor_reading_event import SensorReadingEvent
+from src.logging_config import get_custom_logger
+
+# Marcador enfileirado no encerramento para que o flusher esvazie o buffer e termine
+_STOP = object()
+
+
+class SensorReadingBuffer:
+    def __init__(
+            self,
+            flush_handler: Callable[[List[SensorReadingEvent]], Coroutine[Any, Any, Any]],
+            max_batch_size: int,
+            max_batch_age_seconds: float,
+            capacity: int
+    ):
+        """
+        Inicializa o buffer de ingestão em lote.
+        :param flush_handler: Corrotina que persiste um lote de leituras.
+        :param max_batch_size: Quantidade de leituras que dispara um flush imediato.
+        :param max_batch_age_seconds: Tempo máximo que uma leitura aguarda no buffer antes do flush.
+        :param capacity: Quantidade máxima de leituras pendentes; acima disso os produtores aguardam.
+        """
+        self.logger = get_custom_logger(SensorReadingBuffer.__name__)
+        self.flush_handler = flush_handler
+        self.max_batch_size = max_batch_size
+        self.max_batch_age_seconds = max_batch_age_seconds
+        self.capacity = max(capacity, max_batch_size)
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._flusher_task: Optional[asyncio.Task] = None
+
+        # Estatísticas dos flushes
+        self.flushed_batches = 0
+        self.flushed_readings = 0
+        self.failed_readings = 0
+        self.last_flush_latency_seconds: Optional[float] = None
+
+    def start(self):
+        """Cria a fila e a tarefa de flush no event loop corrente."""
+        if self._flusher_task is not None:
+            return
+        self._queue = asyncio.Queue(maxsize=self.capacity)
+        self._flusher_task = asyncio.get_event_loop().create_task(self._flusher())
+
+    async def add(self, sensor_reading: SensorReadingEvent):
+        """
+        Adiciona uma leitura ao buffer.
+        Quando o buffer está cheio, aguarda até que um flush libere espaço (backpressure).
+        """
+        if self._flusher_task is None:
+            self.start()
+        await self._queue.put(sensor_reading)
+
+    async def stop(self):
+        """Persiste as leituras pendentes e encerra a tarefa de flush."""
+        if self._flusher_task is None:
+            return
+        await self._queue.put(_STOP)
+        await self._flusher_task
+        self._flusher_task = None
+
+    def pending(self) -> int:
+        """Retorna a quantidade de leituras aguardando flush."""
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def _flusher(self):
+        loop = asyncio.get_event_loop()
+        stopping = False
+        while not stopping:
+            first = await self._queue.get()
+            if first is _STOP:
+                break
+
+            batch = [first]
+            deadline = loop.time() + self.max_batch_age_seconds
+            while len(batch) < self.max_batch_size:
+                if self._queue.empty():
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(self._queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                else:
+                    item = self._queue.get_nowait()
+
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            await self._flush(batch)
+
+    async def _flush(self, batch: List[SensorReadingEvent]):
+        started_at = time.perf_counter()
+        try:
+            await self.flush_handler(batch)
+            self.flushed_readings += len(batch)
+        except BulkWriteError as e:
+            write_errors = len(e.details.get("writeErrors", []))
+            self.flushed_readings += len(batch) - write_errors
+            self.failed_readings += write_errors
+            self.logger.error(f"Batch insert partially failed: {write_errors} of {len(batch)} sensor readings rejected")
+        except Exception as e:
+            self.failed_readings += len(batch)
+            self.logger.error(f"Error when flushing batch of {len(batch)} sensor readings: {e}")
+        finally:
+            self.flushed_batches += 1
+            self.last_flush_latency_seconds = time.perf_counter() - started_at
+
+        self.logger.debug(f"Flushed batch of {len(batch)} sensor readings "
+                          f"in {self.last_flush_latency_seconds * 1000:.1f} ms "
+                          f"({self.pending()} pending)")
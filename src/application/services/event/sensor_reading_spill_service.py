@@ -0,0 +1,159 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+
+import bson
+from bson.codec_options import CodecOptions
+from pymongo.errors import BulkWriteError
+
+from src.domain.repositories.sensor_reading_repository import SensorReadingRepository, DUPLICATE_KEY_ERROR_CODE
+from src.infrastructure.adapters.segmented_spill_log import SegmentedSpillLog
+from src.infrastructure.metrics.application_metrics import INGESTION_SPILLED_READINGS, INGESTION_SPILL_DRAINED_READINGS, \
+    INGESTION_SPILL_PENDING_BYTES
+from src.logging_config import get_custom_logger
+
+_CODEC_OPTIONS = CodecOptions(tz_aware=True)
+
+
+class SensorReadingSpillService:
+    def __init__(
+            self,
+            spill_log: SegmentedSpillLog,
+            sensor_reading_repository: SensorReadingRepository,
+            drain_batch_size: int = 1000,
+            retry_interval_seconds: float = 5,
+            write_timeout_seconds: float = 5
+    ):
+        """
+        Caminho durável para leituras que não puderam ser gravadas no MongoDB a tempo: os documentos (já com `_id`)
+        são anexados ao log local em BSON e um drainer em segundo plano os reinsere em lote quando o MongoDB volta.
+        Anexações concorrentes são agrupadas em uma única escrita com um único fsync (group commit).
+        Como cada documento tem o `_id` atribuído antes da primeira tentativa, reinserir um documento que chegou a
+        ser gravado (por exemplo, antes de uma queda, mas depois do último commit do offset) não o duplica.
+        Em coleções time-series, que não garantem `_id` único, o drainer consulta os `_id` já gravados antes de
+        cada lote; resta apenas a janela em que uma escrita expirada ainda chega ao MongoDB depois dessa consulta.
+        """
+        self.logger = get_custom_logger(SensorReadingSpillService.__name__)
+        self.spill_log = spill_log
+        self.sensor_reading_repository = sensor_reading_repository
+        self.drain_batch_size = drain_batch_size
+        self.retry_interval_seconds = retry_interval_seconds
+        self.write_timeout_seconds = write_timeout_seconds
+
+        # As operações do log são bloqueantes e não thread-safe: uma única thread as serializa fora do event loop
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sensor-reading-spill")
+        self._pending_spills: List[Tuple[List[dict], asyncio.Future]] = []
+        self._spill_writer: Optional[asyncio.Task] = None
+        self._appended: Optional[asyncio.Event] = None
+        self._drainer_task: Optional[asyncio.Task] = None
+        # Detectado na primeira drenagem, quando o MongoDB estiver acessível
+        self._time_series: Optional[bool] = None
+
+        self.spilled_readings = 0
+        self.drained_readings = 0
+        self.rejected_readings = 0
+
+    def start(self):
+        """Inicia o drainer, que retoma a partir do último offset confirmado o que tiver ficado no log."""
+        if self._drainer_task is not None:
+            return
+        self._appended = asyncio.Event()
+        self._drainer_task = asyncio.get_event_loop().create_task(self._drainer())
+        if self.has_backlog():
+            self.logger.warning(f"Resuming drain of {self.spill_log.pending_bytes()} spilled bytes")
+
+    async def stop(self):
+        """Encerra o drainer; o que não foi drenado permanece no log para a próxima execução."""
+        if self._spill_writer is not None:
+            await asyncio.gather(self._spill_writer, return_exceptions=True)
+        if self._drainer_task is not None:
+            self._drainer_task.cancel()
+            await asyncio.gather(self._drainer_task, return_exceptions=True)
+            self._drainer_task = None
+        await asyncio.get_event_loop().run_in_executor(self._executor, self.spill_log.close)
+        self._executor.shutdown(wait=True)
+
+    def has_backlog(self) -> bool:
+        """Indica se há leituras no log aguardando o drainer (ou sendo anexadas)."""
+        return self.spill_log.pending_bytes() > 0 or bool(self._pending_spills)
+
+    async def spill(self, documents: List[dict]):
+        """Anexa documentos ao log; retorna depois que eles estiverem em disco (fsync)."""
+        future = asyncio.get_event_loop().create_future()
+        self._pending_spills.append((documents, future))
+        if self._spill_writer is None or self._spill_writer.done():
+            self._spill_writer = asyncio.get_event_loop().create_task(self._write_spills())
+        await future
+
+    async def _write_spills(self):
+        loop = asyncio.get_event_loop()
+        while self._pending_spills:
+            pending_spills, self._pending_spills = self._pending_spills, []
+            documents = [document for spill_documents, _ in pending_spills for document in spill_documents]
+            try:
+                await loop.run_in_executor(self._executor, self._append, documents)
+            except Exception as e:
+                self.logger.error(f"Error when spilling {len(documents)} sensor readings to the local log: {e}")
+                for _, future in pending_spills:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            self.spilled_readings += len(documents)
+            INGESTION_SPILLED_READINGS.inc(len(documents))
+            for _, future in pending_spills:
+                if not future.done():
+                    future.set_result(None)
+            if self._appended is not None:
+                self._appended.set()
+
+    def _append(self, documents: List[dict]):
+        self.spill_log.append([bson.encode(document) for document in documents])
+
+    def _read(self, offset: int) -> Tuple[List[dict], int]:
+        payloads, next_offset = self.spill_log.read(offset, self.drain_batch_size)
+        return [bson.decode(payload, codec_options=_CODEC_OPTIONS) for payload in payloads], next_offset
+
+    async def _drainer(self):
+        loop = asyncio.get_event_loop()
+        while True:
+            self._appended.clear()
+            committed_offset = self.spill_log.committed_offset
+            documents, next_offset = await loop.run_in_executor(self._executor, self._read, committed_offset)
+            if not documents:
+                if next_offset != committed_offset:
+                    await loop.run_in_executor(self._executor, self.spill_log.commit, next_offset)
+                    continue
+                await self._appended.wait()
+                continue
+
+            try:
+                if self._time_series is None:
+                    self._time_series = await self.sensor_reading_repository.is_time_series_collection()
+                await asyncio.wait_for(
+                    self.sensor_reading_repository.insert_sensor_reading_documents(
+                        documents, deduplicate=self._time_series
+                    ),
+                    self.write_timeout_seconds
+                )
+            except BulkWriteError as e:
+                # Erros que não são de chave duplicada não se resolvem com novas tentativas: o lote é confirmado
+                rejected = sum(1 for error in e.details.get("writeErrors", [])
+                               if error.get("code") != DUPLICATE_KEY_ERROR_CODE)
+                self.rejected_readings += rejected
+                self.logger.error(f"{rejected} of {len(documents)} spilled sensor readings rejected by MongoDB")
+            except Exception as e:
+                self.logger.warning(f"MongoDB still unavailable to drain spilled sensor readings "
+                                    f"({self.spill_log.pending_bytes()} bytes pending): {str(e) or 'write timed out'}; "
+                                    f"retrying in {self.retry_interval_seconds} s")
+                await asyncio.sleep(self.retry_interval_seconds)
+                continue
+
+            await loop.run_in_executor(self._executor, self.spill_log.commit, next_offset)
+            self.drained_readings += len(documents)
+            INGESTION_SPILL_DRAINED_READINGS.inc(len(documents))
+            if not self.has_backlog():
+                self.logger.info(f"Drained all spilled sensor readings ({self.drained_readings} so far)")
+
+    def collect_metrics(self):
+        INGESTION_SPILL_PENDING_BYTES.set(self.spill_log.pending_bytes())
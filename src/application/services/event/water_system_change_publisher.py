@@ -0,0 +1,35 @@
+from typing import Callable, List
+
+from src.domain.events.water_system_changed_event import WaterSystemChangedEvent
+from src.logging_config import get_custom_logger
+
+
+class WaterSystemChangePublisher:
+    def __init__(self):
+        self.logger = get_custom_logger(WaterSystemChangePublisher.__name__)
+        self._subscribers: List[Callable[[WaterSystemChangedEvent], None]] = []
+
+    def subscribe(self, callback: Callable[[WaterSystemChangedEvent], None]):
+        """Registra um callback síncrono chamado a cada alteração de gêmeo digital."""
+        self._subscribers.append(callback)
+
+    def unsubscribe(self, callback: Callable[[WaterSystemChangedEvent], None]):
+        """Remove um callback previamente registrado."""
+        if callback in self._subscribers:
+            self._subscribers.remove(callback)
+
+    def publish(self, event: WaterSystemChangedEvent):
+        """Notifica todos os inscritos sobre uma alteração."""
+        for callback in list(self._subscribers):
+            try:
+                callback(event)
+            except Exception as e:
+                self.logger.error(f"Error when notifying Water System change ({event.change_type.value} "
+                                  f"{event.water_system_id}): {e}")
+
+
+water_system_change_publisher = WaterSystemChangePublisher()
+
+
+def get_change_publisher() -> WaterSystemChangePublisher:
+    return water_system_change_publisher
@@ -0,0 +1,77 @@
+import asyncio
+from typing import Callable, List, Optional
+
+from src.domain.events.water_system_changed_event import WaterSystemChangedEvent, WaterSystemChangeType
+from src.domain.repositories.water_system_repository import WaterSystemRepository
+from src.logging_config import get_custom_logger
+
+_OPERATION_CHANGE_TYPES = {
+    "insert": WaterSystemChangeType.CREATED,
+    "update": WaterSystemChangeType.UPDATED,
+    "replace": WaterSystemChangeType.UPDATED,
+    "delete": WaterSystemChangeType.DELETED,
+}
+
+
+class WaterSystemChangeStreamWatcher:
+    def __init__(
+            self,
+            water_system_repository: WaterSystemRepository,
+            callback: Callable[[WaterSystemChangedEvent], None],
+            retry_seconds: float = 30
+    ):
+        """
+        Acompanha o change stream da coleção de sistemas para propagar alterações feitas por outras réplicas.
+        Os eventos trazem o documento atual (exceto remoções); as escritas do twinning são emitidas como TWINNED.
+        Requer MongoDB em replica set ou cluster.
+        """
+        self.logger = get_custom_logger(WaterSystemChangeStreamWatcher.__name__)
+        self.water_system_repository = water_system_repository
+        self.callback = callback
+        self.retry_seconds = retry_seconds
+        self._task: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def _is_twin_write(updated_fields: List[str]) -> bool:
+        """
+        O twinning grava apenas campos de elementos do array `sensors` (`sensors.<n>.<campo>`), enquanto as
+        atualizações pela API substituem campos inteiros (incluindo `sensors`).
+        """
+        return bool(updated_fields) and all(field.startswith("sensors.") for field in updated_fields)
+
+    def start(self):
+        self._task = asyncio.get_event_loop().create_task(self._watch())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _watch(self):
+        resume_token = None
+        while True:
+            try:
+                async for water_system_id, operation_type, resume_token, water_system, updated_fields in \
+                        self.water_system_repository.watch_changes(resume_token, full_document=True):
+                    change_type = _OPERATION_CHANGE_TYPES.get(operation_type)
+                    if change_type is None:
+                        continue
+                    if change_type == WaterSystemChangeType.UPDATED and self._is_twin_write(updated_fields):
+                        change_type = WaterSystemChangeType.TWINNED
+                    self.callback(WaterSystemChangedEvent(
+                        water_system_id=water_system_id, change_type=change_type,
+                        water_system=water_system, from_change_stream=True
+                    ))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.logger.warning(f"Water System change stream interrupted: {e}. "
+                                    f"Retrying in {self.retry_seconds} seconds...")
+                # O token pode ter expirado do oplog; alterações perdidas no intervalo ficam limitadas ao TTL do cache
+                # e à próxima reconciliação do agendador
+                resume_token = None
+                await asyncio.sleep(self.retry_seconds)
@@ -0,0 +1,166 @@
+import asyncio
+from typing import Dict, Iterable, List, Optional, Set
+
+from pydantic_core import to_json
+
+from src.domain.events.water_system_changed_event import WaterSystemChangedEvent
+from src.infrastructure.metrics.application_metrics import LIVE_UPDATE_SUBSCRIBERS, LIVE_UPDATE_MESSAGES_COALESCED
+from src.logging_config import get_custom_logger
+
+SNAPSHOT_CHANGE_TYPE = "snapshot"
+
+
+class LiveUpdateMessage:
+    """Atualização já serializada, compartilhada entre todos os inscritos de um sistema."""
+    __slots__ = ("water_system_id", "change_type", "body", "_sse_frame", "_text")
+
+    def __init__(self, water_system_id: str, change_type: str, water_system_body: Optional[bytes] = None):
+        """
+        :param water_system_body: JSON do gêmeo digital; None quando a alteração não traz o estado atual.
+        """
+        self.water_system_id = water_system_id
+        self.change_type = change_type
+        self.body = b"".join((
+            b'{"water_system_id":', to_json(water_system_id),
+            b',"change_type":', to_json(change_type),
+            b',"water_system":', water_system_body if water_system_body is not None else b"null", b"}"
+        ))
+        self._sse_frame: Optional[bytes] = None
+        self._text: Optional[str] = None
+
+    @property
+    def sse_frame(self) -> bytes:
+        """Evento no formato Server-Sent Events, montado uma única vez."""
+        if self._sse_frame is None:
+            self._sse_frame = b"event: " + self.change_type.encode() + b"\ndata: " + self.body + b"\n\n"
+        return self._sse_frame
+
+    @property
+    def text(self) -> str:
+        """Corpo como texto, para frames WebSocket, decodificado uma única vez."""
+        if self._text is None:
+            self._text = self.body.decode()
+        return self._text
+
+
+class LiveUpdateSubscriber:
+    """
+    Conexão inscrita em um conjunto de sistemas.
+    Guarda no máximo uma atualização pendente por sistema: uma atualização mais nova substitui a anterior ainda
+    não lida, então a fila de um consumidor lento nunca passa do número de sistemas inscritos.
+    """
+    __slots__ = ("transport", "water_system_ids", "_pending", "_ready")
+
+    def __init__(self, transport: str):
+        self.transport = transport
+        self.water_system_ids: Set[str] = set()
+        self._pending: Dict[str, LiveUpdateMessage] = {}
+        self._ready = asyncio.Event()
+
+    def offer(self, message: LiveUpdateMessage, replace: bool = True):
+        """
+        Enfileira uma atualização.
+        :param replace: Se falso, não substitui uma atualização pendente do mesmo sistema (usado para snapshots).
+        """
+        if message.water_system_id in self._pending:
+            if not replace:
+                return
+            LIVE_UPDATE_MESSAGES_COALESCED.inc()
+        self._pending[message.water_system_id] = message
+        self._ready.set()
+
+    async def next_messages(self) -> List[LiveUpdateMessage]:
+        """Aguarda e retorna as atualizações pendentes, na ordem em que os sistemas foram atualizados."""
+        await self._ready.wait()
+        self._ready.clear()
+        messages = list(self._pending.values())
+        self._pending.clear()
+        return messages
+
+
+class WaterSystemLiveUpdateHub:
+    def __init__(
+            self,
+            max_subscribers: int,
+            max_water_systems_per_subscriber: int,
+            keepalive_seconds: float = 15,
+            send_timeout_seconds: float = 10,
+            change_stream_only: bool = False
+    ):
+        """
+        Distribui as alterações de gêmeos digitais para as conexões SSE/WebSocket inscritas.
+        Cada alteração é serializada uma única vez, e apenas se houver inscritos no sistema.
+        :param max_subscribers: Quantidade máxima de conexões simultâneas.
+        :param max_water_systems_per_subscriber: Quantidade máxima de sistemas acompanhados por conexão.
+        :param keepalive_seconds: Intervalo máximo sem envio antes de um keepalive.
+        :param send_timeout_seconds: Tempo máximo de um envio antes de a conexão ser considerada travada.
+        :param change_stream_only: Considera apenas os eventos do change stream, que já incluem as alterações desta
+            réplica; usado quando o change stream está ativo (ex.: modo cluster), para não entregar cada alteração
+            local duas vezes.
+        """
+        self.logger = get_custom_logger(WaterSystemLiveUpdateHub.__name__)
+        self.max_subscribers = max_subscribers
+        self.max_water_systems_per_subscriber = max_water_systems_per_subscriber
+        self.keepalive_seconds = keepalive_seconds
+        self.send_timeout_seconds = send_timeout_seconds
+        self.change_stream_only = change_stream_only
+        self._subscribers: Set[LiveUpdateSubscriber] = set()
+        self._subscribers_by_water_system: Dict[str, Set[LiveUpdateSubscriber]] = {}
+
+    def connect(self, transport: str) -> Optional[LiveUpdateSubscriber]:
+        """Registra uma nova conexão; retorna None se o limite de conexões foi atingido."""
+        if len(self._subscribers) >= self.max_subscribers:
+            return None
+        subscriber = LiveUpdateSubscriber(transport)
+        self._subscribers.add(subscriber)
+        return subscriber
+
+    def disconnect(self, subscriber: LiveUpdateSubscriber):
+        """Remove a conexão e todas as suas inscrições."""
+        self.unsubscribe(subscriber, list(subscriber.water_system_ids))
+        self._subscribers.discard(subscriber)
+
+    def subscribe(self, subscriber: LiveUpdateSubscriber, water_system_ids: Iterable[str]) -> List[str]:
+        """
+        Inscreve a conexão nos sistemas informados, respeitando o limite por conexão.
+        Retorna os IDs efetivamente adicionados.
+        """
+        added = []
+        for water_system_id in water_system_ids:
+            if water_system_id in subscriber.water_system_ids:
+                continue
+            if len(subscriber.water_system_ids) >= self.max_water_systems_per_subscriber:
+                break
+            subscriber.water_system_ids.add(water_system_id)
+            self._subscribers_by_water_system.setdefault(water_system_id, set()).add(subscriber)
+            added.append(water_system_id)
+        return added
+
+    def unsubscribe(self, subscriber: LiveUpdateSubscriber, water_system_ids: Iterable[str]):
+        for water_system_id in water_system_ids:
+            subscriber.water_system_ids.discard(water_system_id)
+            subscribers = self._subscribers_by_water_system.get(water_system_id)
+            if subscribers is not None:
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    del self._subscribers_by_water_system[water_system_id]
+
+    def on_water_system_changed(self, event: WaterSystemChangedEvent):
+        """Callback para o WaterSystemChangePublisher."""
+        if self.change_stream_only and not event.from_change_stream:
+            return
+        subscribers = self._subscribers_by_water_system.get(event.water_system_id)
+        if not subscribers:
+            return
+        water_system_body = event.water_system.model_dump_json().encode() if event.water_system is not None else None
+        message = LiveUpdateMessage(event.water_system_id, event.change_type.value, water_system_body)
+        for subscriber in subscribers:
+            subscriber.offer(message)
+
+    def collect_metrics(self):
+        """Atualiza o gauge de conexões por transporte; usado como hook do /metrics."""
+        counts: Dict[str, int] = {}
+        for subscriber in self._subscribers:
+            counts[subscriber.transport] = counts.get(subscriber.transport, 0) + 1
+        for transport in ("sse", "websocket"):
+            LIVE_UPDATE_SUBSCRIBERS.labels(transport).set(counts.get(transport, 0))
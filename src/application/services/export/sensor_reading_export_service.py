@@ -0,0 +1,172 @@
+import asyncio
+import time
+from enum import Enum
+from typing import AsyncIterator, List, Optional
+
+from src.domain.repositories.sensor_reading_repository import SensorReadingRepository, SensorReadingsQuery
+from src.logging_config import get_custom_logger
+
+
+class ExportFormat(str, Enum):
+    ARROW = "arrow"
+    PARQUET = "parquet"
+
+
+EXPORT_MEDIA_TYPES = {
+    ExportFormat.ARROW: "application/vnd.apache.arrow.stream",
+    ExportFormat.PARQUET: "application/vnd.apache.parquet",
+}
+EXPORT_FILE_EXTENSIONS = {
+    ExportFormat.ARROW: "arrows",
+    ExportFormat.PARQUET: "parquet",
+}
+
+# Codecs aceitos por cada formato; além disso, o codec precisa estar disponível no build do pyarrow
+EXPORT_COMPRESSION_CODECS = {
+    ExportFormat.ARROW: {"lz4", "lz4_frame", "zstd"},
+    ExportFormat.PARQUET: {"snappy", "gzip", "brotli", "lz4", "lz4_raw", "zstd"},
+}
+
+
+def import_pyarrow():
+    """Importado sob demanda: o pyarrow só é carregado quando uma exportação colunar é solicitada."""
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError as e:
+        raise ImportError("Columnar exports require pyarrow (pip install pyarrow)") from e
+    return pyarrow
+
+
+def validate_compression(export_format: ExportFormat, compression: Optional[str]):
+    """Lança ValueError se o codec não é suportado pelo formato ou não está disponível no pyarrow instalado."""
+    if compression is None:
+        return
+    if compression not in EXPORT_COMPRESSION_CODECS[export_format]:
+        raise ValueError(f"Compression '{compression}' is not supported by {export_format.value} exports "
+                         f"(use one of {', '.join(sorted(EXPORT_COMPRESSION_CODECS[export_format]))})")
+    if not import_pyarrow().Codec.is_available(compression):
+        raise ValueError(f"Compression '{compression}' is not available in the installed pyarrow")
+
+
+class _ChunkedSink:
+    """Destino em memória que acumula o que o writer escreveu até ser esvaziado com drain()."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        chunk = bytes(data)
+        self._chunks.append(chunk)
+        self._position += len(chunk)
+        return len(chunk)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+class SensorReadingColumnarWriter:
+    def __init__(self, sink, export_format: ExportFormat, compression: Optional[str] = None):
+        """
+        Escreve lotes de documentos de leituras como record batches Arrow, incrementalmente, em um stream
+        Arrow IPC ou em um arquivo Parquet (um row group por lote).
+        :param sink: Objeto com write() que recebe os bytes gerados.
+        :param compression: Codec (zstd, lz4...); por padrão, nenhum no Arrow IPC e zstd no Parquet.
+        """
+        pa = import_pyarrow()
+        self._pa = pa
+        self.schema = pa.schema([
+            ("id", pa.string()),
+            ("water_system_id", pa.string()),
+            ("sensor_id", pa.string()),
+            ("sensor", pa.string()),
+            ("measure_unit", pa.string()),
+            ("value", pa.float64()),
+            ("create_date", pa.timestamp("ms", tz="UTC")),
+        ])
+        sink = pa.PythonFile(sink, mode="w")
+        if export_format == ExportFormat.ARROW:
+            self._writer = pa.ipc.new_stream(sink, self.schema, options=pa.ipc.IpcWriteOptions(compression=compression))
+        else:
+            self._writer = pa.parquet.ParquetWriter(sink, self.schema, compression=compression or "zstd")
+
+    def to_record_batch(self, documents: List[dict]):
+        """Converte os documentos brutos do MongoDB em um record batch, uma coluna por vez."""
+        pa = self._pa
+        return pa.record_batch([
+            pa.array([str(document["_id"]) for document in documents], pa.string()),
+            pa.array([document.get("water_system_id") for document in documents], pa.string()),
+            pa.array([document.get("sensor_id") for document in documents], pa.string()),
+            pa.array([document.get("sensor") for document in documents], pa.string()),
+            pa.array([document.get("measure_unit") for document in documents], pa.string()),
+            pa.array([document.get("value") for document in documents], pa.float64()),
+            pa.array([document.get("create_date") for document in documents], pa.timestamp("ms", tz="UTC")),
+        ], schema=self.schema)
+
+    def write_documents(self, documents: List[dict]) -> int:
+        self._writer.write_batch(self.to_record_batch(documents))
+        return len(documents)
+
+    def close(self):
+        self._writer.close()
+
+
+class SensorReadingExportService:
+    def __init__(self, repository: SensorReadingRepository, batch_size: int = 65536):
+        """
+        Exporta leituras em formato colunar em memória constante: cada lote do cursor vira um record batch,
+        que é codificado (fora do event loop) enquanto o lote seguinte é lido do MongoDB.
+        """
+        self.logger = get_custom_logger(SensorReadingExportService.__name__)
+        self.repository = repository
+        self.batch_size = batch_size
+
+    async def stream(self, query: SensorReadingsQuery, export_format: ExportFormat,
+                     compression: Optional[str] = None) -> AsyncIterator[bytes]:
+        """Retorna os bytes do arquivo exportado em partes, uma (ou mais) por lote de leituras."""
+        sink = _ChunkedSink()
+        writer = SensorReadingColumnarWriter(sink, export_format, compression)
+        loop = asyncio.get_running_loop()
+        batches = self.repository.iterate_reading_documents(query, self.batch_size)
+        started_at = time.perf_counter()
+        readings = 0
+        exported_bytes = 0
+        next_batch = asyncio.ensure_future(batches.__anext__())
+        try:
+            while True:
+                try:
+                    documents = await next_batch
+                except StopAsyncIteration:
+                    break
+                next_batch = asyncio.ensure_future(batches.__anext__())
+                readings += await loop.run_in_executor(None, writer.write_documents, documents)
+                data = sink.drain()
+                if data:
+                    exported_bytes += len(data)
+                    yield data
+            await loop.run_in_executor(None, writer.close)
+            data = sink.drain()
+            exported_bytes += len(data)
+            yield data
+        finally:
+            if not next_batch.done():
+                next_batch.cancel()
+                await asyncio.gather(next_batch, return_exceptions=True)
+            await batches.aclose()
+        self.logger.info(f"Exported {readings} readings of Water System {query.water_system_id} as "
+                         f"{export_format.value} ({exported_bytes / 1024 / 1024:.1f} MiB) in "
+                         f"{time.perf_counter() - started_at:.2f} s")
@@ -0,0 +1,242 @@
+import asyncio
+import math
+import time
+from datetime import datetime, timezone
+from typing import Dict, Optional, Tuple
+
+import numpy
+
+from src.domain.entities.sensor_window_statistics import SensorWindowStatistics
+from src.domain.events.water_system_changed_event import WaterSystemChangedEvent, WaterSystemChangeType
+from src.domain.events.sensor_reading_event import SensorReadingEvent
+from src.infrastructure.metrics.application_metrics import HOT_WINDOW_STORE_BYTES, HOT_WINDOW_STORE_WATER_SYSTEM_BYTES
+
+
+class _SensorRing:
+    """Ring buffer pré-alocado com os timestamps (segundos Unix) e valores de um sensor."""
+    __slots__ = ("timestamps", "values", "capacity", "count", "position", "last_timestamp")
+
+    def __init__(self, capacity: int):
+        self.timestamps = numpy.empty(capacity, dtype=numpy.float64)
+        self.values = numpy.empty(capacity, dtype=numpy.float64)
+        self.capacity = capacity
+        self.count = 0
+        self.position = 0
+        self.last_timestamp = -math.inf
+
+    def append(self, timestamp: float, value: float):
+        self.timestamps[self.position] = timestamp
+        self.values[self.position] = value
+        self.position = (self.position + 1) % self.capacity
+        self.count += 1
+        if timestamp > self.last_timestamp:
+            self.last_timestamp = timestamp
+
+    def retained(self) -> Tuple[numpy.ndarray, numpy.ndarray]:
+        """Retorna visões (sem cópia) das leituras mantidas, fora de ordem se o buffer já deu a volta."""
+        size = min(self.count, self.capacity)
+        return self.timestamps[:size], self.values[:size]
+
+    def ordered(self) -> Tuple[numpy.ndarray, numpy.ndarray]:
+        """Retorna cópias das leituras mantidas em ordem de inserção."""
+        if self.count <= self.capacity:
+            return self.timestamps[:self.count].copy(), self.values[:self.count].copy()
+        return (numpy.concatenate((self.timestamps[self.position:], self.timestamps[:self.position])),
+                numpy.concatenate((self.values[self.position:], self.values[:self.position])))
+
+    def overwritten_until(self) -> Optional[float]:
+        """Timestamp da leitura mais antiga ainda mantida, se alguma leitura já foi sobrescrita."""
+        if self.count <= self.capacity:
+            return None
+        return float(self.timestamps[self.position])
+
+    def resize(self, capacity: int):
+        timestamps, values = self.ordered()
+        kept = min(len(values), capacity)
+        self.timestamps = numpy.empty(capacity, dtype=numpy.float64)
+        self.values = numpy.empty(capacity, dtype=numpy.float64)
+        self.timestamps[:kept] = timestamps[len(timestamps) - kept:]
+        self.values[:kept] = values[len(values) - kept:]
+        self.capacity = capacity
+        # count > capacity sinaliza que leituras mais antigas foram descartadas
+        self.count = kept + (1 if len(values) > capacity else 0)
+        self.position = kept % capacity
+
+    def nbytes(self) -> int:
+        return self.timestamps.nbytes + self.values.nbytes
+
+
+class HotWindowStore:
+    def __init__(
+            self,
+            readings_per_second: float,
+            headroom: float,
+            default_twinning_rate_seconds: int,
+            eviction_interval_seconds: float = 60
+    ):
+        """
+        Armazena em memória as leituras recentes de cada sensor em arrays NumPy de tamanho fixo.
+        A capacidade de cada sensor é twinning_rate_seconds * readings_per_second * headroom.
+        Buffers de sensores sem leituras há mais tempo que a janela do sistema são liberados periodicamente.
+        :param readings_per_second: Taxa esperada de leituras por sensor.
+        :param headroom: Folga multiplicativa sobre a capacidade estimada.
+        :param default_twinning_rate_seconds: Janela usada para sistemas ainda não configurados.
+        :param eviction_interval_seconds: Intervalo entre as liberações de buffers ociosos.
+        """
+        self.readings_per_second = readings_per_second
+        self.headroom = headroom
+        self.default_twinning_rate_seconds = default_twinning_rate_seconds
+        self.eviction_interval_seconds = eviction_interval_seconds
+        self.started_at = datetime.now(timezone.utc)
+
+        self._rings: Dict[str, Dict[str, _SensorRing]] = {}
+        self._twinning_rates: Dict[str, int] = {}
+        # Timestamp da leitura mais recente já liberada de cada sistema: antes dele o armazenamento não cobre a janela
+        self._evicted_until: Dict[str, float] = {}
+        self._eviction_task: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._eviction_task = asyncio.get_event_loop().create_task(self._evict_idle_rings_periodically())
+
+    async def stop(self):
+        if self._eviction_task is not None:
+            self._eviction_task.cancel()
+            try:
+                await self._eviction_task
+            except asyncio.CancelledError:
+                pass
+            self._eviction_task = None
+
+    async def _evict_idle_rings_periodically(self):
+        while True:
+            await asyncio.sleep(self.eviction_interval_seconds)
+            self.evict_idle_rings()
+
+    def _capacity(self, twinning_rate_seconds: int) -> int:
+        return max(16, math.ceil(twinning_rate_seconds * self.readings_per_second * self.headroom))
+
+    def configure_water_system(self, water_system_id: str, twinning_rate_seconds: int):
+        """Ajusta a capacidade dos buffers de um sistema à sua janela de twinning."""
+        if self._twinning_rates.get(water_system_id) == twinning_rate_seconds:
+            return
+        self._twinning_rates[water_system_id] = twinning_rate_seconds
+        capacity = self._capacity(twinning_rate_seconds)
+        for ring in self._rings.get(water_system_id, {}).values():
+            if ring.capacity != capacity:
+                ring.resize(capacity)
+
+    def remove_water_system(self, water_system_id: str):
+        """Libera os buffers de um sistema."""
+        self._rings.pop(water_system_id, None)
+        self._twinning_rates.pop(water_system_id, None)
+        self._evicted_until.pop(water_system_id, None)
+
+    def on_water_system_changed(self, event: WaterSystemChangedEvent):
+        """Callback para o WaterSystemChangePublisher: libera os buffers de sistemas removidos."""
+        if event.change_type == WaterSystemChangeType.DELETED:
+            self.remove_water_system(event.water_system_id)
+
+    def evict_idle_rings(self, now: Optional[float] = None) -> int:
+        """
+        Libera os buffers de sensores cuja leitura mais recente é mais antiga que a janela de twinning do sistema,
+        pois já não contribuem para ela. Retorna a quantidade de buffers liberados.
+        """
+        now = time.time() if now is None else now
+        evicted = 0
+        for water_system_id in list(self._rings):
+            sensors = self._rings[water_system_id]
+            idle_before = now - self._twinning_rates.get(water_system_id, self.default_twinning_rate_seconds)
+            for sensor_id in [sensor_id for sensor_id, ring in sensors.items() if ring.last_timestamp < idle_before]:
+                ring = sensors.pop(sensor_id)
+                self._evicted_until[water_system_id] = max(
+                    self._evicted_until.get(water_system_id, -math.inf), ring.last_timestamp
+                )
+                evicted += 1
+            if not sensors:
+                del self._rings[water_system_id]
+        return evicted
+
+    def add(self, sensor_reading: SensorReadingEvent):
+        """Registra uma leitura no buffer do sensor correspondente."""
+        sensors = self._rings.get(sensor_reading.water_system_id)
+        if sensors is None:
+            sensors = self._rings[sensor_reading.water_system_id] = {}
+        ring = sensors.get(sensor_reading.sensor_id)
+        if ring is None:
+            twinning_rate_seconds = self._twinning_rates.get(
+                sensor_reading.water_system_id, self.default_twinning_rate_seconds
+            )
+            ring = sensors[sensor_reading.sensor_id] = _SensorRing(self._capacity(twinning_rate_seconds))
+        ring.append(sensor_reading.create_date.timestamp(), sensor_reading.value)
+
+    def covers(self, water_system_id: str, start: datetime, sensor_id: Optional[str] = None) -> bool:
+        """Indica se o armazenamento contém todas as leituras (do sistema ou de um sensor) desde `start`."""
+        if self.started_at > start:
+            return False
+        start_timestamp = start.timestamp()
+        if start_timestamp <= self._evicted_until.get(water_system_id, -math.inf):
+            return False
+        sensors = self._rings.get(water_system_id, {})
+        rings = [sensors[sensor_id]] if sensor_id in sensors else ([] if sensor_id else sensors.values())
+        for ring in rings:
+            overwritten_until = ring.overwritten_until()
+            if overwritten_until is not None and overwritten_until > start_timestamp:
+                return False
+        return True
+
+    def window_statistics(self, water_system_id: str, window_start: datetime) -> Optional[Dict[str, SensorWindowStatistics]]:
+        """
+        Calcula as estatísticas por sensor a partir de window_start.
+        Retorna None quando o armazenamento não cobre a janela (por exemplo, logo após um restart).
+        """
+        if not self.covers(water_system_id, window_start):
+            return None
+
+        start_timestamp = window_start.timestamp()
+        sensors_statistics = {}
+        for sensor_id, ring in self._rings.get(water_system_id, {}).items():
+            timestamps, values = ring.retained()
+            in_window = timestamps >= start_timestamp
+            if not in_window.any():
+                continue
+            window_timestamps = timestamps[in_window]
+            window_values = values[in_window]
+            last_index = int(numpy.argmax(window_timestamps))
+            sensors_statistics[sensor_id] = SensorWindowStatistics(
+                sensor_id=sensor_id,
+                mean_value=float(window_values.mean()),
+                min_value=float(window_values.min()),
+                max_value=float(window_values.max()),
+                last_value=float(window_values[last_index]),
+                last_value_date=datetime.fromtimestamp(float(window_timestamps[last_index]), tz=timezone.utc),
+                readings_count=int(window_values.size)
+            )
+        return sensors_statistics
+
+    def series(self, water_system_id: str, sensor_id: str, start: datetime, end: datetime) \
+            -> Tuple[numpy.ndarray, numpy.ndarray]:
+        """Retorna as leituras de um sensor no intervalo, ordenadas por data."""
+        ring = self._rings.get(water_system_id, {}).get(sensor_id)
+        if ring is None:
+            return numpy.empty(0), numpy.empty(0)
+        timestamps, values = ring.ordered()
+        in_range = (timestamps >= start.timestamp()) & (timestamps <= end.timestamp())
+        timestamps, values = timestamps[in_range], values[in_range]
+        order = numpy.argsort(timestamps, kind="stable")
+        return timestamps[order], values[order]
+
+    def collect_metrics(self):
+        """Atualiza os gauges de memória alocada (total e por sistema); usado como hook do /metrics."""
+        memory_usage = self.memory_usage_by_water_system()
+        HOT_WINDOW_STORE_BYTES.set(sum(memory_usage.values()))
+        # Recriado a cada coleta para que sistemas removidos ou ociosos deixem de ser exportados
+        HOT_WINDOW_STORE_WATER_SYSTEM_BYTES.clear()
+        for water_system_id, memory_bytes in memory_usage.items():
+            HOT_WINDOW_STORE_WATER_SYSTEM_BYTES.labels(water_system_id).set(memory_bytes)
+
+    def memory_usage_by_water_system(self) -> Dict[str, int]:
+        """Retorna os bytes alocados pelos buffers de cada sistema."""
+        return {
+            water_system_id: sum(ring.nbytes() for ring in sensors.values())
+            for water_system_id, sensors in self._rings.items()
+        }
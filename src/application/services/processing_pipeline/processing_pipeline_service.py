@@ -1,66 +1,376 @@
+import asyncio
+import logging
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone, timedelta
-from typing import List
+from enum import Enum
+from typing import List, Dict, Optional, Tuple, Any
 
-import pandas
+import numpy
+from pymongo.errors import BulkWriteError
 
+from src.application.services.cluster.cluster_membership_service import ClusterMembershipService
+from src.application.services.event.water_system_change_publisher import water_system_change_publisher
+from src.application.services.processing_pipeline.hot_window_store import HotWindowStore
+from src.application.services.processing_pipeline.sensor_window_aggregator import SensorWindowAggregator
+from src.application.utils.grouped_reduction_util import GroupedReductionUtil
+from src.domain.entities.sensor_window_statistics import SensorWindowStatistics
 from src.domain.entities.water_system import WaterSystem
 from src.domain.events.sensor_reading_event import SensorReadingEvent
+from src.domain.events.water_system_changed_event import WaterSystemChangedEvent, WaterSystemChangeType
 from src.domain.repositories.sensor_reading_repository import SensorReadingRepository, SensorReadingsQuery
 from src.domain.repositories.water_system_repository import WaterSystemRepository
+from src.infrastructure.adapters.mongodb_adapter import MongoDBAdapter
 from src.infrastructure.config.env_config import EnvConfig, EnvEntry
+from src.infrastructure.metrics.application_metrics import PIPELINE_TICK_DURATION, PIPELINE_WATER_SYSTEM_DURATION, \
+    PIPELINE_WATER_SYSTEMS_PROCESSED, PIPELINE_WINDOW_READINGS
 from src.logging_config import get_custom_logger
 
 
+_SENSOR_STATISTICS_FIELDS = ("mean_value", "min_value", "max_value", "last_value", "last_value_date")
+
+
+class TwinningWindowSource(str, Enum):
+    QUERY = "query"
+    INCREMENTAL = "incremental"
+    AGGREGATION = "aggregation"
+    HOT_WINDOW = "hot_window"
+
+
+class PipelineSchedulingMode(str, Enum):
+    INTERVAL = "interval"
+    PER_SYSTEM = "per_system"
+
+
+# Fontes que dependem das leituras recebidas por esta réplica
+IN_MEMORY_WINDOW_SOURCES = (TwinningWindowSource.INCREMENTAL, TwinningWindowSource.HOT_WINDOW)
+
+
 class ProcessingPipelineService:
-    def __init__(self):
+    def __init__(
+            self,
+            sensor_window_aggregator: Optional[SensorWindowAggregator] = None,
+            mongodb_adapter: Optional[MongoDBAdapter] = None,
+            hot_window_store: Optional[HotWindowStore] = None,
+            cluster_membership: Optional[ClusterMembershipService] = None
+    ):
         env_config = EnvConfig()
         self.logger = get_custom_logger(ProcessingPipelineService.__name__)
-        self.sensor_reading_repository = SensorReadingRepository()
-        self.water_system_repository = WaterSystemRepository()
+        self.sensor_reading_repository = SensorReadingRepository(mongodb_adapter)
+        self.water_system_repository = WaterSystemRepository(mongodb_adapter)
         self.default_water_system_id = env_config.get(EnvEntry.DEFAULT_WATER_SYSTEM_ID)
+        self.window_source = TwinningWindowSource(
+            env_config.get(EnvEntry.PIPELINE_WINDOW_SOURCE, TwinningWindowSource.QUERY.value)
+        )
+        self.sensor_window_aggregator = sensor_window_aggregator
+        self.hot_window_store = hot_window_store
+        self.cluster_membership = cluster_membership
+        if cluster_membership is not None and self.window_source in IN_MEMORY_WINDOW_SOURCES:
+            # Com assinaturas compartilhadas cada réplica recebe só parte das leituras de um sistema
+            self.logger.warning(f"Window source '{self.window_source.value}' keeps readings in memory and is not "
+                                f"supported in cluster mode, using '{TwinningWindowSource.QUERY.value}' instead")
+            self.window_source = TwinningWindowSource.QUERY
+        self.max_concurrency = int(env_config.get(EnvEntry.PIPELINE_MAX_CONCURRENCY, "16"))
+        self.aggregation_executor = ThreadPoolExecutor(
+            max_workers=int(env_config.get(EnvEntry.PIPELINE_AGGREGATION_WORKERS, "4")),
+            thread_name_prefix="pipeline-aggregation"
+        )
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.is_running = False
+        self.last_tick_duration_seconds: Optional[float] = None
 
-    def process_water_system_twinning_window_readings(self, water_system: WaterSystem, sensor_readings: List[SensorReadingEvent]):
-        if len(sensor_readings) == 0:
-            self.logger.warning(f"No sensor readings for within last twinning window for Water System {water_system.id}")
-            return
+    @staticmethod
+    def compute_water_systems_statistics(readings_by_water_system: Dict[str, List[SensorReadingEvent]]) \
+            -> Dict[str, Dict[str, SensorWindowStatistics]]:
+        """
+        Calcula as estatísticas por sensor das leituras de vários sistemas em uma única passada vetorizada.
+        Leituras sem sensor_id são ignoradas; valores NaN seguem a semântica do groupby do pandas usado antes
+        (ver GroupedReductionUtil.segmented_statistics), inclusive para sensores só com NaN.
+        Retorna {water_system_id: {sensor_id: estatísticas}}, com os sensores em ordem de ID.
+        """
+        group_codes_by_key: Dict[Tuple[str, str], int] = {}
+        group_codes, timestamps, values, kept_readings = [], [], [], []
+        for water_system_id, sensor_readings in readings_by_water_system.items():
+            for reading in sensor_readings:
+                if reading.sensor_id is None:
+                    continue
+                key = (water_system_id, reading.sensor_id)
+                group_code = group_codes_by_key.get(key)
+                if group_code is None:
+                    group_code = group_codes_by_key[key] = len(group_codes_by_key)
+                group_codes.append(group_code)
+                timestamps.append(reading.create_date.timestamp())
+                values.append(reading.value)
+                kept_readings.append(reading)
 
-        readings_raw_data = [r.model_dump() for r in sensor_readings]
-        dataframe = pandas.DataFrame(readings_raw_data)
-        dataframe["create_date"] = pandas.to_datetime(dataframe["create_date"])
-        dataframe = dataframe.sort_values(by=["sensor_id", "create_date"])
-
-        sensors_statistics = dataframe.groupby("sensor_id").agg(
-            mean_value=("value", "mean"),
-            min_value=("value", "min"),
-            max_value=("value", "max"),
-            last_value=("value", "last"),
-            last_value_date=("create_date", "last")
-        )
+        if not kept_readings:
+            return {}
+
+        # Renumera os grupos pela ordem das chaves para que os sensores saiam ordenados por ID
+        sorted_keys = sorted(group_codes_by_key)
+        ranks = numpy.empty(len(sorted_keys), dtype=numpy.int64)
+        ranks[[group_codes_by_key[key] for key in sorted_keys]] = numpy.arange(len(sorted_keys))
+
+        codes, counts, means, minimums, maximums, last_indexes, last_value_indexes = \
+            GroupedReductionUtil.segmented_statistics(
+                ranks[numpy.array(group_codes, dtype=numpy.int64)],
+                numpy.array(timestamps, dtype=numpy.float64),
+                numpy.array(values, dtype=numpy.float64)
+            )
+
+        statistics_by_water_system: Dict[str, Dict[str, SensorWindowStatistics]] = {}
+        for code, count, mean, minimum, maximum, last_index, last_value_index in zip(
+                codes.tolist(), counts.tolist(), means.tolist(), minimums.tolist(), maximums.tolist(),
+                last_indexes.tolist(), last_value_indexes.tolist()
+        ):
+            water_system_id, sensor_id = sorted_keys[code]
+            last_reading = kept_readings[last_index]
+            statistics_by_water_system.setdefault(water_system_id, {})[sensor_id] = SensorWindowStatistics(
+                sensor_id=sensor_id,
+                mean_value=mean,
+                min_value=minimum,
+                max_value=maximum,
+                last_value=kept_readings[last_value_index].value if last_value_index >= 0 else math.nan,
+                last_value_date=last_reading.create_date,
+                readings_count=count
+            )
+        return statistics_by_water_system
 
-        for sensor_id, row in sensors_statistics.iterrows():
-            water_system_sensor = next((sensor for sensor in water_system.sensors if sensor.sensor_id == sensor_id), None)
+    @classmethod
+    def compute_sensors_statistics(cls, sensor_readings: List[SensorReadingEvent]) -> Dict[str, SensorWindowStatistics]:
+        """Calcula as estatísticas por sensor de uma lista de leituras."""
+        return cls.compute_water_systems_statistics({"": sensor_readings}).get("", {})
+
+    def apply_sensors_statistics(self, water_system: WaterSystem, sensors_statistics: Dict[str, SensorWindowStatistics]) \
+            -> Dict[str, Dict[str, Any]]:
+        """
+        Atualiza os sensores do gêmeo digital com as estatísticas da janela de twinning.
+        Retorna apenas os campos alterados de cada sensor ({sensor_id: {campo: valor}}), para escrita parcial.
+        """
+        sensors_by_id = {sensor.sensor_id: sensor for sensor in water_system.sensors}
+        updated_at = datetime.now(timezone.utc)
+        sensor_updates = {}
+        for sensor_id, statistics in sensors_statistics.items():
+            water_system_sensor = sensors_by_id.get(sensor_id)
 
             if not water_system_sensor:
                 self.logger.warning(f"Found no matching Water System sensor for twinning.\n"
                                     f"Details: Water System ID = {water_system.id}, Sensor ID = {sensor_id}")
-                return
+                continue
+
+            changed_fields = {}
+            for field in _SENSOR_STATISTICS_FIELDS:
+                value = getattr(statistics, field)
+                if getattr(water_system_sensor, field) != value:
+                    setattr(water_system_sensor, field, value)
+                    changed_fields[field] = value
+            water_system_sensor.last_updated = updated_at
+            changed_fields["last_updated"] = updated_at
+            sensor_updates[sensor_id] = changed_fields
+        return sensor_updates
+
+    def process_water_system_twinning_window_readings(self, water_system: WaterSystem, sensor_readings: List[SensorReadingEvent]) \
+            -> Dict[str, Dict[str, Any]]:
+        if len(sensor_readings) == 0:
+            self.logger.warning(f"No sensor readings for within last twinning window for Water System {water_system.id}")
+            return {}
+
+        return self.apply_sensors_statistics(water_system, self.compute_sensors_statistics(sensor_readings))
 
-            water_system_sensor.mean_value = row["mean_value"]
-            water_system_sensor.min_value = row["min_value"]
-            water_system_sensor.max_value = row["max_value"]
-            water_system_sensor.last_value = row["last_value"]
-            water_system_sensor.last_value_date = row["last_value_date"]
-            water_system_sensor.last_updated = datetime.now(timezone.utc)
+    async def load_twinning_window(self, water_system: WaterSystem, window_start: datetime) \
+            -> Tuple[Optional[Dict[str, SensorWindowStatistics]], List[SensorReadingEvent]]:
+        """
+        Obtém os dados da janela de twinning de um sistema.
+        Usa o agregador incremental, o armazenamento em memória ou a agregação no MongoDB quando configurados,
+        retornando (estatísticas, []); caso contrário (ou se os dados em memória não cobrirem a janela),
+        consulta as leituras brutas e retorna (None, leituras) para que sejam agregadas em lote.
+        """
+        if self.window_source == TwinningWindowSource.HOT_WINDOW and self.hot_window_store is not None:
+            self.hot_window_store.configure_water_system(water_system.id, water_system.twinning_rate_seconds)
+            sensors_statistics = self.hot_window_store.window_statistics(water_system.id, window_start)
+            if sensors_statistics is not None:
+                return sensors_statistics, []
+            self.logger.info(f"Hot window store does not cover the twinning window of Water System "
+                             f"{water_system.id} yet, falling back to readings query")
+
+        if self.window_source == TwinningWindowSource.INCREMENTAL and self.sensor_window_aggregator is not None:
+            sensors_statistics = self.sensor_window_aggregator.snapshot(water_system.id, window_start)
+            if sensors_statistics is not None:
+                return sensors_statistics, []
+            self.logger.info(f"Incremental aggregates do not cover the twinning window of Water System "
+                             f"{water_system.id} yet, falling back to readings query")
+
+        sensor_readings_query = SensorReadingsQuery(water_system_id=water_system.id, start_date=window_start)
+        if self.window_source == TwinningWindowSource.AGGREGATION:
+            return await self.sensor_reading_repository.aggregate_window_statistics(sensor_readings_query), []
+
+        return None, await self.sensor_reading_repository.find_readings(sensor_readings_query)
+
+    async def compute_statistics_in_executor(self, readings_by_water_system: Dict[str, List[SensorReadingEvent]]) \
+            -> Dict[str, Dict[str, SensorWindowStatistics]]:
+        """Agrega as leituras de vários sistemas fora do event loop, para não atrasar o processamento MQTT."""
+        if not readings_by_water_system:
+            return {}
+        return await asyncio.get_event_loop().run_in_executor(
+            self.aggregation_executor, self.compute_water_systems_statistics, readings_by_water_system
+        )
+
+    async def get_twinning_window_statistics(self, water_system: WaterSystem, window_start: datetime) -> Dict[str, SensorWindowStatistics]:
+        """Obtém as estatísticas por sensor da janela de twinning de um único sistema."""
+        sensors_statistics, sensor_readings = await self.load_twinning_window(water_system, window_start)
+        if sensors_statistics is not None:
+            return sensors_statistics
+        statistics_by_water_system = await self.compute_statistics_in_executor({water_system.id: sensor_readings})
+        return statistics_by_water_system.get(water_system.id, {})
+
+    def apply_twinning_window_statistics(self, water_system: WaterSystem, sensors_statistics: Dict[str, SensorWindowStatistics]) \
+            -> Dict[str, Dict[str, Any]]:
+        PIPELINE_WINDOW_READINGS.observe(sum(statistics.readings_count or 0 for statistics in sensors_statistics.values()))
+        if len(sensors_statistics) == 0:
+            self.logger.warning(f"No sensor readings for within last twinning window for Water System {water_system.id}")
+            return {}
+        return self.apply_sensors_statistics(water_system, sensors_statistics)
+
+    async def process_water_system(self, water_system: WaterSystem) -> Dict[str, Dict[str, Any]]:
+        """
+        Executa o twinning de um único sistema em memória.
+        Retorna os campos alterados por sensor; a persistência é feita em lote por process_water_systems.
+        """
+        window_start = datetime.now(tz=timezone.utc) + timedelta(seconds=-water_system.twinning_rate_seconds)
+        sensors_statistics = await self.get_twinning_window_statistics(water_system, window_start)
+        return self.apply_twinning_window_statistics(water_system, sensors_statistics)
+
+    async def _load_twinning_window_limited(self, water_system: WaterSystem) \
+            -> Tuple[float, bool, Optional[Dict[str, SensorWindowStatistics]], List[SensorReadingEvent]]:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        async with self._semaphore:
+            started_at = time.perf_counter()
+            try:
+                window_start = datetime.now(tz=timezone.utc) + timedelta(seconds=-water_system.twinning_rate_seconds)
+                sensors_statistics, sensor_readings = await self.load_twinning_window(water_system, window_start)
+                return time.perf_counter() - started_at, True, sensors_statistics, sensor_readings
+            except Exception as e:
+                self.logger.error(f"Error when processing Water System {water_system.id}: {e}")
+                return time.perf_counter() - started_at, False, None, []
+
+    async def write_twin_updates(
+            self,
+            sensor_updates: Dict[str, Dict[str, Dict[str, Any]]],
+            water_systems: Optional[Dict[str, WaterSystem]] = None
+    ) -> List[str]:
+        """
+        Persiste as alterações de todos os sistemas do tick em um único bulk write e publica TWINNED
+        para os sistemas gravados. Retorna os IDs dos sistemas cuja escrita falhou.
+        :param water_systems: Gêmeos já atualizados em memória, publicados junto com o evento para os inscritos ao vivo.
+        """
+        if not sensor_updates:
+            return []
+
+        water_system_ids = list(sensor_updates.keys())
+        failed_ids = set()
+        try:
+            await self.water_system_repository.bulk_update_sensor_fields(sensor_updates)
+        except BulkWriteError as e:
+            failed_ids = {water_system_ids[error["index"]] for error in e.details.get("writeErrors", [])}
+            self.logger.error(f"Error when writing twin state of Water Systems {sorted(failed_ids)}: "
+                              f"{e.details.get('writeErrors', [])[:1]}")
+        except Exception as e:
+            failed_ids = set(water_system_ids)
+            self.logger.error(f"Error when writing twin state of {len(water_system_ids)} Water Systems: {e}")
+
+        for water_system_id in water_system_ids:
+            if water_system_id not in failed_ids:
+                water_system_change_publisher.publish(WaterSystemChangedEvent(
+                    water_system_id=water_system_id,
+                    change_type=WaterSystemChangeType.TWINNED,
+                    water_system=(water_systems or {}).get(water_system_id)
+                ))
+        return list(failed_ids)
+
+    def owns_water_system(self, water_system_id: str) -> bool:
+        """Indica se esta réplica é responsável pelo twinning do sistema (sempre verdadeiro fora do modo cluster)."""
+        return self.cluster_membership is None or self.cluster_membership.owns(water_system_id)
 
     async def run(self):
-        self.logger.info("Processing pipeline triggered")
+        if self.is_running:
+            self.logger.warning("Processing pipeline still running from the previous tick, skipping this one")
+            return
 
-        monitored_water_systems = await self.water_system_repository.list_water_systems({ "status": "online" })
-        for water_system in monitored_water_systems:
-            sensor_readings_query = SensorReadingsQuery(
-                water_system_id=water_system.id,
-                start_date=datetime.now(tz=timezone.utc) + timedelta(seconds=-water_system.twinning_rate_seconds)
-            )
-            sensor_readings = await self.sensor_reading_repository.find_readings(sensor_readings_query)
-            self.process_water_system_twinning_window_readings(water_system, sensor_readings)
-            await self.water_system_repository.update_water_system(water_system.id, water_system)
+        self.is_running = True
+        try:
+            self.logger.info("Processing pipeline triggered")
+            monitored_water_systems = await self.water_system_repository.list_water_systems({ "status": "online" })
+            await self.process_water_systems([ws for ws in monitored_water_systems if self.owns_water_system(ws.id)])
+        finally:
+            self.is_running = False
+
+    async def process_water_systems(self, water_systems: List[WaterSystem]):
+        """
+        Processa um lote de sistemas: carrega as janelas concorrentemente (respeitando o limite de concorrência),
+        agrega as leituras brutas de todos os sistemas em uma única passada e grava as alterações em um bulk write.
+        """
+        started_at = time.perf_counter()
+        windows = await asyncio.gather(*(self._load_twinning_window_limited(ws) for ws in water_systems))
+
+        readings_by_water_system = {
+            water_system.id: sensor_readings
+            for water_system, (_, succeeded, sensors_statistics, sensor_readings) in zip(water_systems, windows)
+            if succeeded and sensors_statistics is None
+        }
+        aggregation_failed = False
+        statistics_by_water_system = {}
+        aggregation_started_at = time.perf_counter()
+        try:
+            statistics_by_water_system = await self.compute_statistics_in_executor(readings_by_water_system)
+        except Exception as e:
+            aggregation_failed = True
+            self.logger.error(f"Error when aggregating readings of {len(readings_by_water_system)} Water Systems: {e}")
+        # O custo da agregação em lote é dividido entre os sistemas que dependeram dela
+        aggregation_share = (time.perf_counter() - aggregation_started_at) / max(1, len(readings_by_water_system))
+
+        results: List[Tuple[str, float, bool, Dict[str, Dict[str, Any]]]] = []
+        for water_system, (duration, succeeded, sensors_statistics, _) in zip(water_systems, windows):
+            sensor_updates = {}
+            if sensors_statistics is None:
+                duration += aggregation_share
+                succeeded = succeeded and not aggregation_failed
+                sensors_statistics = statistics_by_water_system.get(water_system.id, {})
+            if succeeded:
+                try:
+                    sensor_updates = self.apply_twinning_window_statistics(water_system, sensors_statistics)
+                except Exception as e:
+                    self.logger.error(f"Error when processing Water System {water_system.id}: {e}")
+                    succeeded = False
+            PIPELINE_WATER_SYSTEM_DURATION.observe(duration)
+            results.append((water_system.id, duration, succeeded, sensor_updates))
+
+        failed_writes = await self.write_twin_updates({
+            water_system_id: sensor_updates
+            for water_system_id, _, succeeded, sensor_updates in results
+            if succeeded and sensor_updates
+        }, {water_system.id: water_system for water_system in water_systems})
+
+        if self.sensor_window_aggregator is not None:
+            self.sensor_window_aggregator.prune(datetime.now(tz=timezone.utc))
+
+        # O uso por sistema é exportado no /metrics; aqui só é calculado se o log de debug estiver ativo
+        if self.hot_window_store is not None and self.logger.isEnabledFor(logging.DEBUG):
+            memory_usage = self.hot_window_store.memory_usage_by_water_system()
+            self.logger.debug(f"Hot window store memory: {sum(memory_usage.values()) / 1024:.1f} KiB total, "
+                              f"per Water System (bytes) = {memory_usage}")
+
+        self.last_tick_duration_seconds = time.perf_counter() - started_at
+        failures = sum(1 for _, _, succeeded, _ in results if not succeeded) + len(failed_writes)
+        PIPELINE_TICK_DURATION.observe(self.last_tick_duration_seconds)
+        PIPELINE_WATER_SYSTEMS_PROCESSED.labels("failed").inc(failures)
+        PIPELINE_WATER_SYSTEMS_PROCESSED.labels("succeeded").inc(len(results) - failures)
+        slowest = max(results, key=lambda result: result[1], default=None)
+        self.logger.info(f"Processing pipeline finished: {len(results)} Water Systems "
+                         f"in {self.last_tick_duration_seconds:.3f} s ({failures} failed"
+                         + (f", slowest {slowest[0]} took {slowest[1]:.3f} s)" if slowest else ")"))
+
+    def stop(self):
+        """Libera os workers de agregação."""
+        self.aggregation_executor.shutdown(wait=False)
@@ -0,0 +1,131 @@
+import math
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+from src.domain.entities.sensor_window_statistics import SensorWindowStatistics
+from src.domain.events.sensor_reading_event import SensorReadingEvent
+
+
+class _SensorBucket:
+    """Acumulador de um intervalo de bucket_seconds de um sensor."""
+    __slots__ = ("count", "total", "min_value", "max_value", "last_value", "last_timestamp", "last_value_date")
+
+    def __init__(self, value: float, timestamp: float, create_date: datetime):
+        self.count = 1
+        self.total = value
+        self.min_value = value
+        self.max_value = value
+        self.last_value = value
+        self.last_timestamp = timestamp
+        self.last_value_date = create_date
+
+    def add(self, value: float, timestamp: float, create_date: datetime):
+        self.count += 1
+        self.total += value
+        if value < self.min_value:
+            self.min_value = value
+        if value > self.max_value:
+            self.max_value = value
+        if timestamp >= self.last_timestamp:
+            self.last_value = value
+            self.last_timestamp = timestamp
+            self.last_value_date = create_date
+
+
+class SensorWindowAggregator:
+    def __init__(self, bucket_seconds: int, retention_seconds: int):
+        """
+        Mantém estatísticas incrementais por (water_system_id, sensor_id) em buckets de tempo.
+        :param bucket_seconds: Granularidade dos buckets; limita o erro na borda inicial da janela.
+        :param retention_seconds: Idade máxima dos buckets mantidos em memória.
+        """
+        self.bucket_seconds = bucket_seconds
+        self.retention_seconds = retention_seconds
+        self.started_at = datetime.now(timezone.utc)
+
+        # water_system_id -> sensor_id -> índice do bucket -> acumulador
+        self._buckets: Dict[str, Dict[str, Dict[int, _SensorBucket]]] = {}
+        # water_system_id -> início do primeiro bucket ainda mantido após descartes
+        self._evicted_until: Dict[str, float] = {}
+
+    def add(self, sensor_reading: SensorReadingEvent):
+        """Incorpora uma leitura às estatísticas do bucket correspondente."""
+        timestamp = sensor_reading.create_date.timestamp()
+        bucket_index = int(timestamp // self.bucket_seconds)
+
+        sensors = self._buckets.setdefault(sensor_reading.water_system_id, {})
+        buckets = sensors.setdefault(sensor_reading.sensor_id, {})
+        bucket = buckets.get(bucket_index)
+        if bucket is None:
+            buckets[bucket_index] = _SensorBucket(sensor_reading.value, timestamp, sensor_reading.create_date)
+        else:
+            bucket.add(sensor_reading.value, timestamp, sensor_reading.create_date)
+
+    def covers(self, water_system_id: str, window_start: datetime) -> bool:
+        """Indica se o agregador observou todas as leituras desde o início da janela."""
+        if self.started_at > window_start:
+            return False
+        evicted_until = self._evicted_until.get(water_system_id)
+        return evicted_until is None or evicted_until <= window_start.timestamp()
+
+    def snapshot(self, water_system_id: str, window_start: datetime) -> Optional[Dict[str, SensorWindowStatistics]]:
+        """
+        Retorna as estatísticas por sensor da janela iniciada em window_start e descarta os buckets anteriores.
+        Retorna None quando o agregador não cobre a janela (por exemplo, logo após um restart).
+        """
+        if not self.covers(water_system_id, window_start):
+            return None
+
+        first_bucket_index = int(window_start.timestamp() // self.bucket_seconds)
+        self._evict(water_system_id, first_bucket_index)
+
+        sensors_statistics = {}
+        for sensor_id, buckets in self._buckets.get(water_system_id, {}).items():
+            count = 0
+            total = 0.0
+            min_value = math.inf
+            max_value = -math.inf
+            last = None
+            for bucket in buckets.values():
+                count += bucket.count
+                total += bucket.total
+                min_value = min(min_value, bucket.min_value)
+                max_value = max(max_value, bucket.max_value)
+                if last is None or bucket.last_timestamp >= last.last_timestamp:
+                    last = bucket
+
+            sensors_statistics[sensor_id] = SensorWindowStatistics(
+                sensor_id=sensor_id,
+                mean_value=total / count,
+                min_value=min_value,
+                max_value=max_value,
+                last_value=last.last_value,
+                last_value_date=last.last_value_date,
+                readings_count=count
+            )
+        return sensors_statistics
+
+    def prune(self, now: datetime):
+        """Descarta buckets mais antigos que a retenção configurada em todos os sistemas."""
+        first_bucket_index = int((now.timestamp() - self.retention_seconds) // self.bucket_seconds)
+        for water_system_id in list(self._buckets.keys()):
+            self._evict(water_system_id, first_bucket_index)
+            if not self._buckets[water_system_id]:
+                del self._buckets[water_system_id]
+
+    def _evict(self, water_system_id: str, first_bucket_index: int):
+        sensors = self._buckets.get(water_system_id)
+        if sensors is None:
+            return
+        evicted = False
+        for sensor_id in list(sensors.keys()):
+            buckets = sensors[sensor_id]
+            for bucket_index in [i for i in buckets if i < first_bucket_index]:
+                del buckets[bucket_index]
+                evicted = True
+            if not buckets:
+                del sensors[sensor_id]
+        if evicted:
+            evicted_until = first_bucket_index * self.bucket_seconds
+            self._evicted_until[water_system_id] = max(self._evicted_until.get(water_system_id, evicted_until),
+                                                       evicted_until)
@@ -0,0 +1,205 @@
+import asyncio
+import heapq
+import time
+import zlib
+from typing import Dict, List, Optional, Set, Tuple
+
+from src.application.services.processing_pipeline.processing_pipeline_service import ProcessingPipelineService
+from src.domain.entities.water_system import WaterSystem
+from src.domain.events.water_system_changed_event import WaterSystemChangedEvent, WaterSystemChangeType
+from src.logging_config import get_custom_logger
+
+
+class _ScheduleEntry:
+    __slots__ = ("twinning_rate_seconds", "phase", "due_at", "generation")
+
+    def __init__(self, twinning_rate_seconds: int, phase: float, due_at: float, generation: int):
+        self.twinning_rate_seconds = twinning_rate_seconds
+        self.phase = phase
+        self.due_at = due_at
+        self.generation = generation
+
+
+class TwinningScheduler:
+    def __init__(self, processing_pipeline_service: ProcessingPipelineService, resync_interval_seconds: int):
+        """
+        Agenda o twinning de cada sistema de acordo com o seu twinning_rate_seconds.
+        Os instantes de execução são distribuídos ao longo do intervalo (fase por sistema) para evitar picos de carga.
+        :param processing_pipeline_service: Pipeline usado para processar os sistemas vencidos.
+        :param resync_interval_seconds: Intervalo da reconciliação completa com o banco de dados.
+        """
+        self.logger = get_custom_logger(TwinningScheduler.__name__)
+        self.processing_pipeline_service = processing_pipeline_service
+        self.water_system_repository = processing_pipeline_service.water_system_repository
+        self.resync_interval_seconds = resync_interval_seconds
+
+        # Fila de prioridade (vencimento, geração, water_system_id); entradas de gerações antigas são ignoradas
+        self._heap: List[Tuple[float, int, str]] = []
+        self._entries: Dict[str, _ScheduleEntry] = {}
+        self._generation = 0
+        self._pending_changes: Dict[str, WaterSystemChangeType] = {}
+        self._in_flight: Set[str] = set()
+        self._batch_tasks: Set[asyncio.Task] = set()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._next_resync_at = 0.0
+
+    def start(self):
+        """Inicia o loop de agendamento; a primeira iteração carrega os sistemas monitorados."""
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.get_event_loop().create_task(self._loop())
+        self.logger.info("Twinning scheduler started")
+
+    async def stop(self):
+        """Interrompe o agendamento e aguarda os lotes em execução."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._batch_tasks:
+            await asyncio.gather(*self._batch_tasks, return_exceptions=True)
+
+    def on_water_system_changed(self, event: WaterSystemChangedEvent):
+        """Callback para o WaterSystemChangePublisher: reagenda o sistema alterado no próximo ciclo do loop."""
+        if event.change_type == WaterSystemChangeType.TWINNED:
+            return
+        self._pending_changes[event.water_system_id] = event.change_type
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def on_cluster_membership_changed(self, members: List[str]):
+        """Callback para o ClusterMembershipService: refaz a agenda com a nova partição de sistemas."""
+        self._next_resync_at = 0.0
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def scheduled_count(self) -> int:
+        """Retorna a quantidade de sistemas agendados."""
+        return len(self._entries)
+
+    async def resync(self, spread_evenly: bool = False):
+        """
+        Reconcilia a agenda com os sistemas online no banco de dados.
+        :param spread_evenly: Distribui as fases de todos os sistemas uniformemente pela ordem dos IDs.
+        """
+        water_systems = [
+            ws for ws in await self.water_system_repository.list_water_systems({"status": "online"})
+            if self.processing_pipeline_service.owns_water_system(ws.id)
+        ]
+        online_ids = {ws.id for ws in water_systems}
+
+        for water_system_id in [i for i in self._entries if i not in online_ids]:
+            del self._entries[water_system_id]
+
+        ordered = sorted(water_systems, key=lambda ws: ws.id)
+        for index, water_system in enumerate(ordered):
+            phase = index / len(ordered) if spread_evenly else None
+            self._schedule(water_system, phase)
+
+        self._next_resync_at = time.time() + self.resync_interval_seconds
+
+    def _schedule(self, water_system: WaterSystem, phase: Optional[float] = None):
+        entry = self._entries.get(water_system.id)
+        if entry is not None and phase is None and entry.twinning_rate_seconds == water_system.twinning_rate_seconds:
+            return
+
+        if phase is None:
+            phase = entry.phase if entry is not None else zlib.crc32(water_system.id.encode()) / 2 ** 32
+
+        rate = water_system.twinning_rate_seconds
+        now = time.time()
+        # Próximo instante t > now com t ≡ phase * rate (mod rate), alinhado ao relógio para ser estável entre restarts
+        due_at = now + ((phase * rate - now) % rate or rate)
+
+        self._generation += 1
+        self._entries[water_system.id] = _ScheduleEntry(rate, phase, due_at, self._generation)
+        heapq.heappush(self._heap, (due_at, self._generation, water_system.id))
+
+    async def _apply_pending_changes(self):
+        if not self._pending_changes:
+            return
+        changes, self._pending_changes = self._pending_changes, {}
+
+        for water_system_id in [i for i, change in changes.items() if change == WaterSystemChangeType.DELETED]:
+            self._entries.pop(water_system_id, None)
+
+        changed_ids = [i for i, change in changes.items() if change != WaterSystemChangeType.DELETED]
+        if not changed_ids:
+            return
+        online = [
+            ws for ws in await self.water_system_repository.list_water_systems_by_ids(changed_ids, {"status": "online"})
+            if self.processing_pipeline_service.owns_water_system(ws.id)
+        ]
+        online_ids = {ws.id for ws in online}
+        for water_system_id in changed_ids:
+            if water_system_id not in online_ids:
+                self._entries.pop(water_system_id, None)
+        for water_system in online:
+            self._schedule(water_system)
+
+    def _pop_due(self, now: float) -> List[str]:
+        due_ids = []
+        while self._heap and self._heap[0][0] <= now:
+            due_at, generation, water_system_id = heapq.heappop(self._heap)
+            entry = self._entries.get(water_system_id)
+            if entry is None or entry.generation != generation:
+                continue
+
+            rate = entry.twinning_rate_seconds
+            next_due_at = due_at + rate
+            if next_due_at <= now:
+                next_due_at += ((now - next_due_at) // rate + 1) * rate
+            self._generation += 1
+            entry.due_at = next_due_at
+            entry.generation = self._generation
+            heapq.heappush(self._heap, (next_due_at, self._generation, water_system_id))
+
+            if water_system_id in self._in_flight:
+                self.logger.warning(f"Water System {water_system_id} is still being processed, skipping this slot")
+                continue
+            due_ids.append(water_system_id)
+        return due_ids
+
+    async def _process_batch(self, water_system_ids: List[str]):
+        try:
+            water_systems = await self.water_system_repository.list_water_systems_by_ids(
+                water_system_ids, {"status": "online"}
+            )
+            # A partição pode ter mudado desde o agendamento; o próximo resync remove os sistemas cedidos
+            water_systems = [ws for ws in water_systems if self.processing_pipeline_service.owns_water_system(ws.id)]
+            await self.processing_pipeline_service.process_water_systems(water_systems)
+        except Exception as e:
+            self.logger.error(f"Error when processing scheduled Water Systems: {e}")
+        finally:
+            self._in_flight.difference_update(water_system_ids)
+
+    async def _loop(self):
+        while True:
+            try:
+                await self._apply_pending_changes()
+                if time.time() >= self._next_resync_at:
+                    await self.resync(spread_evenly=not self._entries)
+
+                due_ids = self._pop_due(time.time())
+                if due_ids:
+                    self._in_flight.update(due_ids)
+                    task = asyncio.get_event_loop().create_task(self._process_batch(due_ids))
+                    self._batch_tasks.add(task)
+                    task.add_done_callback(self._batch_tasks.discard)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.logger.error(f"Error in twinning scheduler loop: {e}")
+                if time.time() >= self._next_resync_at:
+                    self._next_resync_at = time.time() + 5
+
+            next_due_at = self._heap[0][0] if self._heap else self._next_resync_at
+            delay = max(0.0, min(next_due_at, self._next_resync_at) - time.time())
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
@@ -0,0 +1,43 @@
+from datetime import datetime, timezone
+from typing import List, Optional
+
+from pydantic import BaseModel, Field, field_validator, model_validator
+
+
+class TwinHistoryReplayRequest(BaseModel):
+    replay_id: Optional[str] = Field(None, description="Identificador do replay; informe um existente para retomá-lo")
+    water_system_ids: List[str] = Field(..., min_length=1, description="Sistemas a reprocessar")
+    start: datetime = Field(..., description="Início do intervalo (inclusive)")
+    end: datetime = Field(..., description="Fim do intervalo (exclusive)")
+    window_seconds: Optional[int] = Field(
+        None, description="Tamanho da janela; por padrão, o twinning_rate_seconds de cada sistema"
+    )
+
+    @field_validator("window_seconds", mode="after")
+    @classmethod
+    def validate_window_seconds(cls, window_seconds):
+        if window_seconds is not None and window_seconds <= 0:
+            raise ValueError("Window must be at least one second.")
+        return window_seconds
+
+    @model_validator(mode="after")
+    def validate_interval(self):
+        # Datas sem fuso são tratadas como UTC, como no serviço
+        start, end = (moment if moment.tzinfo else moment.replace(tzinfo=timezone.utc)
+                      for moment in (self.start, self.end))
+        if end <= start:
+            raise ValueError("End must be after start.")
+        return self
+
+
+class TwinHistoryReplayReport(BaseModel):
+    replay_id: str = Field(...)
+    status: str = Field(..., description="completed, completed_with_errors ou interrupted")
+    water_systems: int = Field(0, description="Sistemas processados")
+    resumed_water_systems: int = Field(0, description="Sistemas retomados de um checkpoint")
+    failed_water_systems: List[str] = Field(default_factory=list)
+    readings: int = Field(0, description="Leituras lidas")
+    windows: int = Field(0, description="Estatísticas (sensor x janela) gravadas")
+    elapsed_seconds: float = Field(0)
+    readings_per_second: float = Field(0)
+    windows_per_second: float = Field(0)
@@ -0,0 +1,300 @@
+import asyncio
+import multiprocessing
+import os
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import numpy
+
+from src.application.services.replay.twin_history_replay_dtos import TwinHistoryReplayRequest, TwinHistoryReplayReport
+from src.application.utils.grouped_reduction_util import GroupedReductionUtil
+from src.domain.repositories.sensor_reading_repository import SensorReadingRepository
+from src.domain.repositories.water_system_repository import WaterSystemRepository
+from src.domain.repositories.water_system_twin_history_repository import WaterSystemTwinHistoryRepository
+from src.infrastructure.adapters.mongodb_adapter import MongoDBAdapter
+from src.infrastructure.config.env_config import EnvConfig, EnvEntry
+from src.logging_config import get_custom_logger
+
+_PROGRESS_LOG_INTERVAL_SECONDS = 10
+
+
+def _as_utc(moment: datetime) -> datetime:
+    """Datas sem fuso são interpretadas como UTC, como faz o driver do MongoDB."""
+    return moment if moment.tzinfo else moment.replace(tzinfo=timezone.utc)
+
+
+class _ReplayChunk:
+    """Bloco de leituras de um sistema cujas janelas terminam antes de `completed_until`."""
+    __slots__ = ("sensor_ids", "timestamps", "values")
+
+    def __init__(self, sensor_ids: List[str], timestamps: numpy.ndarray, values: numpy.ndarray):
+        self.sensor_ids = sensor_ids
+        self.timestamps = timestamps
+        self.values = values
+
+    def split(self, position: int) -> Tuple["_ReplayChunk", "_ReplayChunk"]:
+        return (_ReplayChunk(self.sensor_ids[:position], self.timestamps[:position], self.values[:position]),
+                _ReplayChunk(self.sensor_ids[position:], self.timestamps[position:], self.values[position:]))
+
+    def extend(self, sensor_ids: List[str], timestamps: numpy.ndarray, values: numpy.ndarray) -> "_ReplayChunk":
+        return _ReplayChunk(self.sensor_ids + sensor_ids, numpy.concatenate((self.timestamps, timestamps)),
+                            numpy.concatenate((self.values, values)))
+
+
+class _ReplayProgress:
+    __slots__ = ("readings", "windows", "started_at", "logged_at")
+
+    def __init__(self):
+        self.readings = 0
+        self.windows = 0
+        self.started_at = time.perf_counter()
+        self.logged_at = self.started_at
+
+
+class TwinHistoryReplayService:
+    def __init__(self, mongodb_adapter: Optional[MongoDBAdapter] = None):
+        """
+        Recalcula o histórico do estado dos gêmeos percorrendo um intervalo passado em janelas de twinning.
+        As leituras de cada sistema são lidas em ordem de data por um cursor em blocos; as estatísticas de cada
+        bloco são calculadas em um pool de processos enquanto o bloco seguinte é lido, e gravadas (upsert) na
+        coleção de histórico. O progresso de cada sistema é salvo após cada bloco, permitindo retomar o replay.
+        """
+        env_config = EnvConfig()
+        self.logger = get_custom_logger(TwinHistoryReplayService.__name__)
+        self.sensor_reading_repository = SensorReadingRepository(mongodb_adapter)
+        self.water_system_repository = WaterSystemRepository(mongodb_adapter)
+        self.twin_history_repository = WaterSystemTwinHistoryRepository(mongodb_adapter)
+        self.workers = int(env_config.get(EnvEntry.REPLAY_WORKERS, str(os.cpu_count() or 1)))
+        self.chunk_size = int(env_config.get(EnvEntry.REPLAY_CHUNK_SIZE, "50000"))
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    async def get_status(self, replay_id: str) -> Optional[dict]:
+        """Checkpoint (parâmetros, progresso por sistema, estado e relatório) de um replay."""
+        checkpoint = await self.twin_history_repository.get_checkpoint(replay_id)
+        if checkpoint is not None:
+            checkpoint["replay_id"] = checkpoint.pop("_id")
+        return checkpoint
+
+    async def start(self, request: TwinHistoryReplayRequest) -> str:
+        """
+        Executa o replay em segundo plano; retorna o ID para acompanhamento via get_status.
+        Lança ValueError, antes de agendar, se o replay já está em execução ou existe com outros parâmetros.
+        """
+        replay_id = request.replay_id or uuid.uuid4().hex
+        if replay_id in self._tasks:
+            raise ValueError(f"Replay {replay_id} is already running")
+        await self._load_progress(replay_id, self._parameters(request))
+        if replay_id in self._tasks:
+            raise ValueError(f"Replay {replay_id} is already running")
+        task = asyncio.get_event_loop().create_task(self.replay(request.model_copy(update={"replay_id": replay_id})))
+        self._tasks[replay_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(replay_id, None))
+        return replay_id
+
+    async def stop(self):
+        """Interrompe os replays em segundo plano; eles podem ser retomados pelo mesmo ID."""
+        for task in list(self._tasks.values()):
+            task.cancel()
+        await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+
+    @staticmethod
+    def _parameters(request: TwinHistoryReplayRequest) -> dict:
+        return {"water_system_ids": request.water_system_ids, "start": _as_utc(request.start),
+                "end": _as_utc(request.end), "window_seconds": request.window_seconds}
+
+    async def _load_progress(self, replay_id: str, parameters: dict) -> Dict[str, datetime]:
+        """Progresso por sistema do checkpoint existente; lança ValueError se ele tiver outros parâmetros."""
+        checkpoint = await self.twin_history_repository.get_checkpoint(replay_id)
+        if checkpoint is None:
+            return {}
+        stored = {key: checkpoint.get(key) for key in parameters}
+        stored["start"], stored["end"] = _as_utc(stored["start"]), _as_utc(stored["end"])
+        if stored != parameters:
+            raise ValueError(f"Replay {replay_id} already exists with different parameters")
+        return {water_system_id: _as_utc(completed_until)
+                for water_system_id, completed_until in checkpoint.get("progress", {}).items()}
+
+    async def replay(self, request: TwinHistoryReplayRequest) -> TwinHistoryReplayReport:
+        """
+        Executa (ou retoma, se o replay_id já existir com os mesmos parâmetros) um replay e retorna o relatório.
+        """
+        replay_id = request.replay_id or uuid.uuid4().hex
+        parameters = self._parameters(request)
+        start, end = parameters["start"], parameters["end"]
+        progress = await self._load_progress(replay_id, parameters)
+
+        await self.twin_history_repository.ensure_indexes()
+        await self.twin_history_repository.create_checkpoint(replay_id, parameters)
+        self.logger.info(f"Replay {replay_id} started: {len(request.water_system_ids)} Water Systems "
+                         f"from {start.isoformat()} to {end.isoformat()} with {self.workers} workers"
+                         + (f", resuming {len(progress)} from checkpoint" if progress else ""))
+
+        replay_progress = _ReplayProgress()
+        semaphore = asyncio.Semaphore(self.workers)
+        # spawn evita herdar, via fork, os locks das threads do driver e do event loop
+        executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+        # Se o replay for interrompido, o checkpoint registra o progresso e ele pode ser retomado pelo mesmo ID
+        status = "interrupted"
+        failed = []
+        try:
+            async def replay_limited(water_system_id: str) -> bool:
+                async with semaphore:
+                    try:
+                        await self._replay_water_system(
+                            replay_id, water_system_id, progress.get(water_system_id, start), start, end,
+                            request.window_seconds, executor, replay_progress
+                        )
+                        return True
+                    except asyncio.CancelledError:
+                        raise
+                    except Exception as e:
+                        self.logger.error(f"Replay {replay_id} failed for Water System {water_system_id}: {e}")
+                        return False
+
+            results = await asyncio.gather(*(replay_limited(ws_id) for ws_id in request.water_system_ids))
+            failed = [ws_id for ws_id, succeeded in zip(request.water_system_ids, results) if not succeeded]
+            status = "completed_with_errors" if failed else "completed"
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+            elapsed = time.perf_counter() - replay_progress.started_at
+            report = TwinHistoryReplayReport(
+                replay_id=replay_id,
+                status=status,
+                water_systems=len(request.water_system_ids),
+                resumed_water_systems=len(progress),
+                failed_water_systems=failed,
+                readings=replay_progress.readings,
+                windows=replay_progress.windows,
+                elapsed_seconds=round(elapsed, 3),
+                readings_per_second=round(replay_progress.readings / elapsed, 1) if elapsed > 0 else 0,
+                windows_per_second=round(replay_progress.windows / elapsed, 1) if elapsed > 0 else 0
+            )
+            await asyncio.shield(self.twin_history_repository.finish_checkpoint(replay_id, report.status, report.model_dump()))
+        self.logger.info(f"Replay {replay_id} {report.status}: {report.readings} readings, {report.windows} windows "
+                         f"in {report.elapsed_seconds:.1f} s ({report.readings_per_second:.0f} readings/s, "
+                         f"{report.windows_per_second:.0f} windows/s)")
+        return report
+
+    async def _replay_water_system(
+            self,
+            replay_id: str,
+            water_system_id: str,
+            resume_from: datetime,
+            start: datetime,
+            end: datetime,
+            window_seconds: Optional[int],
+            executor: ProcessPoolExecutor,
+            replay_progress: _ReplayProgress
+    ):
+        if resume_from >= end:
+            return
+        if window_seconds is None:
+            water_system = await self.water_system_repository.get_water_system_by_id(water_system_id)
+            if water_system is None:
+                raise ValueError("Water System not found")
+            window_seconds = water_system.twinning_rate_seconds
+
+        # As janelas são alinhadas ao início do intervalo, então o checkpoint é sempre o início de uma janela
+        origin = start.timestamp()
+        loop = asyncio.get_event_loop()
+        pending: Optional[Tuple[asyncio.Future, List[str], float]] = None
+        carried: Optional[_ReplayChunk] = None
+
+        async for sensor_ids, timestamps, values in self.sensor_reading_repository.iterate_reading_columns(
+                water_system_id, resume_from, end, self.chunk_size
+        ):
+            replay_progress.readings += len(sensor_ids)
+            chunk = carried.extend(sensor_ids, timestamps, values) if carried is not None \
+                else _ReplayChunk(sensor_ids, timestamps, values)
+            # Leituras da última janela do bloco podem continuar no bloco seguinte e ficam para ele
+            last_window_start = origin + (chunk.timestamps[-1] - origin) // window_seconds * window_seconds
+            complete, carried = chunk.split(int(numpy.searchsorted(chunk.timestamps, last_window_start, side="left")))
+            if len(complete.sensor_ids) == 0:
+                continue
+
+            computation = self._submit(loop, executor, complete, origin, window_seconds)
+            if pending is not None:
+                await self._write(replay_id, water_system_id, pending, origin, window_seconds, end, replay_progress)
+            pending = (computation, self._sensor_names(complete), last_window_start)
+
+        if carried is not None and len(carried.sensor_ids) > 0:
+            computation = self._submit(loop, executor, carried, origin, window_seconds)
+            if pending is not None:
+                await self._write(replay_id, water_system_id, pending, origin, window_seconds, end, replay_progress)
+            pending = (computation, self._sensor_names(carried), end.timestamp())
+        if pending is not None:
+            await self._write(replay_id, water_system_id, pending[:2] + (end.timestamp(),), origin, window_seconds,
+                              end, replay_progress)
+        else:
+            await self.twin_history_repository.save_progress(replay_id, water_system_id, end)
+
+    @staticmethod
+    def _sensor_names(chunk: _ReplayChunk) -> List[str]:
+        return list(dict.fromkeys(chunk.sensor_ids))
+
+    @staticmethod
+    def _submit(loop, executor: ProcessPoolExecutor, chunk: _ReplayChunk, origin: float, window_seconds: int) \
+            -> asyncio.Future:
+        sensor_codes_by_name: Dict[str, int] = {}
+        sensor_codes = numpy.array(
+            [sensor_codes_by_name.setdefault(sensor_id, len(sensor_codes_by_name)) for sensor_id in chunk.sensor_ids],
+            dtype=numpy.int64
+        )
+        valid = ~numpy.isnan(chunk.values)
+        return loop.run_in_executor(
+            executor, GroupedReductionUtil.windowed_statistics,
+            sensor_codes[valid], chunk.timestamps[valid], chunk.values[valid], origin, float(window_seconds),
+            max(1, len(sensor_codes_by_name))
+        )
+
+    async def _write(
+            self,
+            replay_id: str,
+            water_system_id: str,
+            pending: Tuple[asyncio.Future, List[str], float],
+            origin: float,
+            window_seconds: int,
+            end: datetime,
+            replay_progress: _ReplayProgress
+    ):
+        computation, sensor_names, completed_until = pending
+        window_indexes, sensor_codes, counts, means, minimums, maximums, last_timestamps, last_values = await computation
+
+        computed_at = datetime.now(timezone.utc)
+        window = timedelta(seconds=window_seconds)
+        documents = []
+        for window_index, sensor_code, count, mean, minimum, maximum, last_timestamp, last_value in zip(
+                window_indexes.tolist(), sensor_codes.tolist(), counts.tolist(), means.tolist(), minimums.tolist(),
+                maximums.tolist(), last_timestamps.tolist(), last_values.tolist()
+        ):
+            window_start = datetime.fromtimestamp(origin + window_index * window_seconds, tz=timezone.utc)
+            documents.append({
+                "water_system_id": water_system_id,
+                "sensor_id": sensor_names[sensor_code],
+                "window_start": window_start,
+                "window_end": min(window_start + window, end),
+                "mean_value": mean,
+                "min_value": minimum,
+                "max_value": maximum,
+                "last_value": last_value,
+                "last_value_date": datetime.fromtimestamp(last_timestamp, tz=timezone.utc),
+                "readings_count": count,
+                "replay_id": replay_id,
+                "computed_at": computed_at,
+            })
+
+        await self.twin_history_repository.write_windows(documents)
+        await self.twin_history_repository.save_progress(
+            replay_id, water_system_id, datetime.fromtimestamp(completed_until, tz=timezone.utc)
+        )
+        replay_progress.windows += len(documents)
+
+        now = time.perf_counter()
+        if now - replay_progress.logged_at >= _PROGRESS_LOG_INTERVAL_SECONDS:
+            replay_progress.logged_at = now
+            elapsed = now - replay_progress.started_at
+            self.logger.info(f"Replay {replay_id}: {replay_progress.readings} readings, {replay_progress.windows} "
+                             f"windows ({replay_progress.readings / elapsed:.0f} readings/s)")
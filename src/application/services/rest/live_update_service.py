@@ -0,0 +1,178 @@
+import asyncio
+import json
+from typing import List, Optional
+
+from fastapi import Depends, HTTPException, Query, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+
+from src.application.services.event.water_system_live_update_hub import WaterSystemLiveUpdateHub, \
+    LiveUpdateSubscriber, LiveUpdateMessage, SNAPSHOT_CHANGE_TYPE
+from src.application.services.rest.rest_service import get_repository, get_water_system_cache
+from src.application.services.rest.water_system_cache import WaterSystemCache, CachedResponse
+from src.domain.repositories.water_system_repository import WaterSystemRepository
+from src.infrastructure.metrics.application_metrics import LIVE_UPDATE_MESSAGES_SENT
+from src.logging_config import get_custom_logger
+
+logger = get_custom_logger("LiveUpdateService")
+
+# Fechamento WebSocket: 1008 = violação de política, 1013 = tente novamente mais tarde
+_WEBSOCKET_POLICY_VIOLATION = 1008
+_WEBSOCKET_TRY_AGAIN_LATER = 1013
+
+
+def get_live_update_hub(request: Request) -> WaterSystemLiveUpdateHub:
+    hub = getattr(request.app.state, "live_update_hub", None)
+    if hub is None:
+        raise HTTPException(status_code=404, detail="Live updates are disabled")
+    return hub
+
+
+def parse_water_system_ids(water_system_ids: Optional[str]) -> List[str]:
+    return [water_system_id.strip() for water_system_id in (water_system_ids or "").split(",") if water_system_id.strip()]
+
+
+async def load_snapshot(
+        water_system_id: str,
+        repository: WaterSystemRepository,
+        cache: Optional[WaterSystemCache]
+) -> LiveUpdateMessage:
+    """Estado atual de um sistema (do cache quando possível); `water_system` é null se ele não existir."""
+    cached_response = cache.get(water_system_id) if cache is not None else None
+    if cached_response is None:
+        cache_version = cache.version if cache is not None else None
+        try:
+            water_system = await repository.get_water_system_by_id(water_system_id)
+        except Exception as e:
+            logger.warning(f"Could not load Water System {water_system_id} for live updates: {e}")
+            water_system = None
+        if water_system is None:
+            return LiveUpdateMessage(water_system_id, SNAPSHOT_CHANGE_TYPE)
+        cached_response = cache.put(water_system, cache_version) if cache is not None \
+            else CachedResponse.from_water_system(water_system)
+    return LiveUpdateMessage(water_system_id, SNAPSHOT_CHANGE_TYPE, cached_response.body)
+
+
+async def subscribe_with_snapshots(
+        hub: WaterSystemLiveUpdateHub,
+        subscriber: LiveUpdateSubscriber,
+        water_system_ids: List[str],
+        repository: WaterSystemRepository,
+        cache: Optional[WaterSystemCache]
+) -> List[str]:
+    """
+    Inscreve a conexão e enfileira o estado atual de cada sistema adicionado.
+    A inscrição acontece antes da leitura, então nenhuma alteração concorrente é perdida.
+    """
+    added = hub.subscribe(subscriber, water_system_ids)
+    snapshots = await asyncio.gather(*(load_snapshot(water_system_id, repository, cache) for water_system_id in added))
+    for snapshot in snapshots:
+        subscriber.offer(snapshot, replace=False)
+    return added
+
+
+async def stream_server_sent_events(hub: WaterSystemLiveUpdateHub, subscriber: LiveUpdateSubscriber):
+    sent = LIVE_UPDATE_MESSAGES_SENT.labels("sse")
+    while True:
+        try:
+            messages = await asyncio.wait_for(subscriber.next_messages(), hub.keepalive_seconds)
+        except asyncio.TimeoutError:
+            yield b": keepalive\n\n"
+            continue
+        sent.inc(len(messages))
+        yield b"".join(message.sse_frame for message in messages)
+
+
+class LiveUpdateService:
+    @staticmethod
+    async def stream_water_system_updates(
+            water_system_ids: str = Query(..., alias="ids", description="IDs dos sistemas, separados por vírgula"),
+            hub: WaterSystemLiveUpdateHub = Depends(get_live_update_hub),
+            repository: WaterSystemRepository = Depends(get_repository),
+            cache: Optional[WaterSystemCache] = Depends(get_water_system_cache)
+    ):
+        """
+        Acompanha os sistemas informados via Server-Sent Events.
+        O primeiro evento de cada sistema é o seu estado atual (`snapshot`); os seguintes são as alterações.
+        """
+        ids = parse_water_system_ids(water_system_ids)
+        if not ids:
+            raise HTTPException(status_code=400, detail="At least one Water System ID is required")
+        if len(ids) > hub.max_water_systems_per_subscriber:
+            raise HTTPException(status_code=400, detail=f"At most {hub.max_water_systems_per_subscriber} "
+                                                        f"Water Systems can be followed per connection")
+        subscriber = hub.connect("sse")
+        if subscriber is None:
+            raise HTTPException(status_code=503, detail="Too many live update connections")
+        await subscribe_with_snapshots(hub, subscriber, ids, repository, cache)
+        return StreamingResponse(
+            stream_server_sent_events(hub, subscriber),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+            # Executada também quando o cliente desconecta
+            background=BackgroundTask(hub.disconnect, subscriber)
+        )
+
+    @staticmethod
+    async def websocket_water_system_updates(websocket: WebSocket, water_system_ids: Optional[str] = Query(None, alias="ids")):
+        """
+        Acompanha sistemas via WebSocket.
+        O cliente altera as inscrições enviando {"action": "subscribe" | "unsubscribe", "water_system_ids": [...]};
+        cada frame enviado pelo servidor é uma atualização de um sistema.
+        """
+        hub: Optional[WaterSystemLiveUpdateHub] = getattr(websocket.app.state, "live_update_hub", None)
+        await websocket.accept()
+        if hub is None:
+            await websocket.close(code=_WEBSOCKET_POLICY_VIOLATION, reason="Live updates are disabled")
+            return
+        subscriber = hub.connect("websocket")
+        if subscriber is None:
+            await websocket.close(code=_WEBSOCKET_TRY_AGAIN_LATER, reason="Too many live update connections")
+            return
+
+        repository = WaterSystemRepository(websocket.app.state.mongodb_adapter)
+        cache = getattr(websocket.app.state, "water_system_cache", None)
+        sender = asyncio.get_event_loop().create_task(LiveUpdateService._send_updates(websocket, hub, subscriber))
+        try:
+            await subscribe_with_snapshots(hub, subscriber, parse_water_system_ids(water_system_ids), repository, cache)
+            while not sender.done():
+                try:
+                    command = json.loads(await websocket.receive_text())
+                    action = command.get("action")
+                    ids = [str(water_system_id) for water_system_id in command.get("water_system_ids", [])]
+                except (ValueError, AttributeError, TypeError):
+                    await websocket.send_text(json.dumps({"error": "Invalid command"}))
+                    continue
+                if action == "subscribe":
+                    requested = [water_system_id for water_system_id in dict.fromkeys(ids)
+                                 if water_system_id not in subscriber.water_system_ids]
+                    added = await subscribe_with_snapshots(hub, subscriber, requested, repository, cache)
+                    if len(added) < len(requested):
+                        await websocket.send_text(json.dumps({
+                            "error": f"At most {hub.max_water_systems_per_subscriber} Water Systems "
+                                     f"can be followed per connection"
+                        }))
+                elif action == "unsubscribe":
+                    hub.unsubscribe(subscriber, ids)
+                else:
+                    await websocket.send_text(json.dumps({"error": f"Unknown action '{action}'"}))
+        except WebSocketDisconnect:
+            pass
+        finally:
+            hub.disconnect(subscriber)
+            sender.cancel()
+
+    @staticmethod
+    async def _send_updates(websocket: WebSocket, hub: WaterSystemLiveUpdateHub, subscriber: LiveUpdateSubscriber):
+        sent = LIVE_UPDATE_MESSAGES_SENT.labels("websocket")
+        try:
+            while True:
+                for message in await subscriber.next_messages():
+                    await asyncio.wait_for(websocket.send_text(message.text), hub.send_timeout_seconds)
+                    sent.inc()
+        except asyncio.TimeoutError:
+            # Enquanto o envio estava bloqueado as atualizações foram coalescidas; um consumidor parado é desconectado
+            logger.warning(f"Live update WebSocket did not accept data for {hub.send_timeout_seconds} seconds, closing it")
+            await websocket.close(code=_WEBSOCKET_TRY_AGAIN_LATER)
+        except (WebSocketDisconnect, RuntimeError):
+            pass
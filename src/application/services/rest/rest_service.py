@@ -1,66 +1,318 @@
-from fastapi import Depends, HTTPException
+from datetime import datetime, timezone
+from typing import Optional, AsyncIterator
 
-from src.application.services.rest.rest_service_dtos import WaterSystemCreateUpdateRequest
-from src.domain.entities.water_system import WaterSystem
+from bson import ObjectId
+from fastapi import Depends, HTTPException, Request, Response, Query
+from fastapi.responses import StreamingResponse
+from pydantic_core import to_json
+
+from src.application.services.event.water_system_change_publisher import WaterSystemChangePublisher, \
+    get_change_publisher
+from src.application.services.export.sensor_reading_export_service import SensorReadingExportService, ExportFormat, \
+    EXPORT_MEDIA_TYPES, EXPORT_FILE_EXTENSIONS, import_pyarrow, validate_compression
+from src.application.services.rest.rest_service_dtos import WaterSystemCreateUpdateRequest, WaterSystemListFormat, \
+    DownsamplingMethod, SensorReadingsSeriesResponse
+from src.application.services.processing_pipeline.hot_window_store import HotWindowStore
+from src.application.services.rest.water_system_cache import WaterSystemCache, CachedResponse
+from src.application.services.rollup.sensor_reading_rollup_service import SensorReadingRollupService, \
+    SensorReadingSeries
+from src.application.utils.downsampling_util import DownsamplingUtil
+from src.domain.entities.water_system import WaterSystem, WaterSystemType
+from src.domain.events.water_system_changed_event import WaterSystemChangedEvent, WaterSystemChangeType
+from src.domain.repositories.sensor_reading_repository import SensorReadingRepository, SensorReadingsQuery
 from src.domain.repositories.water_system_repository import WaterSystemRepository
+from src.infrastructure.adapters.mongodb_adapter import MongoDBAdapter
+from src.infrastructure.config.env_config import EnvConfig, EnvEntry
+
+
+def get_mongodb_adapter(request: Request) -> MongoDBAdapter:
+    return request.app.state.mongodb_adapter
+
+
+def get_repository(mongodb_adapter: MongoDBAdapter = Depends(get_mongodb_adapter)) -> WaterSystemRepository:
+    return WaterSystemRepository(mongodb_adapter)
+
+
+def get_sensor_reading_repository(
+        mongodb_adapter: MongoDBAdapter = Depends(get_mongodb_adapter)
+) -> SensorReadingRepository:
+    return SensorReadingRepository(mongodb_adapter)
+
+
+def get_water_system_cache(request: Request) -> Optional[WaterSystemCache]:
+    return getattr(request.app.state, "water_system_cache", None)
+
+
+def get_rollup_service(request: Request) -> Optional[SensorReadingRollupService]:
+    return getattr(request.app.state, "sensor_reading_rollup_service", None)
+
+
+def get_hot_window_store(request: Request) -> Optional[HotWindowStore]:
+    return getattr(request.app.state, "hot_window_store", None)
 
 
-def get_repository() -> WaterSystemRepository:
-    return WaterSystemRepository()
+def build_cached_response(request: Request, cached_response: CachedResponse) -> Response:
+    """Retorna 304 quando o If-None-Match do cliente corresponde ao ETag, evitando reenviar o corpo."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        client_etags = {etag.strip().removeprefix("W/") for etag in if_none_match.split(",")}
+        if cached_response.etag in client_etags or "*" in client_etags:
+            return Response(status_code=304, headers={"ETag": cached_response.etag})
+    return Response(content=cached_response.body, media_type="application/json", headers={"ETag": cached_response.etag})
+
+
+def build_projection(fields: Optional[str], exclude: Optional[str]) -> Optional[dict]:
+    """
+    Converte as listas de campos (separados por vírgula) da query string em uma projeção do MongoDB.
+    O `_id` (exposto como `id`) é sempre retornado, pois serve de cursor da paginação.
+    """
+    if fields and exclude:
+        raise HTTPException(status_code=400, detail="Use either 'fields' or 'exclude', not both")
+    selected, value = (fields, 1) if fields else (exclude, 0)
+    if not selected:
+        return None
+    names = [field.strip() for field in selected.split(",")]
+    return {name: value for name in names if name and name not in ("id", "_id")}
+
+
+def serialize_water_system_document(document: dict, projected: bool) -> bytes:
+    """Serializa um documento; documentos completos são validados pelo modelo, projeções são enviadas como estão."""
+    if projected:
+        return to_json(document)
+    return WaterSystem.model_validate(document).model_dump_json().encode()
+
+
+def build_water_system(water_system_req: WaterSystemCreateUpdateRequest) -> WaterSystem:
+    return WaterSystem(
+        name=water_system_req.name,
+        location=water_system_req.location,
+        capacityCubicMeters=water_system_req.capacity,
+        system_type=water_system_req.system_type,
+        sensors=water_system_req.sensors,
+        twinning_rate_seconds=water_system_req.twinning_rate_seconds
+    )
+
+
+async def stream_ndjson(documents: AsyncIterator[dict], projected: bool) -> AsyncIterator[bytes]:
+    async for document in documents:
+        yield serialize_water_system_document(document, projected) + b"\n"
 
 
 class RestService:
     @staticmethod
     async def create_water_system(
-            water_system_req: WaterSystemCreateUpdateRequest, repository: WaterSystemRepository = Depends(get_repository)
+            water_system_req: WaterSystemCreateUpdateRequest,
+            repository: WaterSystemRepository = Depends(get_repository),
+            publisher: WaterSystemChangePublisher = Depends(get_change_publisher)
     ):
         """Cria um novo WaterSystem."""
-        water_system = WaterSystem(
-            name=water_system_req.name,
-            location=water_system_req.location,
-            capacityCubicMeters=water_system_req.capacity,
-            system_type=water_system_req.system_type,
-            sensors=water_system_req.sensors,
-            twinning_rate_seconds=water_system_req.twinning_rate_seconds
-        )
-        water_system_id = await repository.create_water_system(water_system)
+        water_system_id = await repository.create_water_system(build_water_system(water_system_req))
+        publisher.publish(WaterSystemChangedEvent(water_system_id=water_system_id, change_type=WaterSystemChangeType.CREATED))
         return water_system_id
 
     @staticmethod
     async def get_water_system(
-            water_system_id: str, repository: WaterSystemRepository = Depends(get_repository)
+            water_system_id: str,
+            request: Request,
+            repository: WaterSystemRepository = Depends(get_repository),
+            cache: Optional[WaterSystemCache] = Depends(get_water_system_cache)
     ):
         """Retorna um WaterSystem pelo ID."""
-        result = await repository.get_water_system_by_id(water_system_id)
-        if not result:
-            raise HTTPException(status_code=404, detail="WaterSystem not found")
-        return result
+        cached_response = cache.get(water_system_id) if cache is not None else None
+        if cached_response is None:
+            cache_version = cache.version if cache is not None else None
+            result = await repository.get_water_system_by_id(water_system_id)
+            if not result:
+                raise HTTPException(status_code=404, detail="WaterSystem not found")
+            cached_response = cache.put(result, cache_version) if cache is not None \
+                else CachedResponse.from_water_system(result)
+        return build_cached_response(request, cached_response)
 
     @staticmethod
     async def update_water_system(
             water_system_id: str,
             water_system_req: WaterSystemCreateUpdateRequest,
             repository: WaterSystemRepository = Depends(get_repository),
+            publisher: WaterSystemChangePublisher = Depends(get_change_publisher)
     ):
         """Atualiza um WaterSystem pelo ID."""
         updated_count = await repository.update_water_system(water_system_id, water_system_req)
         if updated_count == 0:
             raise HTTPException(status_code=404, detail="WaterSystem not found")
+        publisher.publish(WaterSystemChangedEvent(water_system_id=water_system_id, change_type=WaterSystemChangeType.UPDATED))
         return updated_count
 
     @staticmethod
     async def delete_water_system(
-            water_system_id: str, repository: WaterSystemRepository = Depends(get_repository)
+            water_system_id: str,
+            repository: WaterSystemRepository = Depends(get_repository),
+            publisher: WaterSystemChangePublisher = Depends(get_change_publisher)
     ):
         """Deleta um WaterSystem pelo ID."""
         deleted_count = await repository.delete_water_system(water_system_id)
         if deleted_count == 0:
             raise HTTPException(status_code=404, detail="WaterSystem not found")
+        publisher.publish(WaterSystemChangedEvent(water_system_id=water_system_id, change_type=WaterSystemChangeType.DELETED))
         return deleted_count
 
     @staticmethod
     async def list_water_systems(
-            repository: WaterSystemRepository = Depends(get_repository)
+            request: Request,
+            status: Optional[str] = Query(None, description="Filtra pelo estado do sistema"),
+            system_type: Optional[WaterSystemType] = Query(None, description="Filtra pelo tipo do sistema"),
+            after: Optional[str] = Query(None, description="Cursor: ID do último sistema da página anterior"),
+            limit: Optional[int] = Query(None, gt=0, le=10000, description="Tamanho da página"),
+            fields: Optional[str] = Query(None, description="Campos a retornar, separados por vírgula"),
+            exclude: Optional[str] = Query(None, description="Campos a omitir, separados por vírgula (ex.: sensors)"),
+            response_format: WaterSystemListFormat = Query(WaterSystemListFormat.JSON, alias="format"),
+            repository: WaterSystemRepository = Depends(get_repository),
+            cache: Optional[WaterSystemCache] = Depends(get_water_system_cache)
     ):
-        """Lista todos os WaterSystems."""
-        return await repository.list_water_systems()
+        """
+        Lista os WaterSystems.
+        Suporta paginação por cursor (ID), filtros, projeção de campos e streaming NDJSON.
+        O cursor da próxima página é retornado no header X-Next-Cursor.
+        """
+        stream = response_format == WaterSystemListFormat.NDJSON \
+            or "application/x-ndjson" in request.headers.get("accept", "")
+        if any([status, system_type, after, limit, fields, exclude, stream]):
+            return await RestService._list_water_systems_page(
+                repository, status, system_type, after, limit, fields, exclude, stream
+            )
+
+        cached_response = cache.get_list() if cache is not None else None
+        if cached_response is None:
+            cache_version = cache.version if cache is not None else None
+            result = await repository.list_water_systems()
+            cached_response = cache.put_list(result, cache_version) if cache is not None \
+                else CachedResponse.from_water_systems(result)
+        return build_cached_response(request, cached_response)
+
+    @staticmethod
+    async def get_sensor_readings(
+            water_system_id: str,
+            sensor_id: str,
+            start: datetime = Query(..., description="Início do intervalo"),
+            end: Optional[datetime] = Query(None, description="Fim do intervalo (padrão: agora)"),
+            points: int = Query(1000, ge=3, le=20000, description="Quantidade máxima de pontos retornados"),
+            method: DownsamplingMethod = Query(DownsamplingMethod.LTTB),
+            repository: SensorReadingRepository = Depends(get_sensor_reading_repository),
+            hot_window_store: Optional[HotWindowStore] = Depends(get_hot_window_store),
+            rollup_service: Optional[SensorReadingRollupService] = Depends(get_rollup_service)
+    ):
+        """
+        Retorna a série histórica de um sensor, reduzida para no máximo `points` pontos.
+        Com rollups habilitados, intervalos longos são lidos do tier mais grosso que atende a resolução pedida.
+        """
+        # Datas sem fuso são interpretadas como UTC, como faz o driver do MongoDB
+        start = start if start.tzinfo else start.replace(tzinfo=timezone.utc)
+        end = end if end is None or end.tzinfo else end.replace(tzinfo=timezone.utc)
+        query = SensorReadingsQuery(
+            water_system_id=water_system_id,
+            sensor_id=sensor_id,
+            start_date=start,
+            end_date=end or datetime.now(timezone.utc)
+        )
+        if hot_window_store is not None and hot_window_store.covers(water_system_id, start, sensor_id):
+            series = SensorReadingSeries.from_readings(
+                *hot_window_store.series(water_system_id, sensor_id, query.start_date, query.end_date), source="hot_window"
+            )
+        elif rollup_service is not None:
+            series = await rollup_service.find_series(query, points)
+        else:
+            series = SensorReadingSeries.from_readings(*await repository.find_reading_series(query))
+        response = SensorReadingsSeriesResponse(
+            water_system_id=water_system_id, sensor_id=sensor_id, method=method,
+            total_points=int(series.counts.sum()), source=series.source
+        )
+
+        timestamps, values = series.timestamps, series.values
+        if method == DownsamplingMethod.LTTB:
+            timestamps, values = DownsamplingUtil.lttb(timestamps, values, points)
+        else:
+            timestamps, values, min_values, max_values = DownsamplingUtil.bucket_statistics(
+                timestamps, values, points, series.counts, series.min_values, series.max_values
+            )
+            response.min_values = min_values.tolist()
+            response.max_values = max_values.tolist()
+
+        response.timestamps = [datetime.fromtimestamp(t, tz=timezone.utc) for t in timestamps.tolist()]
+        response.values = values.tolist()
+        return response
+
+    @staticmethod
+    async def export_sensor_readings(
+            water_system_id: str,
+            start: datetime = Query(..., description="Início do intervalo"),
+            end: Optional[datetime] = Query(None, description="Fim do intervalo (padrão: agora)"),
+            sensor_id: Optional[str] = Query(None, description="Exporta apenas as leituras deste sensor"),
+            export_format: ExportFormat = Query(ExportFormat.PARQUET, alias="format"),
+            compression: Optional[str] = Query(None, description="Codec de compressão (zstd, lz4...)"),
+            repository: SensorReadingRepository = Depends(get_sensor_reading_repository)
+    ):
+        """
+        Exporta as leituras de um sistema no intervalo como Arrow IPC (stream) ou Parquet.
+        A resposta é transmitida conforme os lotes do cursor são convertidos, sem montar o resultado em memória.
+        """
+        try:
+            import_pyarrow()
+        except ImportError as e:
+            raise HTTPException(status_code=501, detail=str(e))
+        # Validado antes da resposta: depois que o streaming começa não é mais possível retornar um erro
+        try:
+            validate_compression(export_format, compression)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        start = start if start.tzinfo else start.replace(tzinfo=timezone.utc)
+        end = end if end is None or end.tzinfo else end.replace(tzinfo=timezone.utc)
+        query = SensorReadingsQuery(
+            water_system_id=water_system_id,
+            sensor_id=sensor_id,
+            start_date=start,
+            end_date=end or datetime.now(timezone.utc)
+        )
+        export_service = SensorReadingExportService(
+            repository, int(EnvConfig().get(EnvEntry.EXPORT_BATCH_SIZE, "65536"))
+        )
+        filename = f"{water_system_id}-readings.{EXPORT_FILE_EXTENSIONS[export_format]}"
+        return StreamingResponse(
+            export_service.stream(query, export_format, compression),
+            media_type=EXPORT_MEDIA_TYPES[export_format],
+            headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+        )
+
+    @staticmethod
+    async def _list_water_systems_page(
+            repository: WaterSystemRepository,
+            status: Optional[str],
+            system_type: Optional[WaterSystemType],
+            after: Optional[str],
+            limit: Optional[int],
+            fields: Optional[str],
+            exclude: Optional[str],
+            stream: bool
+    ) -> Response:
+        if after and not ObjectId.is_valid(after):
+            raise HTTPException(status_code=400, detail="Invalid 'after' cursor")
+        filter_query = {}
+        if status:
+            filter_query["status"] = status
+        if system_type:
+            filter_query["system_type"] = system_type.value
+        projection = build_projection(fields, exclude)
+        projected = projection is not None
+
+        documents = repository.iterate_water_system_documents(filter_query, after, limit, projection)
+        if stream:
+            return StreamingResponse(stream_ndjson(documents, projected), media_type="application/x-ndjson")
+
+        items = []
+        last_id = None
+        async for document in documents:
+            last_id = document["id"]
+            items.append(serialize_water_system_document(document, projected))
+
+        headers = {}
+        if limit and len(items) == limit:
+            headers["X-Next-Cursor"] = last_id
+        return Response(content=b"[" + b",".join(items) + b"]", media_type="application/json", headers=headers)
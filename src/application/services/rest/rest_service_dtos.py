@@ -1,6 +1,8 @@
+from datetime import datetime
+from enum import Enum
 from typing import Optional, List
 
-from pydantic import Field, BaseModel, field_validator
+from pydantic import Field, BaseModel, field_validator, ConfigDict
 
 from src.domain.entities.water_system import WaterSystemType
 from src.domain.entities.water_system_sensor import WaterSystemSensor
@@ -11,7 +13,7 @@ class WaterSystemCreateUpdateRequest(BaseModel):
     location: Optional[str] = Field(None)
     capacity: Optional[float] = Field(None)
     system_type: WaterSystemType = Field(...)
-    sensors: List[WaterSystemSensor] = Field(default_factory=lambda: list)
+    sensors: List[WaterSystemSensor] = Field(default_factory=list)
     status: Optional[str] = Field("online")
     twinning_rate_seconds: Optional[int] = Field(60)
 
@@ -21,3 +23,61 @@ class WaterSystemCreateUpdateRequest(BaseModel):
         if twinning_rate_seconds < 60:
             raise ValueError("Twinning rate must be at least 60.")
         return twinning_rate_seconds
+
+
+class WaterSystemBatchUpdateItem(BaseModel):
+    """Linha do PATCH em lote: o ID e apenas os campos a alterar."""
+    model_config = ConfigDict(extra="forbid")
+
+    id: str = Field(...)
+    name: Optional[str] = Field(None)
+    location: Optional[str] = Field(None)
+    capacity: Optional[float] = Field(None)
+    system_type: Optional[WaterSystemType] = Field(None)
+    sensors: Optional[List[WaterSystemSensor]] = Field(None)
+    status: Optional[str] = Field(None)
+    twinning_rate_seconds: Optional[int] = Field(None)
+
+    @field_validator("name", "system_type", "sensors", "status", "twinning_rate_seconds", mode="before")
+    @classmethod
+    def reject_null(cls, value):
+        # Campos obrigatórios no WaterSystem: gravar null tornaria o documento inválido para as leituras
+        if value is None:
+            raise ValueError("Field cannot be null.")
+        return value
+
+    @field_validator("twinning_rate_seconds", mode="after")
+    @classmethod
+    def validate_twinning_rate(cls, twinning_rate_seconds):
+        if twinning_rate_seconds is not None and twinning_rate_seconds < 60:
+            raise ValueError("Twinning rate must be at least 60.")
+        return twinning_rate_seconds
+
+    def to_update_fields(self) -> dict:
+        """Campos informados na linha, com os nomes usados no documento do WaterSystem."""
+        fields = self.model_dump(exclude_unset=True, exclude={"id"})
+        if "capacity" in fields:
+            fields["capacityCubicMeters"] = fields.pop("capacity")
+        return fields
+
+
+class WaterSystemListFormat(str, Enum):
+    JSON = "json"
+    NDJSON = "ndjson"
+
+
+class DownsamplingMethod(str, Enum):
+    LTTB = "lttb"
+    BUCKET = "bucket"
+
+
+class SensorReadingsSeriesResponse(BaseModel):
+    water_system_id: str = Field(...)
+    sensor_id: str = Field(...)
+    method: DownsamplingMethod = Field(...)
+    total_points: int = Field(..., description="Quantidade de leituras no intervalo antes da redução")
+    source: str = Field("raw", description="Origem dos dados: raw, hot_window, minute, hour ou combinação (ex.: hour+raw)")
+    timestamps: List[datetime] = Field(default_factory=list)
+    values: List[float] = Field(default_factory=list, description="Valor (lttb) ou média do bucket (bucket)")
+    min_values: Optional[List[float]] = Field(None, description="Mínimo de cada bucket (apenas bucket)")
+    max_values: Optional[List[float]] = Field(None, description="Máximo de cada bucket (apenas bucket)")
@@ -0,0 +1,298 @@
+import json
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from bson import ObjectId
+from fastapi import Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from starlette.types import Receive, Scope, Send
+from pydantic import ValidationError
+from pydantic_core import to_json
+
+from src.application.services.event.water_system_change_publisher import WaterSystemChangePublisher, \
+    get_change_publisher
+from src.application.services.rest.rest_service import get_repository, build_water_system, \
+    serialize_water_system_document
+from src.application.services.rest.rest_service_dtos import WaterSystemCreateUpdateRequest, WaterSystemBatchUpdateItem
+from src.application.utils.ndjson_util import NDJSONUtil
+from src.domain.events.water_system_changed_event import WaterSystemChangedEvent, WaterSystemChangeType
+from src.domain.repositories.water_system_repository import WaterSystemRepository
+from src.infrastructure.config.env_config import EnvConfig, EnvEntry
+from src.logging_config import get_custom_logger
+
+logger = get_custom_logger("WaterSystemBatchService")
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+class BatchSettings:
+    """Limites das operações em lote, lidos do ambiente."""
+    __slots__ = ("chunk_size", "max_line_bytes", "max_ids")
+
+    def __init__(self):
+        env_config = EnvConfig()
+        self.chunk_size = int(env_config.get(EnvEntry.REST_BATCH_CHUNK_SIZE, "500"))
+        self.max_line_bytes = int(env_config.get(EnvEntry.REST_BATCH_MAX_LINE_BYTES, str(1024 * 1024)))
+        self.max_ids = int(env_config.get(EnvEntry.REST_BATCH_MAX_IDS, "10000"))
+
+
+def get_batch_settings() -> BatchSettings:
+    return BatchSettings()
+
+
+def item_result(index: int, status: int, **fields) -> bytes:
+    return to_json({"index": index, "status": status, **fields}) + b"\n"
+
+
+def validation_errors(error: ValidationError) -> list:
+    return error.errors(include_url=False, include_context=False, include_input=False)
+
+
+def parse_id_line(line: bytes) -> Optional[str]:
+    """Aceita uma linha com o ID como string JSON ("...") ou como objeto ({"id": "..."})."""
+    try:
+        value = json.loads(line)
+    except ValueError:
+        return None
+    if isinstance(value, dict):
+        value = value.get("id")
+    return value if isinstance(value, str) and ObjectId.is_valid(value) else None
+
+
+def ordered_results(chunk_results: Dict[int, bytes]) -> List[bytes]:
+    return [chunk_results[index] for index in sorted(chunk_results)]
+
+
+def batch_chunks(request: Request, settings: BatchSettings) -> AsyncIterator[List[Tuple[int, Optional[bytes]]]]:
+    """Linhas do corpo NDJSON agrupadas em lotes; o corpo é lido conforme chega."""
+    return NDJSONUtil.chunked(NDJSONUtil.iterate_lines(request.stream(), settings.max_line_bytes), settings.chunk_size)
+
+
+class RequestStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse cujo gerador ainda consome o corpo da requisição. O StreamingResponse padrão aguarda
+    receive() em paralelo para detectar a desconexão do cliente, o que consumiria as partes do corpo que o
+    gerador está lendo; aqui a resposta apenas é transmitida.
+    """
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+
+class WaterSystemBatchService:
+    @staticmethod
+    async def create_water_systems(
+            request: Request,
+            repository: WaterSystemRepository = Depends(get_repository),
+            publisher: WaterSystemChangePublisher = Depends(get_change_publisher),
+            settings: BatchSettings = Depends(get_batch_settings)
+    ):
+        """
+        Cria WaterSystems em lote a partir de um corpo NDJSON (um WaterSystemCreateUpdateRequest por linha).
+        Cada lote de linhas é gravado com um único insert_many.
+        Retorna uma linha NDJSON por item: {"index", "status": 201, "id"} ou {"index", "status", "error"},
+        transmitidas conforme cada lote é gravado.
+        """
+        return RequestStreamingResponse(
+            WaterSystemBatchService._stream_created_water_systems(request, repository, publisher, settings),
+            media_type=NDJSON_MEDIA_TYPE
+        )
+
+    @staticmethod
+    async def _stream_created_water_systems(
+            request: Request, repository: WaterSystemRepository, publisher: WaterSystemChangePublisher,
+            settings: BatchSettings
+    ) -> AsyncIterator[bytes]:
+        async for chunk in batch_chunks(request, settings):
+            chunk_results: Dict[int, bytes] = {}
+            indexes, water_systems = [], []
+            for index, line in chunk:
+                if line is None:
+                    chunk_results[index] = item_result(index, 413, error="Line too large")
+                    continue
+                try:
+                    water_systems.append(build_water_system(WaterSystemCreateUpdateRequest.model_validate_json(line)))
+                    indexes.append(index)
+                except ValidationError as e:
+                    chunk_results[index] = item_result(index, 422, error=validation_errors(e))
+
+            try:
+                water_system_ids, write_errors = await repository.create_water_systems(water_systems)
+            except Exception as e:
+                logger.error(f"Error when creating a batch of {len(water_systems)} Water Systems: {e}")
+                water_system_ids, write_errors = [None] * len(indexes), {position: str(e) for position in range(len(indexes))}
+
+            for position, (index, water_system_id) in enumerate(zip(indexes, water_system_ids)):
+                if position in write_errors:
+                    chunk_results[index] = item_result(index, 500, error=write_errors[position])
+                    continue
+                chunk_results[index] = item_result(index, 201, id=water_system_id)
+                publisher.publish(WaterSystemChangedEvent(water_system_id=water_system_id, change_type=WaterSystemChangeType.CREATED))
+            yield b"".join(ordered_results(chunk_results))
+
+    @staticmethod
+    async def get_water_systems(
+            request: Request,
+            repository: WaterSystemRepository = Depends(get_repository),
+            settings: BatchSettings = Depends(get_batch_settings)
+    ):
+        """
+        Retorna WaterSystems por ID a partir de um corpo NDJSON de IDs ("<id>" ou {"id": "<id>"} por linha).
+        Cada lote de IDs é lido com uma única consulta $in e a resposta é transmitida conforme os lotes são lidos.
+        Retorna uma linha NDJSON por item: {"index", "id", "status": 200, "water_system"} ou {"index", "status", "error"}.
+        """
+        lines = []
+        async for index, line in NDJSONUtil.iterate_lines(request.stream(), settings.max_line_bytes):
+            if len(lines) >= settings.max_ids:
+                raise HTTPException(status_code=413, detail=f"At most {settings.max_ids} IDs can be requested at once")
+            lines.append((index, parse_id_line(line) if line is not None else None))
+        return StreamingResponse(
+            WaterSystemBatchService._stream_water_systems(lines, repository, settings.chunk_size),
+            media_type=NDJSON_MEDIA_TYPE
+        )
+
+    @staticmethod
+    async def _stream_water_systems(
+            lines: List[Tuple[int, Optional[str]]], repository: WaterSystemRepository, chunk_size: int
+    ) -> AsyncIterator[bytes]:
+        for start in range(0, len(lines), chunk_size):
+            chunk = lines[start:start + chunk_size]
+            documents = await repository.find_water_system_documents_by_ids(
+                [water_system_id for _, water_system_id in chunk if water_system_id is not None]
+            )
+            results = []
+            for index, water_system_id in chunk:
+                if water_system_id is None:
+                    results.append(item_result(index, 400, error="Invalid Water System ID"))
+                elif water_system_id not in documents:
+                    results.append(item_result(index, 404, id=water_system_id, error="WaterSystem not found"))
+                else:
+                    results.append(b"".join((
+                        b'{"index":', str(index).encode(), b',"id":', to_json(water_system_id),
+                        b',"status":200,"water_system":', serialize_water_system_document(documents[water_system_id], False),
+                        b"}\n"
+                    )))
+            yield b"".join(results)
+
+    @staticmethod
+    async def update_water_systems(
+            request: Request,
+            repository: WaterSystemRepository = Depends(get_repository),
+            publisher: WaterSystemChangePublisher = Depends(get_change_publisher),
+            settings: BatchSettings = Depends(get_batch_settings)
+    ):
+        """
+        Atualiza parcialmente WaterSystems em lote a partir de um corpo NDJSON ({"id", ...campos} por linha).
+        Apenas os campos informados são alterados. Cada lote custa uma consulta $in (para identificar IDs
+        inexistentes) e um único bulk_write.
+        Retorna uma linha NDJSON por item: {"index", "id", "status": 200} ou {"index", "status", "error"},
+        transmitidas conforme cada lote é gravado.
+        """
+        return RequestStreamingResponse(
+            WaterSystemBatchService._stream_updated_water_systems(request, repository, publisher, settings),
+            media_type=NDJSON_MEDIA_TYPE
+        )
+
+    @staticmethod
+    async def _stream_updated_water_systems(
+            request: Request, repository: WaterSystemRepository, publisher: WaterSystemChangePublisher,
+            settings: BatchSettings
+    ) -> AsyncIterator[bytes]:
+        async for chunk in batch_chunks(request, settings):
+            chunk_results: Dict[int, bytes] = {}
+            items: List[Tuple[int, str, dict]] = []
+            for index, line in chunk:
+                if line is None:
+                    chunk_results[index] = item_result(index, 413, error="Line too large")
+                    continue
+                try:
+                    item = WaterSystemBatchUpdateItem.model_validate_json(line)
+                except ValidationError as e:
+                    chunk_results[index] = item_result(index, 422, error=validation_errors(e))
+                    continue
+                if not ObjectId.is_valid(item.id):
+                    chunk_results[index] = item_result(index, 400, id=item.id, error="Invalid Water System ID")
+                    continue
+                items.append((index, item.id, item.to_update_fields()))
+
+            try:
+                existing_ids = await repository.find_existing_ids([water_system_id for _, water_system_id, _ in items])
+                updates = [(index, water_system_id, fields) for index, water_system_id, fields in items
+                           if water_system_id in existing_ids and fields]
+                write_errors = await repository.bulk_update_water_systems(
+                    [(water_system_id, fields) for _, water_system_id, fields in updates]
+                )
+            except Exception as e:
+                logger.error(f"Error when updating a batch of {len(items)} Water Systems: {e}")
+                for index, water_system_id, _ in items:
+                    chunk_results[index] = item_result(index, 500, id=water_system_id, error=str(e))
+                yield b"".join(ordered_results(chunk_results))
+                continue
+
+            for index, water_system_id, _ in items:
+                status = 200 if water_system_id in existing_ids else 404
+                chunk_results[index] = item_result(index, status, id=water_system_id) if status == 200 \
+                    else item_result(index, status, id=water_system_id, error="WaterSystem not found")
+            for position, (index, water_system_id, _) in enumerate(updates):
+                if position in write_errors:
+                    chunk_results[index] = item_result(index, 500, id=water_system_id, error=write_errors[position])
+                    continue
+                publisher.publish(WaterSystemChangedEvent(water_system_id=water_system_id, change_type=WaterSystemChangeType.UPDATED))
+            yield b"".join(ordered_results(chunk_results))
+
+    @staticmethod
+    async def delete_water_systems(
+            request: Request,
+            repository: WaterSystemRepository = Depends(get_repository),
+            publisher: WaterSystemChangePublisher = Depends(get_change_publisher),
+            settings: BatchSettings = Depends(get_batch_settings)
+    ):
+        """
+        Remove WaterSystems em lote a partir de um corpo NDJSON de IDs ("<id>" ou {"id": "<id>"} por linha).
+        Cada lote custa uma consulta $in (para identificar IDs inexistentes) e um único bulk_write.
+        Retorna uma linha NDJSON por item: {"index", "id", "status": 200} ou {"index", "status", "error"},
+        transmitidas conforme cada lote é gravado.
+        """
+        return RequestStreamingResponse(
+            WaterSystemBatchService._stream_deleted_water_systems(request, repository, publisher, settings),
+            media_type=NDJSON_MEDIA_TYPE
+        )
+
+    @staticmethod
+    async def _stream_deleted_water_systems(
+            request: Request, repository: WaterSystemRepository, publisher: WaterSystemChangePublisher,
+            settings: BatchSettings
+    ) -> AsyncIterator[bytes]:
+        async for chunk in batch_chunks(request, settings):
+            chunk_results: Dict[int, bytes] = {}
+            items: List[Tuple[int, str]] = []
+            for index, line in chunk:
+                water_system_id = parse_id_line(line) if line is not None else None
+                if water_system_id is None:
+                    chunk_results[index] = item_result(index, 400 if line is not None else 413,
+                                                       error="Invalid Water System ID" if line is not None else "Line too large")
+                    continue
+                items.append((index, water_system_id))
+
+            try:
+                existing_ids = await repository.find_existing_ids([water_system_id for _, water_system_id in items])
+                deletes = [(index, water_system_id) for index, water_system_id in items if water_system_id in existing_ids]
+                write_errors = await repository.bulk_delete_water_systems([water_system_id for _, water_system_id in deletes])
+            except Exception as e:
+                logger.error(f"Error when deleting a batch of {len(items)} Water Systems: {e}")
+                for index, water_system_id in items:
+                    chunk_results[index] = item_result(index, 500, id=water_system_id, error=str(e))
+                yield b"".join(ordered_results(chunk_results))
+                continue
+
+            for index, water_system_id in items:
+                if water_system_id not in existing_ids:
+                    chunk_results[index] = item_result(index, 404, id=water_system_id, error="WaterSystem not found")
+            for position, (index, water_system_id) in enumerate(deletes):
+                if position in write_errors:
+                    chunk_results[index] = item_result(index, 500, id=water_system_id, error=write_errors[position])
+                    continue
+                chunk_results[index] = item_result(index, 200, id=water_system_id)
+                publisher.publish(WaterSystemChangedEvent(water_system_id=water_system_id, change_type=WaterSystemChangeType.DELETED))
+            yield b"".join(ordered_results(chunk_results))
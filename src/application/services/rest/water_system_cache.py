@@ -0,0 +1,105 @@
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Optional, List
+
+from pydantic import TypeAdapter
+
+from src.domain.entities.water_system import WaterSystem
+from src.domain.events.water_system_changed_event import WaterSystemChangedEvent
+
+_water_system_list_adapter = TypeAdapter(List[WaterSystem])
+
+
+class CachedResponse:
+    """Corpo JSON já serializado e ETag correspondente."""
+    __slots__ = ("body", "etag", "expires_at")
+
+    def __init__(self, body: bytes, ttl_seconds: float):
+        self.body = body
+        self.etag = f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+        self.expires_at = time.monotonic() + ttl_seconds
+
+    @classmethod
+    def from_water_system(cls, water_system: WaterSystem, ttl_seconds: float = 0) -> "CachedResponse":
+        return cls(water_system.model_dump_json().encode(), ttl_seconds)
+
+    @classmethod
+    def from_water_systems(cls, water_systems: List[WaterSystem], ttl_seconds: float = 0) -> "CachedResponse":
+        return cls(_water_system_list_adapter.dump_json(water_systems), ttl_seconds)
+
+
+class WaterSystemCache:
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        """
+        Cache em memória (LRU com TTL) das respostas serializadas de WaterSystem.
+        :param max_entries: Quantidade máxima de sistemas mantidos em cache.
+        :param ttl_seconds: Tempo de vida de cada entrada.
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self._list_entry: Optional[CachedResponse] = None
+        # Incrementado a cada invalidação; impede que leituras concorrentes gravem dados obsoletos
+        self.version = 0
+
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, water_system_id: str) -> Optional[CachedResponse]:
+        """Retorna a resposta em cache de um sistema, se presente e válida."""
+        entry = self._entries.get(water_system_id)
+        if entry is None or entry.expires_at < time.monotonic():
+            if entry is not None:
+                del self._entries[water_system_id]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(water_system_id)
+        self.hits += 1
+        return entry
+
+    def put(self, water_system: WaterSystem, version: int) -> CachedResponse:
+        """
+        Serializa e armazena um sistema lido do banco.
+        :param version: Valor de `version` observado antes da leitura; se houve invalidação desde então, não armazena.
+        """
+        entry = CachedResponse.from_water_system(water_system, self.ttl_seconds)
+        if version == self.version:
+            self._entries[water_system.id] = entry
+            self._entries.move_to_end(water_system.id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def get_list(self) -> Optional[CachedResponse]:
+        """Retorna a listagem completa em cache, se válida."""
+        entry = self._list_entry
+        if entry is None or entry.expires_at < time.monotonic():
+            self._list_entry = None
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry
+
+    def put_list(self, water_systems: List[WaterSystem], version: int) -> CachedResponse:
+        """Serializa e armazena a listagem completa."""
+        entry = CachedResponse.from_water_systems(water_systems, self.ttl_seconds)
+        if version == self.version:
+            self._list_entry = entry
+        return entry
+
+    def invalidate(self, water_system_id: str):
+        """Remove um sistema e a listagem do cache."""
+        self.version += 1
+        self._entries.pop(water_system_id, None)
+        self._list_entry = None
+
+    def clear(self):
+        """Esvazia o cache."""
+        self.version += 1
+        self._entries.clear()
+        self._list_entry = None
+
+    def on_water_system_changed(self, event: WaterSystemChangedEvent):
+        """Callback para o WaterSystemChangePublisher."""
+        self.invalidate(event.water_system_id)
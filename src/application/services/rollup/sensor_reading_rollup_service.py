@@ -0,0 +1,178 @@
+from datetime import datetime, timezone, timedelta
+from typing import Optional
+
+import numpy
+
+from src.application.services.cluster.cluster_membership_service import ClusterMembershipService
+from src.domain.repositories.sensor_reading_repository import SensorReadingRepository, SensorReadingsQuery
+from src.domain.repositories.sensor_reading_rollup_repository import SensorReadingRollupRepository, RollupTier, \
+    ROLLUP_TIER_SECONDS
+from src.infrastructure.adapters.mongodb_adapter import MongoDBAdapter
+from src.infrastructure.config.env_config import EnvConfig, EnvEntry
+from src.logging_config import get_custom_logger
+
+# Chave usada para eleger, em modo cluster, a réplica que executa os rollups
+_ROLLUP_OWNERSHIP_KEY = "sensor-readings-rollup"
+
+
+def _optional_int(value: Optional[str]) -> Optional[int]:
+    return int(value) if value else None
+
+
+def _floor(moment: datetime, seconds: int) -> datetime:
+    return datetime.fromtimestamp(moment.timestamp() // seconds * seconds, tz=timezone.utc)
+
+
+class SensorReadingSeries:
+    """Série de um sensor em colunas; para rollups cada ponto é um bucket (média, quantidade, mínimo e máximo)."""
+    __slots__ = ("timestamps", "values", "counts", "min_values", "max_values", "source")
+
+    def __init__(self, timestamps: numpy.ndarray, values: numpy.ndarray, counts: numpy.ndarray,
+                 min_values: numpy.ndarray, max_values: numpy.ndarray, source: str):
+        self.timestamps = timestamps
+        self.values = values
+        self.counts = counts
+        self.min_values = min_values
+        self.max_values = max_values
+        self.source = source
+
+    @classmethod
+    def from_readings(cls, timestamps: numpy.ndarray, values: numpy.ndarray, source: str = "raw") -> "SensorReadingSeries":
+        return cls(timestamps, values, numpy.ones(len(values)), values, values, source)
+
+    def concatenate(self, other: "SensorReadingSeries") -> "SensorReadingSeries":
+        return SensorReadingSeries(
+            numpy.concatenate((self.timestamps, other.timestamps)),
+            numpy.concatenate((self.values, other.values)),
+            numpy.concatenate((self.counts, other.counts)),
+            numpy.concatenate((self.min_values, other.min_values)),
+            numpy.concatenate((self.max_values, other.max_values)),
+            self.source if len(other.values) == 0 else f"{self.source}+{other.source}"
+        )
+
+
+class SensorReadingRollupService:
+    def __init__(
+            self,
+            mongodb_adapter: Optional[MongoDBAdapter] = None,
+            cluster_membership: Optional[ClusterMembershipService] = None
+    ):
+        """
+        Mantém os rollups por minuto e por hora das leituras e escolhe o tier de cada consulta de série.
+        Cada execução agrega apenas o intervalo entre o watermark do tier e o instante atual menos a tolerância
+        a atrasos (ROLLUP_LATENESS_SECONDS); o tier hour é construído a partir do tier minute.
+        """
+        env_config = EnvConfig()
+        self.logger = get_custom_logger(SensorReadingRollupService.__name__)
+        self.rollup_repository = SensorReadingRollupRepository(mongodb_adapter)
+        self.sensor_reading_repository = SensorReadingRepository(mongodb_adapter)
+        self.cluster_membership = cluster_membership
+        self.lateness_seconds = int(env_config.get(EnvEntry.ROLLUP_LATENESS_SECONDS, "120"))
+        self.max_span = timedelta(hours=6)
+        self.retention_seconds = {
+            None: _optional_int(env_config.get(EnvEntry.SENSOR_READINGS_RETENTION_SECONDS)),
+            RollupTier.MINUTE: _optional_int(env_config.get(EnvEntry.ROLLUP_MINUTE_RETENTION_SECONDS)),
+            RollupTier.HOUR: _optional_int(env_config.get(EnvEntry.ROLLUP_HOUR_RETENTION_SECONDS)),
+        }
+        self.is_running = False
+
+    async def provision(self):
+        """Cria os índices e aplica a retenção configurada em cada tier."""
+        await self.rollup_repository.ensure_indexes()
+        for tier in RollupTier:
+            await self.rollup_repository.apply_retention(tier, self.retention_seconds[tier])
+
+        raw_retention = self.retention_seconds[None]
+        minimum_retention = ROLLUP_TIER_SECONDS[RollupTier.HOUR] + self.lateness_seconds
+        if raw_retention is not None and raw_retention < minimum_retention:
+            self.logger.warning(f"Raw readings retention ({raw_retention} s) is shorter than the rollup delay "
+                                f"({minimum_retention} s); some readings may expire before being rolled up")
+
+    async def run(self):
+        """Atualiza os tiers minute e hour até o instante atual (menos a tolerância a atrasos)."""
+        if self.is_running:
+            return
+        if self.cluster_membership is not None and not self.cluster_membership.owns(_ROLLUP_OWNERSHIP_KEY):
+            return
+
+        self.is_running = True
+        try:
+            now = datetime.now(timezone.utc)
+            for tier in RollupTier:
+                await self.roll_up(tier, now)
+        except Exception as e:
+            self.logger.error(f"Error when rolling up sensor readings: {e}")
+        finally:
+            self.is_running = False
+
+    async def roll_up(self, tier: RollupTier, now: datetime) -> int:
+        """
+        Agrega a fonte do tier do watermark até o último bucket completo, em passos de no máximo `max_span`.
+        Retorna a quantidade de passos executados.
+        """
+        tier_seconds = ROLLUP_TIER_SECONDS[tier]
+        upper = now - timedelta(seconds=self.lateness_seconds)
+        if tier == RollupTier.HOUR:
+            # Só agrega horas já cobertas por completo pelo tier minute
+            minute_watermark = await self.rollup_repository.get_watermark(RollupTier.MINUTE)
+            if minute_watermark is None:
+                return 0
+            upper = min(upper, minute_watermark)
+        upper = _floor(upper, tier_seconds)
+
+        watermark = await self.rollup_repository.get_watermark(tier)
+        if watermark is None:
+            first_source_date = await self.rollup_repository.find_first_source_date(tier)
+            if first_source_date is None:
+                return 0
+            watermark = _floor(first_source_date, tier_seconds)
+
+        steps = 0
+        while watermark < upper:
+            step_end = min(upper, watermark + self.max_span)
+            await self.rollup_repository.merge_rollup(tier, watermark, step_end)
+            await self.rollup_repository.set_watermark(tier, step_end)
+            watermark = step_end
+            steps += 1
+        if steps:
+            self.logger.debug(f"Rolled up {tier.value} tier until {watermark.isoformat()} in {steps} steps")
+        return steps
+
+    def select_tier(self, start: datetime, end: datetime, points: int, now: Optional[datetime] = None) \
+            -> Optional[RollupTier]:
+        """
+        Escolhe o tier mais grosso cuja resolução ainda atende (end - start) / points, entre os que retêm dados
+        desde `start`. None indica leituras brutas.
+        """
+        now = now or datetime.now(timezone.utc)
+        resolution_seconds = (end - start).total_seconds() / points
+        candidates = [(None, 0)] + [(tier, ROLLUP_TIER_SECONDS[tier]) for tier in RollupTier]
+        available = [
+            (tier, seconds) for tier, seconds in candidates
+            if self.retention_seconds[tier] is None or start >= now - timedelta(seconds=self.retention_seconds[tier])
+        ] or candidates[-1:]
+        sufficient = [(tier, seconds) for tier, seconds in available if seconds <= resolution_seconds]
+        if sufficient:
+            return max(sufficient, key=lambda candidate: candidate[1])[0]
+        return min(available, key=lambda candidate: candidate[1])[0]
+
+    async def find_series(self, query: SensorReadingsQuery, points: int) -> SensorReadingSeries:
+        """
+        Busca a série de um sensor no tier adequado: buckets até o watermark do tier e leituras brutas depois dele,
+        de modo que os dados mais recentes (ainda não agregados) também sejam retornados.
+        """
+        tier = self.select_tier(query.start_date, query.end_date, points)
+        watermark = await self.rollup_repository.get_watermark(tier) if tier is not None else None
+        if watermark is None or watermark <= query.start_date:
+            timestamps, values = await self.sensor_reading_repository.find_reading_series(query)
+            return SensorReadingSeries.from_readings(timestamps, values)
+
+        split = min(query.end_date, watermark)
+        series = SensorReadingSeries(*await self.rollup_repository.find_rollup_series(
+            tier, query.water_system_id, query.sensor_id, query.start_date, split
+        ), source=tier.value)
+        if query.end_date > split:
+            recent_query = query.model_copy(update={"start_date": split})
+            timestamps, values = await self.sensor_reading_repository.find_reading_series(recent_query)
+            series = series.concatenate(SensorReadingSeries.from_readings(timestamps, values))
+        return series
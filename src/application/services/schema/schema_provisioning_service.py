@@ -0,0 +1,78 @@
+from datetime import datetime, timezone, timedelta
+from typing import List, Optional
+
+from src.domain.repositories.sensor_reading_repository import SensorReadingRepository, SensorReadingsQuery
+from src.domain.repositories.water_system_repository import WaterSystemRepository
+from src.infrastructure.adapters.mongodb_adapter import MongoDBAdapter
+from src.infrastructure.config.env_config import EnvConfig, EnvEntry
+from src.logging_config import get_custom_logger
+
+
+class SchemaProvisioningService:
+    def __init__(self, mongodb_adapter: Optional[MongoDBAdapter] = None):
+        env_config = EnvConfig()
+        self.logger = get_custom_logger(SchemaProvisioningService.__name__)
+        self.sensor_reading_repository = SensorReadingRepository(mongodb_adapter)
+        self.water_system_repository = WaterSystemRepository(mongodb_adapter)
+        self.time_series = env_config.get(EnvEntry.MONGODB_SENSOR_READINGS_TIME_SERIES, "false").lower() == "true"
+        self.diagnostics = env_config.get(EnvEntry.MONGODB_SCHEMA_DIAGNOSTICS, "false").lower() == "true"
+        retention_seconds = env_config.get(EnvEntry.SENSOR_READINGS_RETENTION_SECONDS)
+        self.readings_retention_seconds = int(retention_seconds) if retention_seconds else None
+
+    async def provision(self):
+        """Cria coleções e índices necessários. Pode ser executado a cada inicialização."""
+        if self.time_series:
+            if await self.sensor_reading_repository.create_time_series_collection():
+                self.logger.info("Created sensor readings time-series collection")
+            elif not await self.sensor_reading_repository.is_time_series_collection():
+                self.logger.warning("Sensor readings collection already exists as a regular collection "
+                                    "and cannot be converted to time-series; keeping it as is")
+
+        await self.sensor_reading_repository.apply_retention(self.readings_retention_seconds)
+        if self.readings_retention_seconds is not None:
+            self.logger.info(f"Raw sensor readings expire after {self.readings_retention_seconds} seconds")
+
+        reading_indexes = await self.sensor_reading_repository.ensure_indexes()
+        water_system_indexes = await self.water_system_repository.ensure_indexes()
+        self.logger.info(f"Ensured indexes: sensor readings = {reading_indexes}, water systems = {water_system_indexes}")
+
+        if self.diagnostics:
+            await self.verify_query_plans()
+
+    async def verify_query_plans(self) -> bool:
+        """Verifica se as consultas principais usam índices; registra um aviso para cada varredura completa."""
+        window_start = datetime.now(timezone.utc) - timedelta(seconds=60)
+        plans = {
+            "find_readings (twinning window)": await self.sensor_reading_repository.explain_find_readings(
+                SensorReadingsQuery(water_system_id="diagnostics", start_date=window_start)
+            ),
+            "find_readings (sensor series)": await self.sensor_reading_repository.explain_find_readings(
+                SensorReadingsQuery(water_system_id="diagnostics", sensor_id="diagnostics", start_date=window_start)
+            ),
+            "list_water_systems (online)": await self.water_system_repository.explain_list_water_systems(
+                {"status": "online"}
+            ),
+        }
+
+        all_indexed = True
+        for query_name, plan in plans.items():
+            stages = self._collect_stages(plan.get("queryPlanner", {}).get("winningPlan", {}))
+            if "COLLSCAN" in stages:
+                all_indexed = False
+                self.logger.warning(f"Query plan for {query_name} uses a collection scan: {stages}")
+            else:
+                self.logger.info(f"Query plan for {query_name}: {stages}")
+        return all_indexed
+
+    @classmethod
+    def _collect_stages(cls, plan) -> List[str]:
+        stages = []
+        if isinstance(plan, dict):
+            if "stage" in plan:
+                stages.append(plan["stage"])
+            for value in plan.values():
+                stages.extend(cls._collect_stages(value))
+        elif isinstance(plan, list):
+            for item in plan:
+                stages.extend(cls._collect_stages(item))
+        return stages
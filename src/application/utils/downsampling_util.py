@@ -0,0 +1,75 @@
+from typing import Tuple, Optional
+
+import numpy
+
+
+class DownsamplingUtil:
+    @staticmethod
+    def lttb(timestamps: numpy.ndarray, values: numpy.ndarray, threshold: int) -> Tuple[numpy.ndarray, numpy.ndarray]:
+        """
+        Reduz uma série ordenada por tempo para `threshold` pontos com Largest-Triangle-Three-Buckets.
+        Preserva picos e vales visualmente relevantes; o primeiro e o último ponto são sempre mantidos.
+        """
+        size = len(values)
+        if threshold >= size or threshold < 3:
+            return timestamps, values
+
+        # Limites dos buckets internos (o primeiro e o último ponto ficam em buckets próprios)
+        edges = numpy.linspace(1, size - 1, threshold - 1).astype(numpy.int64)
+        selected = numpy.empty(threshold, dtype=numpy.int64)
+        selected[0] = 0
+        selected[-1] = size - 1
+
+        previous = 0
+        for i in range(threshold - 2):
+            start, end = edges[i], edges[i + 1]
+            if i + 2 < threshold - 1:
+                next_start, next_end = edges[i + 1], edges[i + 2]
+                next_x = timestamps[next_start:next_end].mean()
+                next_y = values[next_start:next_end].mean()
+            else:
+                next_x, next_y = timestamps[-1], values[-1]
+
+            x = timestamps[start:end]
+            y = values[start:end]
+            previous_x, previous_y = timestamps[previous], values[previous]
+            areas = numpy.abs((previous_x - next_x) * (y - previous_y) - (previous_x - x) * (next_y - previous_y))
+            previous = start + int(numpy.argmax(areas))
+            selected[i + 1] = previous
+
+        return timestamps[selected], values[selected]
+
+    @staticmethod
+    def bucket_statistics(
+            timestamps: numpy.ndarray, values: numpy.ndarray, buckets: int,
+            counts: Optional[numpy.ndarray] = None,
+            minimums: Optional[numpy.ndarray] = None,
+            maximums: Optional[numpy.ndarray] = None
+    ) -> Tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray, numpy.ndarray]:
+        """
+        Agrupa uma série ordenada por tempo em até `buckets` intervalos de mesma largura.
+        Retorna (início do bucket, média, mínimo, máximo) apenas para os buckets com leituras.
+        Para séries já agregadas (rollups), `values` são médias ponderadas por `counts` e `minimums`/`maximums`
+        são os extremos de cada ponto.
+        """
+        if len(values) == 0:
+            empty = numpy.empty(0)
+            return empty, empty, empty, empty
+
+        start, end = timestamps[0], timestamps[-1]
+        width = (end - start) / buckets if end > start else 1.0
+        bucket_indexes = numpy.minimum(((timestamps - start) // width).astype(numpy.int64), buckets - 1)
+
+        # Como a série está ordenada, cada bucket é um segmento contíguo
+        boundaries = numpy.flatnonzero(numpy.diff(bucket_indexes)) + 1
+        segment_starts = numpy.concatenate(([0], boundaries))
+        segment_counts = numpy.diff(numpy.concatenate((segment_starts, [len(values)])))
+
+        if counts is None:
+            means = numpy.add.reduceat(values, segment_starts) / segment_counts
+        else:
+            means = numpy.add.reduceat(values * counts, segment_starts) / numpy.add.reduceat(counts, segment_starts)
+        bucket_minimums = numpy.minimum.reduceat(values if minimums is None else minimums, segment_starts)
+        bucket_maximums = numpy.maximum.reduceat(values if maximums is None else maximums, segment_starts)
+        bucket_starts = start + bucket_indexes[segment_starts] * width
+        return bucket_starts, means, bucket_minimums, bucket_maximums
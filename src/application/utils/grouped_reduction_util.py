@@ -0,0 +1,63 @@
+from typing import Tuple
+
+import numpy
+
+
+class GroupedReductionUtil:
+    @staticmethod
+    def segmented_statistics(group_codes: numpy.ndarray, timestamps: numpy.ndarray, values: numpy.ndarray) \
+            -> Tuple[numpy.ndarray, ...]:
+        """
+        Calcula, em uma única passada, as estatísticas de cada grupo de leituras.
+        As leituras são ordenadas por (grupo, timestamp) com ordenação estável, de modo que cada grupo vira um
+        segmento contíguo reduzido com `reduceat`; em empates de timestamp a última leitura recebida é a "última".
+        Valores NaN são ignorados por coluna, como no groupby().agg() do pandas: a quantidade, a média, o mínimo,
+        o máximo e o último valor consideram só os valores válidos (NaN e quantidade 0 em um grupo só de NaN),
+        enquanto a última leitura (usada para a data) é a última do grupo, mesmo com valor NaN.
+        Retorna (código do grupo, quantidade, média, mínimo, máximo, índice original da última leitura,
+        índice original da última leitura com valor válido ou -1), apenas para os grupos com leituras e em
+        ordem crescente de código.
+        """
+        if len(values) == 0:
+            empty = numpy.empty(0)
+            empty_indexes = numpy.empty(0, dtype=numpy.int64)
+            return empty_indexes, empty_indexes, empty, empty, empty, empty_indexes, empty_indexes
+
+        order = numpy.lexsort((timestamps, group_codes))
+        sorted_codes = group_codes[order]
+        sorted_values = values[order]
+        valid = ~numpy.isnan(sorted_values)
+
+        segment_starts = numpy.concatenate(([0], numpy.flatnonzero(numpy.diff(sorted_codes)) + 1))
+        segment_ends = numpy.concatenate((segment_starts[1:], [len(sorted_values)]))
+        counts = numpy.add.reduceat(valid.astype(numpy.int64), segment_starts)
+
+        with numpy.errstate(invalid="ignore", divide="ignore"):
+            means = numpy.add.reduceat(numpy.where(valid, sorted_values, 0.0), segment_starts) / counts
+        # fmin/fmax ignoram NaN, exceto quando todos os valores do segmento são NaN
+        minimums = numpy.fmin.reduceat(sorted_values, segment_starts)
+        maximums = numpy.fmax.reduceat(sorted_values, segment_starts)
+
+        last_valid_positions = numpy.maximum.reduceat(
+            numpy.where(valid, numpy.arange(len(sorted_values)), -1), segment_starts
+        )
+        last_value_indexes = numpy.where(last_valid_positions >= segment_starts, order[last_valid_positions], -1)
+        return (sorted_codes[segment_starts], counts, means, minimums, maximums, order[segment_ends - 1],
+                last_value_indexes)
+
+    @staticmethod
+    def windowed_statistics(sensor_codes: numpy.ndarray, timestamps: numpy.ndarray, values: numpy.ndarray,
+                            origin: float, window_seconds: float, sensor_count: int) -> Tuple[numpy.ndarray, ...]:
+        """
+        Estatísticas por (janela, sensor) de leituras de um sistema, com janelas de `window_seconds` alinhadas
+        em `origin` (segundos Unix). Função pura sobre arrays, adequada para execução em outro processo.
+        Retorna (índice da janela, código do sensor, quantidade, média, mínimo, máximo, timestamp da última
+        leitura e último valor válido), ordenados por janela e sensor, com a mesma semântica de NaN de
+        segmented_statistics.
+        """
+        window_indexes = ((timestamps - origin) // window_seconds).astype(numpy.int64)
+        codes, counts, means, minimums, maximums, last_indexes, last_value_indexes = \
+            GroupedReductionUtil.segmented_statistics(window_indexes * sensor_count + sensor_codes, timestamps, values)
+        last_values = numpy.where(last_value_indexes >= 0, values[last_value_indexes], numpy.nan)
+        return (codes // sensor_count, codes % sensor_count, counts, means, minimums, maximums,
+                timestamps[last_indexes], last_values)
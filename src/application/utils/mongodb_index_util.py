@@ -0,0 +1,24 @@
+from typing import Optional
+
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo import ASCENDING
+
+
+class MongoDBIndexUtil:
+    @staticmethod
+    async def ensure_ttl_index(collection: AsyncIOMotorCollection, field: str, name: str,
+                               expire_after_seconds: Optional[int]):
+        """
+        Cria, ajusta (collMod) ou remove um índice TTL de campo único.
+        :param expire_after_seconds: Tempo de vida dos documentos; None remove o índice.
+        """
+        existing = (await collection.index_information()).get(name)
+        if expire_after_seconds is None:
+            if existing is not None:
+                await collection.drop_index(name)
+        elif existing is None:
+            await collection.create_index([(field, ASCENDING)], name=name, expireAfterSeconds=expire_after_seconds)
+        elif existing.get("expireAfterSeconds") != expire_after_seconds:
+            await collection.database.command(
+                "collMod", collection.name, index={"name": name, "expireAfterSeconds": expire_after_seconds}
+            )
@@ -0,0 +1,48 @@
+from typing import AsyncIterator, List, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+class NDJSONUtil:
+    @staticmethod
+    async def iterate_lines(chunks: AsyncIterator[bytes], max_line_bytes: int) \
+            -> AsyncIterator[Tuple[int, Optional[bytes]]]:
+        """
+        Divide um corpo NDJSON recebido em partes nas suas linhas, sem carregar o corpo inteiro em memória.
+        Retorna (índice, linha) para cada linha não vazia; linhas maiores que `max_line_bytes` são descartadas
+        enquanto chegam e retornadas como (índice, None).
+        """
+        index = 0
+        buffer = b""
+        oversized = False
+        async for chunk in chunks:
+            buffer += chunk
+            lines = buffer.split(b"\n")
+            buffer = lines.pop()
+            for line in lines:
+                if oversized:
+                    yield index, None
+                    index += 1
+                    oversized = False
+                elif line.strip():
+                    yield index, line if len(line) <= max_line_bytes else None
+                    index += 1
+            if len(buffer) > max_line_bytes:
+                oversized = True
+                buffer = b""
+        if oversized:
+            yield index, None
+        elif buffer.strip():
+            yield index, buffer if len(buffer) <= max_line_bytes else None
+
+    @staticmethod
+    async def chunked(items: AsyncIterator[T], size: int) -> AsyncIterator[List[T]]:
+        """Agrupa os itens de um iterador assíncrono em listas de até `size` elementos."""
+        chunk = []
+        async for item in items:
+            chunk.append(item)
+            if len(chunk) >= size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
@@ -0,0 +1,52 @@
+import argparse
+import asyncio
+import sys
+from datetime import datetime, timezone
+
+from src.application.services.export.sensor_reading_export_service import SensorReadingExportService, ExportFormat
+from src.domain.repositories.sensor_reading_repository import SensorReadingRepository, SensorReadingsQuery
+from src.infrastructure.adapters.mongodb_adapter import MongoDBAdapter
+from src.infrastructure.config.env_config import EnvConfig, EnvEntry
+
+
+def parse_arguments() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Exporta as leituras de um sistema em um intervalo como Arrow IPC (stream) ou Parquet."
+    )
+    parser.add_argument("--water-system", required=True, help="ID do sistema")
+    parser.add_argument("--sensor", help="Exporta apenas as leituras deste sensor")
+    parser.add_argument("--start", required=True, type=datetime.fromisoformat, help="Início (ISO 8601)")
+    parser.add_argument("--end", type=datetime.fromisoformat, help="Fim (ISO 8601; padrão: agora)")
+    parser.add_argument("--format", choices=[f.value for f in ExportFormat], default=ExportFormat.PARQUET.value)
+    parser.add_argument("--compression", help="Codec de compressão (zstd, lz4...)")
+    parser.add_argument("--batch-size", type=int, help="Leituras por record batch (padrão: EXPORT_BATCH_SIZE)")
+    parser.add_argument("--output", required=True, help="Arquivo de saída ('-' para a saída padrão)")
+    return parser.parse_args()
+
+
+async def run(arguments: argparse.Namespace):
+    start = arguments.start if arguments.start.tzinfo else arguments.start.replace(tzinfo=timezone.utc)
+    end = arguments.end or datetime.now(timezone.utc)
+    end = end if end.tzinfo else end.replace(tzinfo=timezone.utc)
+    query = SensorReadingsQuery(
+        water_system_id=arguments.water_system, sensor_id=arguments.sensor, start_date=start, end_date=end
+    )
+
+    mongodb_adapter = MongoDBAdapter()
+    export_service = SensorReadingExportService(
+        SensorReadingRepository(mongodb_adapter),
+        arguments.batch_size or int(EnvConfig().get(EnvEntry.EXPORT_BATCH_SIZE, "65536"))
+    )
+    output = sys.stdout.buffer if arguments.output == "-" else open(arguments.output, "wb")
+    try:
+        async for data in export_service.stream(query, ExportFormat(arguments.format), arguments.compression):
+            output.write(data)
+    finally:
+        if output is not sys.stdout.buffer:
+            output.close()
+        await mongodb_adapter.close()
+
+
+# Uso: python -m src.cli.export_sensor_readings --water-system <id> --start 2024-01-01 --output readings.parquet
+if __name__ == "__main__":
+    asyncio.run(run(parse_arguments()))
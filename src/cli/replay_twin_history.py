@@ -0,0 +1,45 @@
+import argparse
+import asyncio
+from datetime import datetime
+
+from src.application.services.replay.twin_history_replay_dtos import TwinHistoryReplayRequest
+from src.application.services.replay.twin_history_replay_service import TwinHistoryReplayService
+from src.infrastructure.adapters.mongodb_adapter import MongoDBAdapter
+
+
+def parse_arguments() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Recalcula o histórico das estatísticas dos gêmeos em um intervalo passado."
+    )
+    parser.add_argument("--water-systems", required=True, help="IDs dos sistemas, separados por vírgula")
+    parser.add_argument("--start", required=True, type=datetime.fromisoformat, help="Início (ISO 8601, inclusive)")
+    parser.add_argument("--end", required=True, type=datetime.fromisoformat, help="Fim (ISO 8601, exclusive)")
+    parser.add_argument("--window-seconds", type=int, help="Tamanho da janela (padrão: twinning rate do sistema)")
+    parser.add_argument("--workers", type=int, help="Processos de cálculo (padrão: REPLAY_WORKERS ou CPUs)")
+    parser.add_argument("--replay-id", help="ID de um replay a retomar, ou do novo replay")
+    return parser.parse_args()
+
+
+async def run(arguments: argparse.Namespace) -> str:
+    mongodb_adapter = MongoDBAdapter()
+    try:
+        service = TwinHistoryReplayService(mongodb_adapter)
+        if arguments.workers:
+            service.workers = arguments.workers
+        report = await service.replay(TwinHistoryReplayRequest(
+            replay_id=arguments.replay_id,
+            water_system_ids=[water_system_id.strip() for water_system_id in arguments.water_systems.split(",")
+                              if water_system_id.strip()],
+            start=arguments.start,
+            end=arguments.end,
+            window_seconds=arguments.window_seconds
+        ))
+        return report.model_dump_json(indent=2)
+    finally:
+        await mongodb_adapter.close()
+
+
+# Uso: python -m src.cli.replay_twin_history --water-systems <id>,<id> --start 2024-01-01 --end 2024-02-01
+if __name__ == "__main__":
+    # O pool de processos usa spawn, que reimporta o módulo principal nos workers; por isso o guard
+    print(asyncio.run(run(parse_arguments())))
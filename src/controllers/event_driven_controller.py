@@ -1,35 +1,80 @@
 import asyncio
-import json
+import time
+from typing import Optional
 
 from tenacity import retry, wait_fixed
 
 from src.application.services.event.event_service import EventService
-from src.domain.events.sensor_reading_event import SensorReadingEvent
+from src.application.services.processing_pipeline.hot_window_store import HotWindowStore
+from src.application.services.processing_pipeline.sensor_window_aggregator import SensorWindowAggregator
+from src.domain.events.sensor_reading_event import SensorReadingEvent, ENFORCE_MEASURE_UNITS, \
+    is_measure_unit_consistent
+from src.infrastructure.adapters.mongodb_adapter import MongoDBAdapter
 from src.infrastructure.adapters.mqtt_broker_adapter import MQTTBrokerAdapter, MQTTConfig
+from src.infrastructure.adapters.mqtt_dispatch_queue import OverflowPolicy
 from src.infrastructure.config.env_config import EnvConfig, EnvEntry
+from src.infrastructure.metrics.application_metrics import MQTT_HANDLER_DURATION, MQTT_DISPATCH_QUEUE_DEPTH, \
+    INGESTION_BUFFER_PENDING, INGESTION_MEASURE_UNIT_MISMATCHES
 from src.logging_config import get_custom_logger
 
 
 class EventDrivenController:
-    def __init__(self):
+    def __init__(
+            self,
+            sensor_window_aggregator: Optional[SensorWindowAggregator] = None,
+            mongodb_adapter: Optional[MongoDBAdapter] = None,
+            hot_window_store: Optional[HotWindowStore] = None,
+            cluster_member_id: Optional[str] = None
+    ):
+        """
+        :param cluster_member_id: Em modo cluster, ID desta réplica; torna o client ID único e assina os tópicos
+            via assinatura compartilhada, para que cada leitura seja ingerida por uma única réplica.
+        """
         env_config = EnvConfig()
+        client_id = env_config.get(EnvEntry.MQTT_BROKER_CLIENT_ID)
+        shared_subscription_group = None
+        if cluster_member_id is not None:
+            client_id = f"{client_id}-{cluster_member_id}"
+            shared_subscription_group = env_config.get(EnvEntry.MQTT_SHARED_SUBSCRIPTION_GROUP, "waterwise")
         mqtt_config = MQTTConfig(
             broker_url=env_config.get(EnvEntry.MQTT_BROKER_URL),
             broker_port=int(env_config.get(EnvEntry.MQTT_BROKER_PORT)),
-            client_id=env_config.get(EnvEntry.MQTT_BROKER_CLIENT_ID)
+            client_id=client_id,
+            shared_subscription_group=shared_subscription_group,
+            dispatch_queue_size=int(env_config.get(EnvEntry.MQTT_DISPATCH_QUEUE_SIZE, "10000")),
+            dispatch_workers=int(env_config.get(EnvEntry.MQTT_DISPATCH_WORKERS, "8")),
+            dispatch_overflow_policy=OverflowPolicy(
+                env_config.get(EnvEntry.MQTT_DISPATCH_OVERFLOW_POLICY, OverflowPolicy.BLOCK.value)
+            )
         )
+        # Sem a checagem, leituras com unidade divergente são aceitas (como antes) e apenas contabilizadas
+        self._validation_context = {ENFORCE_MEASURE_UNITS: True} \
+            if env_config.get(EnvEntry.INGESTION_ENFORCE_MEASURE_UNITS, "false").lower() == "true" else None
         self.mqtt_broker = MQTTBrokerAdapter(mqtt_config)
         self.mqtt_broker.set_event_loop(asyncio.get_event_loop())
         self.logger = get_custom_logger(EventDrivenController.__name__)
-        self.event_service = EventService()
+        self.event_service = EventService(sensor_window_aggregator, mongodb_adapter, hot_window_store)
+        self.event_service.start()
 
-    async def _handler(self, topic: str, payload: str):
+    async def _handler(self, topic: str, payload: bytes):
+        # Erros são propagados para a fila de despacho, que os registra e contabiliza como falhas
+        started_at = time.perf_counter()
         try:
-            payload_dict = json.loads(payload)
-            sensor_reading_event = SensorReadingEvent.model_validate(payload_dict)
+            # Valida os bytes diretamente no parser JSON do pydantic, sem decode/json.loads intermediários
+            sensor_reading_event = SensorReadingEvent.model_validate_json(payload, context=self._validation_context)
+            if not is_measure_unit_consistent(sensor_reading_event.sensor, sensor_reading_event.measure_unit):
+                INGESTION_MEASURE_UNIT_MISMATCHES.labels(sensor_reading_event.sensor.value).inc()
             await self.event_service.process_sensor_reading(sensor_reading_event)
-        except Exception as e:
-            self.logger.error(f"Error when handling event: {e}")
+        finally:
+            MQTT_HANDLER_DURATION.labels(topic).observe(time.perf_counter() - started_at)
+
+    def collect_metrics(self):
+        """Atualiza os gauges de ingestão (fila de despacho, buffer de leituras e spill); usado como hook do /metrics."""
+        MQTT_DISPATCH_QUEUE_DEPTH.set(self.mqtt_broker.dispatch_queue.depth())
+        if self.event_service.sensor_reading_buffer is not None:
+            INGESTION_BUFFER_PENDING.set(self.event_service.sensor_reading_buffer.pending())
+        if self.event_service.sensor_reading_spill_service is not None:
+            self.event_service.sensor_reading_spill_service.collect_metrics()
 
     @retry(wait=wait_fixed(60))
     def start(self):
@@ -44,3 +89,8 @@ class EventDrivenController:
 
     def stop(self):
         self.mqtt_broker.stop()
+
+    async def shutdown(self):
+        self.stop()
+        await self.mqtt_broker.drain()
+        await self.event_service.stop()
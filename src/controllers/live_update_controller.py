@@ -0,0 +1,10 @@
+from fastapi import APIRouter
+
+from src.application.services.rest.live_update_service import LiveUpdateService
+
+
+class LiveUpdateController:
+    def __init__(self):
+        self.router = APIRouter()
+        self.router.get("/live")(LiveUpdateService.stream_water_system_updates)
+        self.router.websocket("/live/ws")(LiveUpdateService.websocket_water_system_updates)
@@ -0,0 +1,15 @@
+from fastapi import APIRouter
+from fastapi.responses import Response
+
+from src.infrastructure.metrics.metrics_registry import metrics_registry, PROMETHEUS_CONTENT_TYPE
+
+
+class MetricsController:
+    def __init__(self):
+        self.router = APIRouter()
+        self.router.get("/metrics", response_class=Response)(self.get_metrics)
+
+    @staticmethod
+    async def get_metrics() -> Response:
+        """Exporta as métricas do processo no formato texto do Prometheus."""
+        return Response(content=metrics_registry.render(), media_type=PROMETHEUS_CONTENT_TYPE)
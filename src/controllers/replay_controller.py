@@ -0,0 +1,34 @@
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import JSONResponse
+from pydantic_core import to_jsonable_python
+
+from src.application.services.replay.twin_history_replay_dtos import TwinHistoryReplayRequest
+from src.application.services.replay.twin_history_replay_service import TwinHistoryReplayService
+
+
+def get_replay_service(request: Request) -> TwinHistoryReplayService:
+    return request.app.state.twin_history_replay_service
+
+
+class ReplayController:
+    def __init__(self):
+        self.router = APIRouter()
+        self.router.post("/replays", status_code=202)(self.start_replay)
+        self.router.get("/replays/{replay_id}")(self.get_replay)
+
+    @staticmethod
+    async def start_replay(replay_request: TwinHistoryReplayRequest, request: Request):
+        """Inicia (ou retoma, informando um replay_id existente) um replay do histórico dos gêmeos em segundo plano."""
+        try:
+            replay_id = await get_replay_service(request).start(replay_request)
+        except ValueError as e:
+            raise HTTPException(status_code=409, detail=str(e))
+        return {"replay_id": replay_id}
+
+    @staticmethod
+    async def get_replay(replay_id: str, request: Request):
+        """Retorna o estado, o progresso por sistema e, ao final, o relatório de throughput de um replay."""
+        checkpoint = await get_replay_service(request).get_status(replay_id)
+        if checkpoint is None:
+            raise HTTPException(status_code=404, detail="Replay not found")
+        return JSONResponse(content=to_jsonable_python(checkpoint))
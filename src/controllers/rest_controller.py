@@ -3,6 +3,8 @@ from typing import List
 from fastapi import APIRouter
 
 from src.application.services.rest.rest_service import RestService
+from src.application.services.rest.rest_service_dtos import SensorReadingsSeriesResponse
+from src.application.services.rest.water_system_batch_service import WaterSystemBatchService
 from src.domain.entities.water_system import WaterSystem
 
 
@@ -11,7 +13,16 @@ class RestController:
         command_service = RestService()
         self.router = APIRouter()
         self.router.post("", response_model=str)(command_service.create_water_system)
+        # Operações em lote (corpo e resposta em NDJSON, um resultado por item)
+        self.router.post("/batch")(WaterSystemBatchService.create_water_systems)
+        self.router.post("/batch/get")(WaterSystemBatchService.get_water_systems)
+        self.router.patch("/batch")(WaterSystemBatchService.update_water_systems)
+        self.router.post("/batch/delete")(WaterSystemBatchService.delete_water_systems)
         self.router.get("/{water_system_id}", response_model=WaterSystem)(command_service.get_water_system)
         self.router.put("/{water_system_id}", response_model=int)(command_service.update_water_system)
         self.router.delete("/{water_system_id}", response_model=int)(command_service.delete_water_system)
         self.router.get("", response_model=List[WaterSystem])(command_service.list_water_systems)
+        self.router.get(
+            "/{water_system_id}/sensors/{sensor_id}/readings", response_model=SensorReadingsSeriesResponse
+        )(command_service.get_sensor_readings)
+        self.router.get("/{water_system_id}/readings/export")(command_service.export_sensor_readings)
@@ -0,0 +1,15 @@
+from datetime import datetime
+from typing import Optional
+
+from pydantic import BaseModel, Field
+
+
+class SensorWindowStatistics(BaseModel):
+    """Estatísticas de um sensor dentro de uma janela de twinning."""
+    sensor_id: str = Field(..., description="Identificador do sensor")
+    mean_value: float = Field(..., description="Valor médio dentro da janela")
+    min_value: float = Field(..., description="Valor mínimo dentro da janela")
+    max_value: float = Field(..., description="Valor máximo dentro da janela")
+    last_value: float = Field(..., description="Último valor dentro da janela")
+    last_value_date: datetime = Field(..., description="Data/hora do último valor dentro da janela")
+    readings_count: Optional[int] = Field(None, description="Quantidade de leituras dentro da janela")
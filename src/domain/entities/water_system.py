@@ -20,7 +20,7 @@ class WaterSystem(BaseModel):
     system_type: WaterSystemType = Field(..., description="Tipo do sistema físico (ex.: reservatório, tratamento)")
     status: str = Field("online", description="Estado atual do sistema (online/offline/manutenção)")
     twinning_rate_seconds: int = Field(60, description="Intervalo de sincronização com o sistema físico (em segundos)")
-    sensors: List[WaterSystemSensor] = Field(default_factory=lambda: list, description="Lista de sensores atrelados")
+    sensors: List[WaterSystemSensor] = Field(default_factory=list, description="Lista de sensores atrelados")
 
     @classmethod
     @field_validator("twinning_rate_seconds", mode="after", check_fields=True)
@@ -1,9 +1,25 @@
 from datetime import datetime
 
-from pydantic import BaseModel, field_validator, Field
+from pydantic import BaseModel, field_validator, Field, ValidationInfo
 
 from src.domain.entities.water_system_sensor import SensorType, MeasureUnit
 
+SENSOR_MEASURE_UNITS = {
+    SensorType.TEMPERATURE: MeasureUnit.CELSIUS,
+    SensorType.PH: MeasureUnit.NONE,
+    SensorType.TURBIDITY: MeasureUnit.NTU,
+    SensorType.DISSOLVED_OXYGEN: MeasureUnit.MG_L,
+    SensorType.CONDUCTIVITY: MeasureUnit.US_CM,
+}
+
+# Chave do contexto de validação que ativa a checagem de unidade por tipo de sensor
+ENFORCE_MEASURE_UNITS = "enforce_measure_units"
+
+
+def is_measure_unit_consistent(sensor: SensorType, unit: MeasureUnit) -> bool:
+    """Indica se a unidade é a esperada para o tipo de sensor (MeasureUnit.NONE é sempre aceita)."""
+    return unit == MeasureUnit.NONE or unit == SENSOR_MEASURE_UNITS.get(sensor)
+
 
 class SensorReadingEvent(BaseModel):
     id: str = Field(None)
@@ -14,25 +30,35 @@ class SensorReadingEvent(BaseModel):
     sensor_id: str = Field(None, validation_alias="sensorId")
     water_system_id: str = Field(None, validation_alias="waterSystemId")
 
-    @classmethod
     @field_validator("measure_unit", mode="after", check_fields=True)
-    def validate_measure_unit(cls, unit, values):
-        sensor = values.get("sensor")
-        if sensor:
-            sensor_units = {
-                SensorType.TEMPERATURE: MeasureUnit.CELSIUS,
-                SensorType.PH: MeasureUnit.NONE,
-                SensorType.TURBIDITY: MeasureUnit.NTU,
-                SensorType.DISSOLVED_OXYGEN: MeasureUnit.MG_L,
-                SensorType.CONDUCTIVITY: MeasureUnit.US_CM,
-            }
-            expected_unit = sensor_units.get(sensor)
-            if unit != expected_unit and unit != MeasureUnit.NONE:
-                raise ValueError(
-                    f"Invalid measure unit '{unit}' for sensor type '{sensor}'. Expected: '{expected_unit}'."
-                )
+    @classmethod
+    def validate_measure_unit(cls, unit, info: ValidationInfo):
+        # Só é aplicada quando o contexto de validação a solicita: até aqui a checagem nunca rodou (o validador estava
+        # desativado), então payloads e leituras já gravadas com unidades divergentes continuam sendo aceitos
+        if not (info.context or {}).get(ENFORCE_MEASURE_UNITS):
+            return unit
+        sensor = info.data.get("sensor")
+        if sensor and not is_measure_unit_consistent(sensor, unit):
+            raise ValueError(
+                f"Invalid measure unit '{unit}' for sensor type '{sensor}'. "
+                f"Expected: '{SENSOR_MEASURE_UNITS.get(sensor)}'."
+            )
         return unit
 
+    def to_document(self) -> dict:
+        """
+        Monta o documento de inserção (sem o campo id) diretamente dos atributos,
+        equivalente a model_dump() sem passar pelo serializador do pydantic.
+        """
+        return {
+            "sensor": self.sensor,
+            "value": self.value,
+            "measure_unit": self.measure_unit,
+            "create_date": self.create_date,
+            "sensor_id": self.sensor_id,
+            "water_system_id": self.water_system_id,
+        }
+
     class Config:
         allow_population_by_field_name = True
         populate_by_name = True
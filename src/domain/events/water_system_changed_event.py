@@ -0,0 +1,25 @@
+from enum import Enum
+from typing import Optional
+
+from pydantic import BaseModel, Field
+
+from src.domain.entities.water_system import WaterSystem
+
+
+class WaterSystemChangeType(str, Enum):
+    CREATED = "created"
+    UPDATED = "updated"
+    DELETED = "deleted"
+    TWINNED = "twinned"
+
+
+class WaterSystemChangedEvent(BaseModel):
+    """Evento interno emitido quando um gêmeo digital é criado, alterado, removido ou atualizado pelo twinning."""
+    water_system_id: str = Field(..., description="Identificador do gêmeo digital alterado")
+    change_type: WaterSystemChangeType = Field(..., description="Tipo de alteração")
+    water_system: Optional[WaterSystem] = Field(
+        None, description="Estado atual do gêmeo digital, quando disponível (ex.: após o twinning)"
+    )
+    from_change_stream: bool = Field(
+        False, description="Evento vindo do change stream do MongoDB (inclui as alterações feitas por esta réplica)"
+    )
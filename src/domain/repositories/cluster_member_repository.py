@@ -0,0 +1,48 @@
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo import ASCENDING, IndexModel
+
+from src.infrastructure.adapters.mongodb_adapter import MongoDBAdapter
+from src.infrastructure.config.env_config import EnvConfig, EnvEntry
+from src.infrastructure.metrics.application_metrics import timed_mongodb_operation
+
+
+class ClusterMemberRepository:
+    INDEXES = [
+        # Remove automaticamente os registros de réplicas cujo lease expirou
+        IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0),
+    ]
+
+    def __init__(self, mongodb_adapter: Optional[MongoDBAdapter] = None):
+        env_config = EnvConfig()
+        collection_name = env_config.get(EnvEntry.MONGODB_CLUSTER_MEMBERS_COLLECTION, "cluster_members")
+        db = (mongodb_adapter or MongoDBAdapter()).get_database()
+        self.collection: AsyncIOMotorCollection = db[collection_name]
+
+    @timed_mongodb_operation
+    async def ensure_indexes(self) -> List[str]:
+        """Cria (de forma idempotente) o índice TTL dos leases."""
+        return await self.collection.create_indexes(self.INDEXES)
+
+    @timed_mongodb_operation
+    async def renew_lease(self, member_id: str, lease_seconds: float):
+        """Registra ou renova o lease de uma réplica."""
+        now = datetime.now(timezone.utc)
+        await self.collection.update_one(
+            {"_id": member_id},
+            {"$set": {"heartbeat_at": now, "expires_at": now + timedelta(seconds=lease_seconds)}},
+            upsert=True
+        )
+
+    @timed_mongodb_operation
+    async def list_active_members(self) -> List[str]:
+        """Lista os IDs das réplicas com lease válido, em ordem."""
+        cursor = self.collection.find({"expires_at": {"$gt": datetime.now(timezone.utc)}}, {"_id": 1})
+        return sorted([document["_id"] async for document in cursor])
+
+    @timed_mongodb_operation
+    async def release_lease(self, member_id: str):
+        """Remove o lease de uma réplica (encerramento gracioso)."""
+        await self.collection.delete_one({"_id": member_id})
@@ -1,38 +1,134 @@
 from datetime import datetime
-from typing import List
+from typing import List, Dict, Optional, Tuple, AsyncIterator
 
+import numpy
 from bson.objectid import ObjectId
 from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo import ASCENDING, IndexModel
+from pymongo.errors import BulkWriteError
 from pydantic import BaseModel
 
-from src.application.utils.object_util import ObjectUtil
+from src.application.utils.mongodb_index_util import MongoDBIndexUtil
+from src.domain.entities.sensor_window_statistics import SensorWindowStatistics
 from src.domain.events.sensor_reading_event import SensorReadingEvent
 from src.infrastructure.adapters.mongodb_adapter import MongoDBAdapter
 from src.infrastructure.config.env_config import EnvConfig, EnvEntry
+from src.infrastructure.metrics.application_metrics import timed_mongodb_operation
+
+DUPLICATE_KEY_ERROR_CODE = 11000
 
 
 class SensorReadingsQuery(BaseModel):
-    water_system_id: str = None
-    sensor_id: str = None
-    start_date: datetime = None
-    end_date: datetime = None
+    water_system_id: Optional[str] = None
+    sensor_id: Optional[str] = None
+    start_date: Optional[datetime] = None
+    end_date: Optional[datetime] = None
 
 
 class SensorReadingRepository:
-    def __init__(self):
+    # Índices compatíveis com os formatos de consulta deste repositório
+    INDEXES = [
+        # Janela de twinning de um sistema (find_readings / aggregate_window_statistics)
+        IndexModel([("water_system_id", ASCENDING), ("create_date", ASCENDING)], name="water_system_create_date"),
+        # Série temporal de um sensor específico
+        IndexModel([("water_system_id", ASCENDING), ("sensor_id", ASCENDING), ("create_date", ASCENDING)],
+                   name="water_system_sensor_create_date"),
+    ]
+
+    def __init__(self, mongodb_adapter: Optional[MongoDBAdapter] = None):
         env_config = EnvConfig()
-        collection_name = env_config.get(EnvEntry.MONGODB_SENSOR_READINGS_COLLECTION)
-        self.db = MongoDBAdapter().get_database()
-        self.collection: AsyncIOMotorCollection = self.db[collection_name]
+        self.collection_name = env_config.get(EnvEntry.MONGODB_SENSOR_READINGS_COLLECTION)
+        self.db = (mongodb_adapter or MongoDBAdapter()).get_database()
+        self.collection: AsyncIOMotorCollection = self.db[self.collection_name]
+
+    @timed_mongodb_operation
+    async def create_time_series_collection(self) -> bool:
+        """
+        Cria a coleção de leituras como time-series (create_date como campo de tempo).
+        Retorna False se a coleção já existir, pois uma coleção comum não pode ser convertida.
+        """
+        if self.collection_name in await self.db.list_collection_names(filter={"name": self.collection_name}):
+            return False
+        await self.db.create_collection(
+            self.collection_name,
+            timeseries={"timeField": "create_date", "metaField": "water_system_id", "granularity": "seconds"}
+        )
+        return True
+
+    @timed_mongodb_operation
+    async def is_time_series_collection(self) -> bool:
+        """Indica se a coleção de leituras é uma coleção time-series."""
+        async for collection_info in self.db.list_collections(filter={"name": self.collection_name}):
+            return collection_info.get("type") == "timeseries"
+        return False
+
+    @timed_mongodb_operation
+    async def apply_retention(self, expire_after_seconds: Optional[int]):
+        """
+        Configura a expiração automática das leituras brutas após `expire_after_seconds` (None mantém para sempre).
+        Em coleções time-series usa a opção expireAfterSeconds da coleção; nas demais, um índice TTL em create_date.
+        """
+        if await self.is_time_series_collection():
+            await self.db.command(
+                "collMod", self.collection_name,
+                expireAfterSeconds=expire_after_seconds if expire_after_seconds is not None else "off"
+            )
+        else:
+            await MongoDBIndexUtil.ensure_ttl_index(self.collection, "create_date", "create_date_ttl", expire_after_seconds)
+
+    @timed_mongodb_operation
+    async def ensure_indexes(self) -> List[str]:
+        """Cria (de forma idempotente) os índices usados pelas consultas de leituras."""
+        return await self.collection.create_indexes(self.INDEXES)
 
+    @timed_mongodb_operation
+    async def explain_find_readings(self, query: SensorReadingsQuery) -> dict:
+        """Retorna o plano de execução da consulta usada por find_readings."""
+        return await self.collection.find(self._build_mongo_query(query)).explain()
+
+    @timed_mongodb_operation
     async def insert_sensor_reading(self, sensor_reading: SensorReadingEvent) -> str:
         """Insere uma nova leitura de sensor."""
-        sensor_reading_dict = ObjectUtil.remove_fields(sensor_reading.model_dump(), ["id"])
-        result = await self.collection.insert_one(sensor_reading_dict)
+        result = await self.collection.insert_one(sensor_reading.to_document())
         return str(result.inserted_id)
 
-    async def find_readings(self, query: SensorReadingsQuery) -> List[SensorReadingEvent]:
-        """Busca leituras por sensor em um intervalo de tempo opcional."""
+    @timed_mongodb_operation
+    async def insert_sensor_readings(self, sensor_readings: List[SensorReadingEvent]) -> List[str]:
+        """Insere um lote de leituras de sensor em uma única operação não ordenada."""
+        result = await self.collection.insert_many([r.to_document() for r in sensor_readings], ordered=False)
+        return [str(inserted_id) for inserted_id in result.inserted_ids]
+
+    @timed_mongodb_operation
+    async def insert_sensor_reading_documents(self, documents: List[dict], deduplicate: bool = False) -> int:
+        """
+        Insere um lote de documentos de leituras que já trazem o `_id`, em uma operação não ordenada.
+        Documentos cujo `_id` já existe (gravados por uma tentativa anterior) são ignorados, o que torna a
+        reinserção idempotente. Retorna a quantidade inserida agora.
+        Coleções time-series não garantem `_id` único (não há erro de chave duplicada); nelas, use
+        `deduplicate=True` para consultar antes os `_id` já gravados, restrito ao intervalo de datas do lote
+        para que apenas os buckets do intervalo sejam lidos, e removê-los do lote.
+        """
+        if deduplicate and documents:
+            create_dates = [document["create_date"] for document in documents]
+            cursor = self.collection.find(
+                {"_id": {"$in": [document["_id"] for document in documents]},
+                 "create_date": {"$gte": min(create_dates), "$lte": max(create_dates)}},
+                {"_id": 1}
+            )
+            existing_ids = {document["_id"] async for document in cursor}
+            documents = [document for document in documents if document["_id"] not in existing_ids]
+        if not documents:
+            return 0
+        try:
+            result = await self.collection.insert_many(documents, ordered=False)
+            return len(result.inserted_ids)
+        except BulkWriteError as e:
+            if any(error.get("code") != DUPLICATE_KEY_ERROR_CODE for error in e.details.get("writeErrors", [])):
+                raise
+            return e.details.get("nInserted", 0)
+
+    @staticmethod
+    def _build_mongo_query(query: SensorReadingsQuery) -> dict:
         mongo_query = {}
         if query.sensor_id:
             mongo_query["sensor_id"] = query.sensor_id
@@ -43,13 +139,98 @@ class SensorReadingRepository:
         if query.end_date:
             mongo_query["create_date"] = mongo_query.get("create_date", {})
             mongo_query["create_date"]["$lte"] = query.end_date
+        return mongo_query
 
-        cursor = self.collection.find(mongo_query)
+    @timed_mongodb_operation
+    async def find_readings(self, query: SensorReadingsQuery) -> List[SensorReadingEvent]:
+        """Busca leituras por sensor em um intervalo de tempo opcional."""
+        cursor = self.collection.find(self._build_mongo_query(query))
         readings = []
         async for reading in cursor:
             readings.append(SensorReadingEvent(**reading, id=str(reading["_id"])))
         return readings
 
+    @timed_mongodb_operation
+    async def find_reading_series(self, query: SensorReadingsQuery, batch_size: int = 10000) \
+            -> Tuple[numpy.ndarray, numpy.ndarray]:
+        """
+        Busca as leituras do intervalo como colunas (timestamps em segundos Unix, valores), ordenadas por data.
+        Usa projeção e não cria modelos por leitura.
+        """
+        cursor = self.collection.find(
+            self._build_mongo_query(query), {"_id": 0, "create_date": 1, "value": 1}
+        ).sort("create_date", ASCENDING).batch_size(batch_size)
+
+        timestamps = []
+        values = []
+        async for reading in cursor:
+            timestamps.append(reading["create_date"].timestamp())
+            values.append(reading["value"])
+        return numpy.array(timestamps, dtype=numpy.float64), numpy.array(values, dtype=numpy.float64)
+
+    async def iterate_reading_columns(
+            self, water_system_id: str, start: datetime, end: datetime, chunk_size: int = 50000
+    ) -> AsyncIterator[Tuple[List[str], numpy.ndarray, numpy.ndarray]]:
+        """
+        Percorre as leituras de um sistema em [start, end) em ordem de data, com um cursor em lotes.
+        Retorna blocos de até `chunk_size` leituras como colunas (sensor_ids, timestamps em segundos Unix, valores);
+        leituras sem sensor_id são ignoradas.
+        """
+        cursor = self.collection.find(
+            {"water_system_id": water_system_id, "sensor_id": {"$ne": None}, "create_date": {"$gte": start, "$lt": end}},
+            {"_id": 0, "sensor_id": 1, "create_date": 1, "value": 1}
+        ).sort("create_date", ASCENDING).batch_size(min(chunk_size, 10000))
+
+        sensor_ids, timestamps, values = [], [], []
+        async for reading in cursor:
+            sensor_ids.append(reading["sensor_id"])
+            timestamps.append(reading["create_date"].timestamp())
+            values.append(reading["value"])
+            if len(sensor_ids) >= chunk_size:
+                yield sensor_ids, numpy.array(timestamps, dtype=numpy.float64), numpy.array(values, dtype=numpy.float64)
+                sensor_ids, timestamps, values = [], [], []
+        if sensor_ids:
+            yield sensor_ids, numpy.array(timestamps, dtype=numpy.float64), numpy.array(values, dtype=numpy.float64)
+
+    async def iterate_reading_documents(self, query: SensorReadingsQuery, batch_size: int = 65536) \
+            -> AsyncIterator[List[dict]]:
+        """
+        Percorre as leituras da consulta em ordem de data, em lotes de até `batch_size` documentos brutos,
+        sem criar modelos por leitura; apenas um lote fica em memória por vez.
+        """
+        cursor = self.collection.find(self._build_mongo_query(query)).sort("create_date", ASCENDING) \
+            .batch_size(min(batch_size, 10000))
+        while True:
+            documents = await cursor.to_list(batch_size)
+            if not documents:
+                return
+            yield documents
+
+    @timed_mongodb_operation
+    async def aggregate_window_statistics(self, query: SensorReadingsQuery) -> Dict[str, SensorWindowStatistics]:
+        """Calcula no MongoDB as estatísticas por sensor (média, mínimo, máximo e último valor) no intervalo."""
+        pipeline = [
+            {"$match": self._build_mongo_query(query)},
+            {"$sort": {"sensor_id": 1, "create_date": 1}},
+            {"$group": {
+                "_id": "$sensor_id",
+                "mean_value": {"$avg": "$value"},
+                "min_value": {"$min": "$value"},
+                "max_value": {"$max": "$value"},
+                "last_value": {"$last": "$value"},
+                "last_value_date": {"$last": "$create_date"},
+                "readings_count": {"$sum": 1},
+            }},
+        ]
+        sensors_statistics = {}
+        async for row in self.collection.aggregate(pipeline, allowDiskUse=True):
+            sensor_id = row.pop("_id")
+            if sensor_id is None:
+                continue
+            sensors_statistics[sensor_id] = SensorWindowStatistics(sensor_id=sensor_id, **row)
+        return sensors_statistics
+
+    @timed_mongodb_operation
     async def delete_reading_by_id(self, reading_id: str) -> bool:
         """Remove uma leitura específica pelo ID."""
         result = await self.collection.delete_one({"_id": ObjectId(reading_id)})
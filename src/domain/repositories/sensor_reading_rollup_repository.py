@@ -0,0 +1,160 @@
+from datetime import datetime, timedelta
+from enum import Enum
+from typing import Dict, List, Optional, Tuple
+
+import numpy
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo import ASCENDING, IndexModel
+
+from src.application.utils.mongodb_index_util import MongoDBIndexUtil
+from src.infrastructure.adapters.mongodb_adapter import MongoDBAdapter
+from src.infrastructure.config.env_config import EnvConfig, EnvEntry
+from src.infrastructure.metrics.application_metrics import timed_mongodb_operation
+
+
+class RollupTier(str, Enum):
+    MINUTE = "minute"
+    HOUR = "hour"
+
+
+ROLLUP_TIER_SECONDS = {RollupTier.MINUTE: 60, RollupTier.HOUR: 3600}
+
+
+class SensorReadingRollupRepository:
+    INDEXES = [
+        # Série de um sensor em um tier
+        IndexModel([("water_system_id", ASCENDING), ("sensor_id", ASCENDING), ("bucket_start", ASCENDING)],
+                   name="water_system_sensor_bucket_start"),
+        # Início do tier seguinte (menor bucket_start)
+        IndexModel([("bucket_start", ASCENDING)], name="bucket_start"),
+    ]
+
+    def __init__(self, mongodb_adapter: Optional[MongoDBAdapter] = None):
+        """
+        Coleções de rollup das leituras: `<leituras>_minute` e `<leituras>_hour`, com count/sum/min/max/último valor
+        por sensor e bucket, e `<leituras>_rollup_watermarks` com o instante até o qual cada tier está completo.
+        """
+        env_config = EnvConfig()
+        readings_collection_name = env_config.get(EnvEntry.MONGODB_SENSOR_READINGS_COLLECTION)
+        db = (mongodb_adapter or MongoDBAdapter()).get_database()
+        self.readings_collection: AsyncIOMotorCollection = db[readings_collection_name]
+        self.collections: Dict[RollupTier, AsyncIOMotorCollection] = {
+            tier: db[f"{readings_collection_name}_{tier.value}"] for tier in RollupTier
+        }
+        self.watermarks: AsyncIOMotorCollection = db[f"{readings_collection_name}_rollup_watermarks"]
+
+    @timed_mongodb_operation
+    async def ensure_indexes(self) -> List[str]:
+        """Cria (de forma idempotente) os índices das coleções de rollup."""
+        names = []
+        for collection in self.collections.values():
+            names.extend(await collection.create_indexes(self.INDEXES))
+        return names
+
+    @timed_mongodb_operation
+    async def apply_retention(self, tier: RollupTier, expire_after_seconds: Optional[int]):
+        """Configura a expiração dos buckets de um tier (None mantém para sempre)."""
+        await MongoDBIndexUtil.ensure_ttl_index(
+            self.collections[tier], "bucket_start", "bucket_start_ttl", expire_after_seconds
+        )
+
+    @timed_mongodb_operation
+    async def get_watermark(self, tier: RollupTier) -> Optional[datetime]:
+        """Instante até o qual (exclusive) o tier está completo."""
+        document = await self.watermarks.find_one({"_id": tier.value})
+        return document["until"] if document else None
+
+    @timed_mongodb_operation
+    async def set_watermark(self, tier: RollupTier, until: datetime):
+        await self.watermarks.update_one({"_id": tier.value}, {"$set": {"until": until}}, upsert=True)
+
+    @timed_mongodb_operation
+    async def find_first_source_date(self, tier: RollupTier) -> Optional[datetime]:
+        """Data mais antiga disponível na fonte do tier (leituras brutas para minute, buckets de minute para hour)."""
+        if tier == RollupTier.MINUTE:
+            document = await self.readings_collection.find_one({}, {"create_date": 1}, sort=[("create_date", ASCENDING)])
+            return document["create_date"] if document else None
+        document = await self.collections[RollupTier.MINUTE].find_one(
+            {}, {"bucket_start": 1}, sort=[("bucket_start", ASCENDING)]
+        )
+        return document["bucket_start"] if document else None
+
+    def _rollup_pipeline(self, tier: RollupTier, start: datetime, end: datetime) -> list:
+        if tier == RollupTier.MINUTE:
+            date_field = "$create_date"
+            match = {"create_date": {"$gte": start, "$lt": end}, "sensor_id": {"$ne": None}}
+            sort = {"create_date": 1}
+            accumulators = {
+                "count": {"$sum": 1},
+                "sum": {"$sum": "$value"},
+                "min_value": {"$min": "$value"},
+                "max_value": {"$max": "$value"},
+                "last_value": {"$last": "$value"},
+                "last_value_date": {"$last": "$create_date"},
+            }
+        else:
+            date_field = "$bucket_start"
+            match = {"bucket_start": {"$gte": start, "$lt": end}}
+            sort = {"bucket_start": 1}
+            accumulators = {
+                "count": {"$sum": "$count"},
+                "sum": {"$sum": "$sum"},
+                "min_value": {"$min": "$min_value"},
+                "max_value": {"$max": "$max_value"},
+                "last_value": {"$last": "$last_value"},
+                "last_value_date": {"$last": "$last_value_date"},
+            }
+
+        return [
+            {"$match": match},
+            {"$sort": sort},
+            {"$group": {
+                "_id": {
+                    "water_system_id": "$water_system_id",
+                    "sensor_id": "$sensor_id",
+                    "bucket_start": {"$dateTrunc": {"date": date_field, "unit": tier.value}},
+                },
+                **accumulators,
+            }},
+            {"$set": {
+                "water_system_id": "$_id.water_system_id",
+                "sensor_id": "$_id.sensor_id",
+                "bucket_start": "$_id.bucket_start",
+            }},
+            # Os buckets do intervalo são recalculados por inteiro, então substituir é idempotente
+            {"$merge": {
+                "into": self.collections[tier].name, "on": "_id", "whenMatched": "replace", "whenNotMatched": "insert"
+            }},
+        ]
+
+    @timed_mongodb_operation
+    async def merge_rollup(self, tier: RollupTier, start: datetime, end: datetime):
+        """Agrega a fonte do tier no intervalo [start, end) e grava os buckets via $merge."""
+        source = self.readings_collection if tier == RollupTier.MINUTE else self.collections[RollupTier.MINUTE]
+        await source.aggregate(self._rollup_pipeline(tier, start, end), allowDiskUse=True).to_list(length=None)
+
+    @timed_mongodb_operation
+    async def find_rollup_series(
+            self, tier: RollupTier, water_system_id: str, sensor_id: str, start: datetime, end: datetime,
+            batch_size: int = 10000
+    ) -> Tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray, numpy.ndarray, numpy.ndarray]:
+        """
+        Busca os buckets de um sensor que intersectam [start, end), ordenados por data.
+        Retorna colunas (início do bucket em segundos Unix, média, quantidade, mínimo, máximo).
+        """
+        cursor = self.collections[tier].find(
+            {
+                "water_system_id": water_system_id,
+                "sensor_id": sensor_id,
+                "bucket_start": {"$gt": start - timedelta(seconds=ROLLUP_TIER_SECONDS[tier]), "$lt": end},
+            },
+            {"_id": 0, "bucket_start": 1, "count": 1, "sum": 1, "min_value": 1, "max_value": 1}
+        ).sort("bucket_start", ASCENDING).batch_size(batch_size)
+
+        rows = [
+            (bucket["bucket_start"].timestamp(), bucket["count"], bucket["sum"], bucket["min_value"], bucket["max_value"])
+            async for bucket in cursor
+        ]
+        columns = numpy.array(rows, dtype=numpy.float64).reshape(-1, 5)
+        counts = columns[:, 1]
+        return columns[:, 0], columns[:, 2] / numpy.maximum(counts, 1), counts, columns[:, 3], columns[:, 4]
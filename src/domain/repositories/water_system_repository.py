@@ -1,34 +1,77 @@
-from typing import List
+from typing import List, Optional, AsyncIterator, Tuple, Dict, Any, Set
 
 from bson import ObjectId
+from pymongo import ASCENDING, IndexModel, UpdateOne, DeleteOne
+from pymongo.errors import BulkWriteError
 
 from src.application.utils.object_util import ObjectUtil
 from src.domain.entities.water_system import WaterSystem
 from src.infrastructure.adapters.mongodb_adapter import MongoDBAdapter
 from src.infrastructure.config.env_config import EnvConfig, EnvEntry
+from src.infrastructure.metrics.application_metrics import timed_mongodb_operation
 
 
 class WaterSystemRepository:
-    def __init__(self):
+    INDEXES = [
+        # Seleção dos sistemas monitorados pelo pipeline
+        IndexModel([("status", ASCENDING)], name="status"),
+        # Listagem paginada por _id com filtros de status e tipo
+        IndexModel([("status", ASCENDING), ("system_type", ASCENDING), ("_id", ASCENDING)], name="status_type_id"),
+    ]
+
+    def __init__(self, mongodb_adapter: Optional[MongoDBAdapter] = None):
         env_config = EnvConfig()
         collection_name = env_config.get(EnvEntry.MONGODB_WATER_SYSTEMS_COLLECTION)
-        db = MongoDBAdapter().get_database()
+        db = (mongodb_adapter or MongoDBAdapter()).get_database()
         self.collection = db[collection_name]
 
+    @timed_mongodb_operation
+    async def ensure_indexes(self) -> List[str]:
+        """Create (idempotently) the indexes used by the WaterSystem queries."""
+        return await self.collection.create_indexes(self.INDEXES)
+
+    @timed_mongodb_operation
+    async def explain_list_water_systems(self, filter_query=None) -> dict:
+        """Return the query plan of a list_water_systems filter query."""
+        return await self.collection.find(filter_query or {}).explain()
+
+    @timed_mongodb_operation
     async def create_water_system(self, water_system: WaterSystem) -> str:
         """Insert a new WaterSystem into the database."""
         water_system_dict = ObjectUtil.remove_fields(water_system.model_dump(), ["id"])
         result = await self.collection.insert_one(water_system_dict)
         return str(result.inserted_id)
 
-    async def get_water_system_by_id(self, water_system_id: str) -> WaterSystem:
+    @timed_mongodb_operation
+    async def create_water_systems(self, water_systems: List[WaterSystem]) -> Tuple[List[str], Dict[int, str]]:
+        """
+        Insert many WaterSystems with a single unordered insert_many.
+        :return: The IDs assigned to every WaterSystem (in input order) and the error message of each
+            position that could not be inserted.
+        """
+        documents = [ObjectUtil.remove_fields(water_system.model_dump(), ["id"]) for water_system in water_systems]
+        for document in documents:
+            document["_id"] = ObjectId()
+        write_errors = {}
+        if documents:
+            try:
+                await self.collection.insert_many(documents, ordered=False)
+            except BulkWriteError as e:
+                write_errors = self._write_errors_by_index(e)
+        return [str(document["_id"]) for document in documents], write_errors
+
+    @timed_mongodb_operation
+    async def get_water_system_by_id(self, water_system_id: str) -> Optional[WaterSystem]:
         """Retrieve a WaterSystem by its ID."""
         water_system_dict = await self.collection.find_one({"_id": ObjectId(water_system_id)})
+        if water_system_dict is None:
+            return None
         water_system_dict["id"] = str(water_system_dict["_id"])
         del water_system_dict["_id"]
         water_system = WaterSystem.model_validate(water_system_dict)
         return water_system
 
+    @timed_mongodb_operation
     async def update_water_system(self, water_system_id: str, update_data: WaterSystem) -> int:
         """Update an existing WaterSystem."""
         update_object = ObjectUtil.remove_fields(update_data.model_dump(), ["id"])
@@ -37,11 +80,97 @@ class WaterSystemRepository:
         )
         return result.modified_count
 
+    @timed_mongodb_operation
+    async def bulk_update_sensor_fields(self, sensor_updates: Dict[str, Dict[str, Dict[str, Any]]]) -> int:
+        """
+        Apply targeted per-sensor field updates to many WaterSystems in a single unordered bulk write.
+        Only the given fields of the matching `sensors` array elements are written.
+        :param sensor_updates: {water_system_id: {sensor_id: {field: value}}}. Requests are issued in the
+            dict's iteration order, so BulkWriteError indexes map back to its keys.
+        :return: The number of modified documents.
+        """
+        requests = []
+        for water_system_id, sensors in sensor_updates.items():
+            set_fields, array_filters = {}, []
+            for position, (sensor_id, fields) in enumerate(sensors.items()):
+                identifier = f"s{position}"
+                array_filters.append({f"{identifier}.sensor_id": sensor_id})
+                for field, value in fields.items():
+                    set_fields[f"sensors.$[{identifier}].{field}"] = value
+            requests.append(UpdateOne({"_id": ObjectId(water_system_id)}, {"$set": set_fields}, array_filters=array_filters))
+
+        if not requests:
+            return 0
+        result = await self.collection.bulk_write(requests, ordered=False)
+        return result.modified_count
+
+    @timed_mongodb_operation
+    async def bulk_update_water_systems(self, updates: List[Tuple[str, Dict[str, Any]]]) -> Dict[int, str]:
+        """
+        Apply partial updates ($set of the given fields) to many WaterSystems in a single unordered bulk write.
+        :param updates: (water_system_id, {field: value}) pairs.
+        :return: The error message of each position that could not be written.
+        """
+        requests = [UpdateOne({"_id": ObjectId(water_system_id)}, {"$set": fields}) for water_system_id, fields in updates]
+        if not requests:
+            return {}
+        try:
+            await self.collection.bulk_write(requests, ordered=False)
+        except BulkWriteError as e:
+            return self._write_errors_by_index(e)
+        return {}
+
+    @timed_mongodb_operation
+    async def bulk_delete_water_systems(self, water_system_ids: List[str]) -> Dict[int, str]:
+        """
+        Delete many WaterSystems in a single unordered bulk write.
+        :return: The error message of each position that could not be deleted.
+        """
+        requests = [DeleteOne({"_id": ObjectId(water_system_id)}) for water_system_id in water_system_ids]
+        if not requests:
+            return {}
+        try:
+            await self.collection.bulk_write(requests, ordered=False)
+        except BulkWriteError as e:
+            return self._write_errors_by_index(e)
+        return {}
+
+    @staticmethod
+    def _write_errors_by_index(error: BulkWriteError) -> Dict[int, str]:
+        return {write_error["index"]: write_error.get("errmsg", "Write error")
+                for write_error in error.details.get("writeErrors", [])}
+
+    @timed_mongodb_operation
+    async def find_existing_ids(self, water_system_ids: List[str]) -> Set[str]:
+        """Return which of the given IDs belong to existing WaterSystems."""
+        if not water_system_ids:
+            return set()
+        cursor = self.collection.find(
+            {"_id": {"$in": [ObjectId(water_system_id) for water_system_id in water_system_ids]}}, {"_id": 1}
+        )
+        return {str(document["_id"]) async for document in cursor}
+
+    @timed_mongodb_operation
+    async def find_water_system_documents_by_ids(self, water_system_ids: List[str]) -> Dict[str, dict]:
+        """Retrieve raw WaterSystem documents by ID with a single $in query, keyed by ID."""
+        if not water_system_ids:
+            return {}
+        cursor = self.collection.find(
+            {"_id": {"$in": [ObjectId(water_system_id) for water_system_id in water_system_ids]}}
+        )
+        documents = {}
+        async for document in cursor:
+            document["id"] = str(document.pop("_id"))
+            documents[document["id"]] = document
+        return documents
+
+    @timed_mongodb_operation
     async def delete_water_system(self, water_system_id: str) -> int:
         """Delete a WaterSystem by its ID."""
         result = await self.collection.delete_one({"_id": ObjectId(water_system_id)})
         return result.deleted_count
 
+    @timed_mongodb_operation
     async def list_water_systems(self, filter_query=None) -> List[WaterSystem]:
         """List all WaterSystems that match a filter query."""
         filter_query = filter_query or {}
@@ -54,3 +183,51 @@ class WaterSystemRepository:
 
         water_systems = [WaterSystem.model_validate(ws) for ws in water_systems_dict]
         return water_systems
+
+    async def iterate_water_system_documents(
+            self, filter_query=None, after_id: Optional[str] = None, limit: Optional[int] = None,
+            projection: Optional[dict] = None, batch_size: int = 500
+    ) -> AsyncIterator[dict]:
+        """
+        Stream raw WaterSystem documents ordered by _id, without loading the whole collection in memory.
+        :param after_id: Keyset cursor; only documents with _id greater than it are returned.
+        :param projection: Optional MongoDB projection (e.g. {"sensors": 0}).
+        """
+        filter_query = dict(filter_query or {})
+        if after_id:
+            filter_query["_id"] = {"$gt": ObjectId(after_id)}
+
+        cursor = self.collection.find(filter_query, projection).sort("_id", ASCENDING).batch_size(batch_size)
+        if limit:
+            cursor = cursor.limit(limit)
+        async for ws in cursor:
+            ws["id"] = str(ws.pop("_id"))
+            yield ws
+
+    @timed_mongodb_operation
+    async def list_water_systems_by_ids(self, water_system_ids: List[str], filter_query=None) -> List[WaterSystem]:
+        """List the WaterSystems with the given IDs that match an optional filter query."""
+        filter_query = dict(filter_query or {})
+        filter_query["_id"] = {"$in": [ObjectId(water_system_id) for water_system_id in water_system_ids]}
+        return await self.list_water_systems(filter_query)
+
+    async def watch_changes(self, resume_token=None, full_document: bool = False) \
+            -> AsyncIterator[Tuple[str, str, dict, Optional[WaterSystem], List[str]]]:
+        """
+        Yield (water_system_id, operation_type, resume_token, water_system, updated_fields) for every change
+        in the collection.
+        :param full_document: Look up the current document of updates; otherwise `water_system` is only set for
+            inserts and replaces. It is always None for deletes.
+        """
+        async with self.collection.watch(
+                resume_after=resume_token, full_document="updateLookup" if full_document else None
+        ) as stream:
+            async for change in stream:
+                water_system = None
+                water_system_dict = change.get("fullDocument")
+                if water_system_dict is not None:
+                    water_system_dict["id"] = str(water_system_dict.pop("_id"))
+                    water_system = WaterSystem.model_validate(water_system_dict)
+                updated_fields = list(change.get("updateDescription", {}).get("updatedFields", {}))
+                yield str(change["documentKey"]["_id"]), change["operationType"], stream.resume_token, \
+                    water_system, updated_fields
@@ -0,0 +1,80 @@
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo import ASCENDING, IndexModel, ReplaceOne
+
+from src.infrastructure.adapters.mongodb_adapter import MongoDBAdapter
+from src.infrastructure.config.env_config import EnvConfig, EnvEntry
+from src.infrastructure.metrics.application_metrics import timed_mongodb_operation
+
+
+class WaterSystemTwinHistoryRepository:
+    INDEXES = [
+        # Uma estatística por sensor e janela; torna as regravações de um replay idempotentes
+        IndexModel([("water_system_id", ASCENDING), ("sensor_id", ASCENDING), ("window_start", ASCENDING)],
+                   name="water_system_sensor_window_start", unique=True),
+        # Histórico de um sistema em um intervalo
+        IndexModel([("water_system_id", ASCENDING), ("window_start", ASCENDING)], name="water_system_window_start"),
+    ]
+
+    def __init__(self, mongodb_adapter: Optional[MongoDBAdapter] = None):
+        """
+        Histórico do estado dos gêmeos: `<sistemas>_twin_history` guarda as estatísticas de cada sensor por janela
+        de twinning e `<sistemas>_replay_checkpoints` o progresso de cada replay, para retomada.
+        """
+        env_config = EnvConfig()
+        water_systems_collection_name = env_config.get(EnvEntry.MONGODB_WATER_SYSTEMS_COLLECTION)
+        db = (mongodb_adapter or MongoDBAdapter()).get_database()
+        self.collection: AsyncIOMotorCollection = db[f"{water_systems_collection_name}_twin_history"]
+        self.checkpoints: AsyncIOMotorCollection = db[f"{water_systems_collection_name}_replay_checkpoints"]
+
+    @timed_mongodb_operation
+    async def ensure_indexes(self) -> List[str]:
+        """Cria (de forma idempotente) os índices do histórico."""
+        return await self.collection.create_indexes(self.INDEXES)
+
+    @timed_mongodb_operation
+    async def write_windows(self, documents: List[dict]) -> int:
+        """Grava (upsert) as estatísticas de janelas em um único bulk write não ordenado. Retorna os documentos gravados."""
+        if not documents:
+            return 0
+        requests = [
+            ReplaceOne(
+                {"water_system_id": document["water_system_id"], "sensor_id": document["sensor_id"],
+                 "window_start": document["window_start"]},
+                document, upsert=True
+            )
+            for document in documents
+        ]
+        result = await self.collection.bulk_write(requests, ordered=False)
+        return result.upserted_count + result.modified_count
+
+    @timed_mongodb_operation
+    async def get_checkpoint(self, replay_id: str) -> Optional[dict]:
+        return await self.checkpoints.find_one({"_id": replay_id})
+
+    @timed_mongodb_operation
+    async def create_checkpoint(self, replay_id: str, parameters: dict):
+        """Registra um replay novo, ou o marca como em execução novamente ao ser retomado."""
+        await self.checkpoints.update_one(
+            {"_id": replay_id},
+            {"$set": {"status": "running", "updated_at": datetime.now(timezone.utc)},
+             "$setOnInsert": {**parameters, "progress": {}}},
+            upsert=True
+        )
+
+    @timed_mongodb_operation
+    async def save_progress(self, replay_id: str, water_system_id: str, completed_until: datetime):
+        """Registra que as janelas do sistema anteriores a `completed_until` já foram gravadas."""
+        await self.checkpoints.update_one(
+            {"_id": replay_id},
+            {"$set": {f"progress.{water_system_id}": completed_until, "updated_at": datetime.now(timezone.utc)}}
+        )
+
+    @timed_mongodb_operation
+    async def finish_checkpoint(self, replay_id: str, status: str, report: Dict):
+        await self.checkpoints.update_one(
+            {"_id": replay_id},
+            {"$set": {"status": status, "report": report, "updated_at": datetime.now(timezone.utc)}}
+        )
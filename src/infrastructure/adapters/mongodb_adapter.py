@@ -3,16 +3,36 @@ from typing import Any
 
 from src.infrastructure.config.env_config import EnvConfig, EnvEntry
 
+# Opções do pool de conexões do driver, lidas das variáveis de ambiente quando definidas
+_CLIENT_OPTIONS = {
+    "maxPoolSize": (EnvEntry.MONGODB_MAX_POOL_SIZE, int),
+    "minPoolSize": (EnvEntry.MONGODB_MIN_POOL_SIZE, int),
+    "maxIdleTimeMS": (EnvEntry.MONGODB_MAX_IDLE_TIME_MS, int),
+    "waitQueueTimeoutMS": (EnvEntry.MONGODB_WAIT_QUEUE_TIMEOUT_MS, int),
+    "serverSelectionTimeoutMS": (EnvEntry.MONGODB_SERVER_SELECTION_TIMEOUT_MS, int),
+    "connectTimeoutMS": (EnvEntry.MONGODB_CONNECT_TIMEOUT_MS, int),
+    "socketTimeoutMS": (EnvEntry.MONGODB_SOCKET_TIMEOUT_MS, int),
+    "readPreference": (EnvEntry.MONGODB_READ_PREFERENCE, str),
+}
+
 
 class MongoDBAdapter:
     def __init__(self):
         """
         Inicializa o adaptador com a string de conexão e o nome do banco de dados.
+        Deve existir uma única instância por processo, compartilhada por todos os repositórios.
         """
         env_config = EnvConfig()
         conn_str = env_config.get(EnvEntry.MONGODB_CONNECTION_STRING)
         db_name = env_config.get(EnvEntry.MONGODB_DATABASE_NAME)
-        self._client = AsyncIOMotorClient(conn_str, tz_aware=True)
+
+        client_options = {}
+        for option, (entry, cast) in _CLIENT_OPTIONS.items():
+            value = env_config.get(entry)
+            if value:
+                client_options[option] = cast(value)
+
+        self._client = AsyncIOMotorClient(conn_str, tz_aware=True, **client_options)
         self._database = self._client[db_name]
 
     def get_database(self) -> AsyncIOMotorDatabase[Any]:
@@ -1,17 +1,25 @@
-import asyncio
-from typing import Callable, Any, Coroutine
+import logging
+from typing import Callable, Any, Coroutine, Optional
 
 import paho.mqtt.client as mqtt
 import paho.mqtt.enums as mqtt_enums
 from pydantic import BaseModel, Field
 
-from src.logging_config import get_custom_logger
+from src.infrastructure.adapters.mqtt_dispatch_queue import MQTTDispatchQueue, OverflowPolicy
+from src.infrastructure.metrics.application_metrics import MQTT_MESSAGES_RECEIVED
+from src.logging_config import get_custom_logger, get_hot_path_rate_limiter
 
 
 class MQTTConfig(BaseModel):
     broker_url: str = Field(..., description="URL do broker MQTT")
     broker_port: int = Field(..., gt=0, description="Porta do broker MQTT")
     client_id: str = Field(..., description="ID único do cliente MQTT")
+    dispatch_queue_size: int = Field(10000, gt=0, description="Tamanho máximo da fila de despacho de mensagens")
+    dispatch_workers: int = Field(8, gt=0, description="Quantidade de consumidores da fila de despacho")
+    dispatch_overflow_policy: OverflowPolicy = Field(OverflowPolicy.BLOCK, description="Política quando a fila está cheia")
+    shared_subscription_group: Optional[str] = Field(
+        None, description="Grupo de assinatura compartilhada (MQTT v5) para dividir as mensagens entre réplicas"
+    )
 
 
 class MQTTBrokerAdapter:
@@ -21,12 +29,23 @@ class MQTTBrokerAdapter:
         :param config: Configuração para o MQTT.
         """
         self.logger = get_custom_logger(MQTTBrokerAdapter.__name__)
+        self.message_log_limiter = get_hot_path_rate_limiter()
         self.config = config
-        self.client = mqtt.Client(mqtt_enums.CallbackAPIVersion(2))
+        if config.shared_subscription_group:
+            # Assinaturas compartilhadas ($share/<grupo>/...) exigem MQTT v5
+            self.client = mqtt.Client(mqtt_enums.CallbackAPIVersion(2), client_id=config.client_id,
+                                      protocol=mqtt.MQTTv5)
+        else:
+            self.client = mqtt.Client(mqtt_enums.CallbackAPIVersion(2), client_id=config.client_id)
 
         # Dicionário para armazenar handlers associados a tópicos
         self.handlers = {}
         self.event_loop = None
+        self.dispatch_queue = MQTTDispatchQueue(
+            maxsize=config.dispatch_queue_size,
+            worker_count=config.dispatch_workers,
+            overflow_policy=config.dispatch_overflow_policy
+        )
 
         # Configura os callbacks
         self.client.on_connect = self._on_connect
@@ -39,21 +58,23 @@ class MQTTBrokerAdapter:
             self.logger.info("Conectado ao broker com sucesso!")
             # Assina todos os tópicos previamente registrados
             for topic in self.handlers.keys():
-                self.client.subscribe(topic)
-                self.logger.info(f"Tópico registrado automaticamente: {topic}")
+                self.client.subscribe(self.subscription_topic(topic))
+                self.logger.info(f"Tópico registrado automaticamente: {self.subscription_topic(topic)}")
         else:
             self.logger.info(f"Erro ao conectar ao broker, código: {rc}")
 
     def _on_message(self, client, userdata, msg):
         """Callback chamado quando uma mensagem é recebida."""
-        self.logger.info(f"New message received on topic {msg.topic}")
+        MQTT_MESSAGES_RECEIVED.labels(msg.topic).inc()
+        if self.logger.isEnabledFor(logging.INFO) and self.message_log_limiter.allow():
+            self.logger.info("New message received on topic %s (%d similar messages suppressed)",
+                             msg.topic, self.message_log_limiter.take_suppressed())
         matched = False
         for pattern, handler in self.handlers.items():
             if self.matches_topic(pattern, msg.topic):
-                try:
-                    asyncio.run_coroutine_threadsafe(handler(msg.topic, msg.payload.decode()), self.event_loop)
-                except Exception as e:
-                    self.logger.error(f"Failure when sending message from MQTT thread to event loop: {e}")
+                if not self.dispatch_queue.put(handler, msg.topic, msg.payload):
+                    self.logger.warning(f"Dispatch queue full, message dropped on topic {msg.topic} "
+                                        f"({self.dispatch_queue.dropped} dropped so far)")
                 matched = True
                 break
 
@@ -71,17 +92,17 @@ class MQTTBrokerAdapter:
         """
         self.event_loop = event_loop
 
-    def register_handler(self, topic: str, handler: Callable[[str, str], Coroutine[Any, Any, None]]):
+    def register_handler(self, topic: str, handler: Callable[[str, bytes], Coroutine[Any, Any, None]]):
         """
         Registra um handler para um tópico específico.
         :param topic: O tópico para o qual o handler será associado.
-        :param handler: Uma função que processará as mensagens do tópico.
+        :param handler: Uma função que processará as mensagens do tópico (recebe o tópico e o payload em bytes).
         """
         self.handlers[topic] = handler
         self.logger.info(f"Handler registrado para o tópico: {topic}")
         if self.client.is_connected():
-            self.client.subscribe(topic)
-            self.logger.info(f"Tópico {topic} assinado.")
+            self.client.subscribe(self.subscription_topic(topic))
+            self.logger.info(f"Tópico {self.subscription_topic(topic)} assinado.")
 
     def connect(self):
         """
@@ -94,6 +115,7 @@ class MQTTBrokerAdapter:
         """
         Inicia o loop para processar mensagens.
         """
+        self.dispatch_queue.start(self.event_loop)
         self.client.loop_start()
         self.logger.info("Loop MQTT iniciado.")
 
@@ -101,10 +123,32 @@ class MQTTBrokerAdapter:
         """
         Para o loop e desconecta do broker.
         """
+        self.dispatch_queue.close()
         self.client.loop_stop()
         self.client.disconnect()
         self.logger.info("Loop MQTT parado e cliente desconectado.")
 
+    async def drain(self):
+        """
+        Aguarda o processamento das mensagens que já estavam na fila de despacho.
+        """
+        await self.dispatch_queue.join()
+
+    def get_dispatch_stats(self) -> dict:
+        """
+        Retorna os contadores da fila de despacho (profundidade, recebidas, despachadas, descartadas, falhas).
+        """
+        return self.dispatch_queue.get_stats()
+
+    def subscription_topic(self, topic: str) -> str:
+        """
+        Retorna o filtro efetivamente assinado no broker: com grupo configurado, `$share/<grupo>/<tópico>`,
+        para que cada mensagem seja entregue a apenas uma das réplicas do grupo.
+        """
+        if self.config.shared_subscription_group:
+            return f"$share/{self.config.shared_subscription_group}/{topic}"
+        return topic
+
     @staticmethod
     def matches_topic(pattern, topic):
         """
@@ -114,6 +158,9 @@ class MQTTBrokerAdapter:
         :return: True se corresponder, False caso contrário
         """
         pattern_parts = pattern.split('/')
+        if pattern_parts[0] == '$share':
+            # Em assinaturas compartilhadas as mensagens chegam com o tópico original, sem o prefixo $share/<grupo>
+            pattern_parts = pattern_parts[2:]
         topic_parts = topic.split('/')
 
         for i, part in enumerate(pattern_parts):
@@ -0,0 +1,163 @@
+import asyncio
+import threading
+from collections import deque
+from enum import Enum
+from typing import Callable, Any, Coroutine, Optional, List
+
+from src.infrastructure.metrics.application_metrics import MQTT_MESSAGES_DROPPED, MQTT_MESSAGES_DISPATCHED, \
+    MQTT_MESSAGES_FAILED
+from src.logging_config import get_custom_logger
+
+
+class OverflowPolicy(str, Enum):
+    BLOCK = "block"
+    DROP_OLDEST = "drop_oldest"
+    DROP_NEWEST = "drop_newest"
+
+
+class MQTTDispatchQueue:
+    def __init__(self, maxsize: int, worker_count: int, overflow_policy: OverflowPolicy):
+        """
+        Fila limitada entre a thread de rede do paho e o event loop.
+        :param maxsize: Quantidade máxima de mensagens aguardando processamento.
+        :param worker_count: Quantidade de tarefas consumidoras no event loop.
+        :param overflow_policy: Comportamento quando a fila está cheia.
+        """
+        self.logger = get_custom_logger(MQTTDispatchQueue.__name__)
+        self.maxsize = maxsize
+        self.worker_count = worker_count
+        self.overflow_policy = overflow_policy
+
+        self._items = deque()
+        self._condition = threading.Condition()
+        self._idle_workers = 0
+        self._closed = False
+        self._event_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._workers: List[asyncio.Task] = []
+
+        # Contadores
+        self.received = 0
+        self.dispatched = 0
+        self.dropped = 0
+        self.failed = 0
+
+    def start(self, event_loop: asyncio.AbstractEventLoop):
+        """
+        Inicia as tarefas consumidoras no event loop informado.
+        Pode ser chamado de qualquer thread.
+        """
+        self._event_loop = event_loop
+        with self._condition:
+            self._closed = False
+        try:
+            running_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            running_loop = None
+        if running_loop is event_loop:
+            self._start_workers()
+        else:
+            event_loop.call_soon_threadsafe(self._start_workers)
+
+    def put(self, handler: Callable[[str, Any], Coroutine[Any, Any, None]], topic: str, payload: Any) -> bool:
+        """
+        Enfileira uma mensagem a partir da thread do paho.
+        :return: False se a mensagem foi descartada.
+        """
+        with self._condition:
+            self.received += 1
+            if self._closed:
+                self._drop(topic)
+                return False
+
+            if len(self._items) >= self.maxsize:
+                if self.overflow_policy == OverflowPolicy.DROP_NEWEST:
+                    self._drop(topic)
+                    return False
+                elif self.overflow_policy == OverflowPolicy.DROP_OLDEST:
+                    _, oldest_topic, _ = self._items.popleft()
+                    self._drop(oldest_topic)
+                else:
+                    while len(self._items) >= self.maxsize and not self._closed:
+                        self._condition.wait()
+                    if self._closed:
+                        self._drop(topic)
+                        return False
+
+            self._items.append((handler, topic, payload))
+            wake_workers = self._idle_workers > 0
+
+        if wake_workers:
+            self._event_loop.call_soon_threadsafe(self._wakeup.set)
+        return True
+
+    def close(self):
+        """Recusa novas mensagens e libera a thread do paho caso esteja bloqueada."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        if self._event_loop is not None and self._wakeup is not None:
+            self._event_loop.call_soon_threadsafe(self._wakeup.set)
+
+    async def join(self):
+        """Aguarda os consumidores processarem as mensagens restantes e encerrarem."""
+        if self._workers:
+            await asyncio.gather(*self._workers, return_exceptions=True)
+            self._workers = []
+
+    def depth(self) -> int:
+        """Retorna a quantidade de mensagens aguardando processamento."""
+        return len(self._items)
+
+    def get_stats(self) -> dict:
+        """Retorna os contadores da fila."""
+        return {
+            "depth": self.depth(),
+            "received": self.received,
+            "dispatched": self.dispatched,
+            "dropped": self.dropped,
+            "failed": self.failed,
+        }
+
+    def _drop(self, topic: str):
+        self.dropped += 1
+        MQTT_MESSAGES_DROPPED.labels(topic).inc()
+
+    def _start_workers(self):
+        if self._wakeup is None:
+            self._wakeup = asyncio.Event()
+        while len(self._workers) < self.worker_count:
+            self._workers.append(self._event_loop.create_task(self._worker()))
+
+    def _next_item(self):
+        with self._condition:
+            if self._items:
+                item = self._items.popleft()
+                self._condition.notify()
+                return item
+            if self._closed:
+                return None
+            self._idle_workers += 1
+            self._wakeup.clear()
+            return False
+
+    async def _worker(self):
+        while True:
+            item = self._next_item()
+            if item is None:
+                return
+            if item is False:
+                await self._wakeup.wait()
+                with self._condition:
+                    self._idle_workers -= 1
+                continue
+
+            handler, topic, payload = item
+            try:
+                await handler(topic, payload)
+                self.dispatched += 1
+                MQTT_MESSAGES_DISPATCHED.labels(topic).inc()
+            except Exception as e:
+                self.failed += 1
+                MQTT_MESSAGES_FAILED.labels(topic).inc()
+                self.logger.error(f"Failure when handling message from topic {topic}: {e}")
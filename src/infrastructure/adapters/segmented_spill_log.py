@@ -0,0 +1,201 @@
+import os
+import struct
+import zlib
+from typing import List, Optional, Tuple
+
+from src.logging_config import get_custom_logger
+
+try:
+    import fcntl
+except ImportError:  # Windows: sem trava entre processos
+    fcntl = None
+
+# Cabeçalho de cada registro: tamanho do payload e CRC32 do payload (little-endian)
+_RECORD_HEADER = struct.Struct("<II")
+_SEGMENT_PREFIX = "segment-"
+_SEGMENT_SUFFIX = ".log"
+_COMMITTED_OFFSET_FILE = "committed.offset"
+_LOCK_FILE = "spill.lock"
+_SLOT_PREFIX = "slot-"
+
+
+class SpillLogLockedError(RuntimeError):
+    """O diretório do log já está aberto por outro processo."""
+
+
+class SegmentedSpillLog:
+    def __init__(self, directory: str, segment_max_bytes: int = 64 * 1024 * 1024):
+        """
+        Log local somente de anexação, dividido em segmentos, com registros prefixados por tamanho e CRC32.
+        Os offsets são posições lógicas em bytes: cada segmento se chama `segment-<offset inicial>.log`.
+        O offset até o qual os registros já foram consumidos fica em `committed.offset`; segmentos inteiramente
+        anteriores a ele são removidos. Ao abrir, um registro final incompleto ou corrompido (escrita interrompida
+        por uma queda) é truncado.
+        O diretório é travado (flock exclusivo) enquanto o log estiver aberto: outro processo que tente abri-lo
+        recebe SpillLogLockedError em vez de escrever nos mesmos segmentos.
+        Não é thread-safe: as operações devem ser serializadas pelo chamador (por exemplo, em um executor de
+        uma única thread), pois todas fazem I/O bloqueante.
+        """
+        self.logger = get_custom_logger(SegmentedSpillLog.__name__)
+        self.directory = directory
+        self.segment_max_bytes = segment_max_bytes
+        os.makedirs(directory, exist_ok=True)
+        self._lock_file = self._lock(directory)
+
+        self.committed_offset = self._read_committed_offset()
+        self._segments: List[int] = self._list_segments()
+        self._active = None
+        self._active_base = 0
+        self.end_offset = 0
+        self._recover()
+
+    @classmethod
+    def open_first_available(cls, directory: str, segment_max_bytes: int = 64 * 1024 * 1024,
+                             max_slots: int = 64) -> "SegmentedSpillLog":
+        """
+        Abre o log em `directory` ou, se outro processo do host já o usa (ex.: vários workers), no primeiro
+        subdiretório `slot-<n>` livre. Os slots são tentados sempre na mesma ordem, então um worker reiniciado
+        assume (e drena) o log deixado em um slot livre.
+        """
+        for slot in range(max_slots):
+            path = directory if slot == 0 else os.path.join(directory, f"{_SLOT_PREFIX}{slot}")
+            try:
+                return cls(path, segment_max_bytes)
+            except SpillLogLockedError:
+                continue
+        raise SpillLogLockedError(f"All {max_slots} spill log slots in {directory} are in use")
+
+    @staticmethod
+    def _lock(directory: str):
+        lock_file = open(os.path.join(directory, _LOCK_FILE), "a+b")
+        if fcntl is not None:
+            try:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                lock_file.close()
+                raise SpillLogLockedError(f"Spill log directory {directory} is in use by another process")
+        return lock_file
+
+    def _path(self, base_offset: int) -> str:
+        return os.path.join(self.directory, f"{_SEGMENT_PREFIX}{base_offset:020d}{_SEGMENT_SUFFIX}")
+
+    def _list_segments(self) -> List[int]:
+        return sorted(
+            int(name[len(_SEGMENT_PREFIX):-len(_SEGMENT_SUFFIX)]) for name in os.listdir(self.directory)
+            if name.startswith(_SEGMENT_PREFIX) and name.endswith(_SEGMENT_SUFFIX)
+        )
+
+    def _read_committed_offset(self) -> int:
+        try:
+            with open(os.path.join(self.directory, _COMMITTED_OFFSET_FILE), "rb") as file:
+                return int(file.read().strip() or 0)
+        except FileNotFoundError:
+            return 0
+
+    def _recover(self):
+        if not self._segments:
+            self._segments = [self.committed_offset]
+        last_base = self._segments[-1]
+        path = self._path(last_base)
+        valid_bytes = 0
+        if os.path.exists(path):
+            with open(path, "rb") as file:
+                while self._read_record(file) is not None:
+                    valid_bytes = file.tell()
+            if valid_bytes < os.path.getsize(path):
+                self.logger.warning(f"Truncating spill segment {path} to {valid_bytes} bytes (incomplete record)")
+                with open(path, "r+b") as file:
+                    file.truncate(valid_bytes)
+                    os.fsync(file.fileno())
+
+        self._active = open(path, "ab")
+        self._active_base = last_base
+        self.end_offset = last_base + valid_bytes
+        # Um commit não pode apontar além do que sobreviveu à recuperação
+        self.committed_offset = min(max(self.committed_offset, self._segments[0]), self.end_offset)
+
+    @staticmethod
+    def _read_record(file) -> Optional[bytes]:
+        header = file.read(_RECORD_HEADER.size)
+        if len(header) < _RECORD_HEADER.size:
+            return None
+        length, checksum = _RECORD_HEADER.unpack(header)
+        payload = file.read(length)
+        if len(payload) < length or zlib.crc32(payload) != checksum:
+            return None
+        return payload
+
+    def append(self, payloads: List[bytes]) -> int:
+        """
+        Anexa os registros com uma única escrita sequencial seguida de um único fsync; agrupar os registros de
+        vários produtores em uma chamada divide o custo do fsync entre eles. Retorna o offset final do log.
+        """
+        if not payloads:
+            return self.end_offset
+        data = b"".join(_RECORD_HEADER.pack(len(payload), zlib.crc32(payload)) + payload for payload in payloads)
+        self._active.write(data)
+        self._active.flush()
+        os.fsync(self._active.fileno())
+        self.end_offset += len(data)
+        if self.end_offset - self._active_base >= self.segment_max_bytes:
+            self._roll()
+        return self.end_offset
+
+    def _roll(self):
+        self._active.close()
+        self._active_base = self.end_offset
+        self._segments.append(self._active_base)
+        self._active = open(self._path(self._active_base), "ab")
+
+    def read(self, offset: int, max_records: int) -> Tuple[List[bytes], int]:
+        """Lê até `max_records` registros a partir de `offset`. Retorna (payloads, offset seguinte)."""
+        payloads = []
+        while len(payloads) < max_records and offset < self.end_offset:
+            base = max(segment for segment in self._segments if segment <= offset)
+            position = offset
+            with open(self._path(base), "rb") as file:
+                file.seek(offset - base)
+                while len(payloads) < max_records:
+                    payload = self._read_record(file)
+                    if payload is None:
+                        break
+                    payloads.append(payload)
+                    position = base + file.tell()
+            if len(payloads) < max_records:
+                # Fim do segmento: a leitura continua no seguinte, que começa onde este terminou
+                later_segments = [segment for segment in self._segments if segment > base]
+                if not later_segments:
+                    return payloads, position
+                position = later_segments[0]
+            offset = position
+        return payloads, offset
+
+    def commit(self, offset: int):
+        """
+        Registra de forma atômica que os registros anteriores a `offset` foram consumidos e remove os segmentos
+        já consumidos; com o log inteiramente consumido, inicia um segmento novo para liberar o espaço do atual.
+        """
+        temporary_path = os.path.join(self.directory, f"{_COMMITTED_OFFSET_FILE}.tmp")
+        with open(temporary_path, "wb") as file:
+            file.write(str(offset).encode())
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temporary_path, os.path.join(self.directory, _COMMITTED_OFFSET_FILE))
+        self.committed_offset = offset
+
+        if offset == self.end_offset and self.end_offset > self._active_base:
+            self._roll()
+        while len(self._segments) > 1 and self._segments[1] <= offset:
+            os.remove(self._path(self._segments.pop(0)))
+
+    def pending_bytes(self) -> int:
+        return self.end_offset - self.committed_offset
+
+    def close(self):
+        if self._active is not None:
+            self._active.close()
+            self._active = None
+        if self._lock_file is not None:
+            # Fechar o arquivo libera a trava
+            self._lock_file.close()
+            self._lock_file = None
@@ -7,13 +7,85 @@ class EnvEntry(Enum):
     MONGODB_DATABASE_NAME = "MONGODB_DATABASE_NAME"
     MONGODB_SENSOR_READINGS_COLLECTION = "MONGODB_SENSOR_READINGS_COLLECTION"
     MONGODB_WATER_SYSTEMS_COLLECTION = "MONGODB_WATER_SYSTEMS_COLLECTION"
+    MONGODB_CLUSTER_MEMBERS_COLLECTION = "MONGODB_CLUSTER_MEMBERS_COLLECTION"
+    MONGODB_MAX_POOL_SIZE = "MONGODB_MAX_POOL_SIZE"
+    MONGODB_MIN_POOL_SIZE = "MONGODB_MIN_POOL_SIZE"
+    MONGODB_MAX_IDLE_TIME_MS = "MONGODB_MAX_IDLE_TIME_MS"
+    MONGODB_WAIT_QUEUE_TIMEOUT_MS = "MONGODB_WAIT_QUEUE_TIMEOUT_MS"
+    MONGODB_SERVER_SELECTION_TIMEOUT_MS = "MONGODB_SERVER_SELECTION_TIMEOUT_MS"
+    MONGODB_CONNECT_TIMEOUT_MS = "MONGODB_CONNECT_TIMEOUT_MS"
+    MONGODB_SOCKET_TIMEOUT_MS = "MONGODB_SOCKET_TIMEOUT_MS"
+    MONGODB_READ_PREFERENCE = "MONGODB_READ_PREFERENCE"
+    MONGODB_PROVISION_SCHEMA = "MONGODB_PROVISION_SCHEMA"
+    MONGODB_SENSOR_READINGS_TIME_SERIES = "MONGODB_SENSOR_READINGS_TIME_SERIES"
+    MONGODB_SCHEMA_DIAGNOSTICS = "MONGODB_SCHEMA_DIAGNOSTICS"
+    WATER_SYSTEM_CACHE_ENABLED = "WATER_SYSTEM_CACHE_ENABLED"
+    WATER_SYSTEM_CACHE_TTL_SECONDS = "WATER_SYSTEM_CACHE_TTL_SECONDS"
+    WATER_SYSTEM_CACHE_MAX_ENTRIES = "WATER_SYSTEM_CACHE_MAX_ENTRIES"
+    WATER_SYSTEM_CACHE_CHANGE_STREAMS = "WATER_SYSTEM_CACHE_CHANGE_STREAMS"
+    REST_BATCH_CHUNK_SIZE = "REST_BATCH_CHUNK_SIZE"
+    REST_BATCH_MAX_LINE_BYTES = "REST_BATCH_MAX_LINE_BYTES"
+    REST_BATCH_MAX_IDS = "REST_BATCH_MAX_IDS"
+    EXPORT_BATCH_SIZE = "EXPORT_BATCH_SIZE"
+    LIVE_UPDATES_ENABLED = "LIVE_UPDATES_ENABLED"
+    LIVE_UPDATES_MAX_SUBSCRIBERS = "LIVE_UPDATES_MAX_SUBSCRIBERS"
+    LIVE_UPDATES_MAX_WATER_SYSTEMS_PER_SUBSCRIBER = "LIVE_UPDATES_MAX_WATER_SYSTEMS_PER_SUBSCRIBER"
+    LIVE_UPDATES_KEEPALIVE_SECONDS = "LIVE_UPDATES_KEEPALIVE_SECONDS"
+    LIVE_UPDATES_SEND_TIMEOUT_SECONDS = "LIVE_UPDATES_SEND_TIMEOUT_SECONDS"
     MQTT_BROKER_URL = "MQTT_BROKER_URL"
     MQTT_BROKER_PORT = "MQTT_BROKER_PORT"
     MQTT_BROKER_CLIENT_ID = "MQTT_BROKER_CLIENT_ID"
+    MQTT_SHARED_SUBSCRIPTION_GROUP = "MQTT_SHARED_SUBSCRIPTION_GROUP"
+    MQTT_DISPATCH_QUEUE_SIZE = "MQTT_DISPATCH_QUEUE_SIZE"
+    MQTT_DISPATCH_WORKERS = "MQTT_DISPATCH_WORKERS"
+    MQTT_DISPATCH_OVERFLOW_POLICY = "MQTT_DISPATCH_OVERFLOW_POLICY"
     DEFAULT_WATER_SYSTEM_ID = "DEFAULT_WATER_SYSTEM_ID"
+    INGESTION_MODE = "INGESTION_MODE"
+    INGESTION_BATCH_SIZE = "INGESTION_BATCH_SIZE"
+    INGESTION_BATCH_MAX_AGE_SECONDS = "INGESTION_BATCH_MAX_AGE_SECONDS"
+    INGESTION_BUFFER_CAPACITY = "INGESTION_BUFFER_CAPACITY"
+    # Rejeita leituras MQTT cuja unidade não corresponde ao tipo de sensor (padrão: false, aceita e contabiliza em
+    # waterwise_ingestion_measure_unit_mismatches_total); ativar só depois que essa métrica zerar
+    INGESTION_ENFORCE_MEASURE_UNITS = "INGESTION_ENFORCE_MEASURE_UNITS"
+    # Com MONGODB_SENSOR_READINGS_TIME_SERIES=true o MongoDB não garante `_id` único: o drainer do spill deduplica
+    # com uma consulta prévia por `_id`, mas uma escrita expirada que chegue depois dessa consulta fica duplicada
+    INGESTION_SPILL_ENABLED = "INGESTION_SPILL_ENABLED"
+    # Travado por processo; outros workers do mesmo host usam os subdiretórios slot-<n>
+    INGESTION_SPILL_DIRECTORY = "INGESTION_SPILL_DIRECTORY"
+    INGESTION_SPILL_SEGMENT_BYTES = "INGESTION_SPILL_SEGMENT_BYTES"
+    INGESTION_SPILL_WRITE_TIMEOUT_SECONDS = "INGESTION_SPILL_WRITE_TIMEOUT_SECONDS"
+    INGESTION_SPILL_DRAIN_BATCH_SIZE = "INGESTION_SPILL_DRAIN_BATCH_SIZE"
+    INGESTION_SPILL_RETRY_SECONDS = "INGESTION_SPILL_RETRY_SECONDS"
+    PIPELINE_WINDOW_SOURCE = "PIPELINE_WINDOW_SOURCE"
+    PIPELINE_AGGREGATOR_BUCKET_SECONDS = "PIPELINE_AGGREGATOR_BUCKET_SECONDS"
+    PIPELINE_AGGREGATOR_RETENTION_SECONDS = "PIPELINE_AGGREGATOR_RETENTION_SECONDS"
+    PIPELINE_MAX_CONCURRENCY = "PIPELINE_MAX_CONCURRENCY"
+    PIPELINE_AGGREGATION_WORKERS = "PIPELINE_AGGREGATION_WORKERS"
+    PIPELINE_SCHEDULING_MODE = "PIPELINE_SCHEDULING_MODE"
+    PIPELINE_SCHEDULER_RESYNC_SECONDS = "PIPELINE_SCHEDULER_RESYNC_SECONDS"
+    HOT_WINDOW_STORE_ENABLED = "HOT_WINDOW_STORE_ENABLED"
+    HOT_WINDOW_READINGS_PER_SECOND = "HOT_WINDOW_READINGS_PER_SECOND"
+    HOT_WINDOW_HEADROOM = "HOT_WINDOW_HEADROOM"
+    SENSOR_READINGS_RETENTION_SECONDS = "SENSOR_READINGS_RETENTION_SECONDS"
+    ROLLUP_ENABLED = "ROLLUP_ENABLED"
+    ROLLUP_INTERVAL_SECONDS = "ROLLUP_INTERVAL_SECONDS"
+    ROLLUP_LATENESS_SECONDS = "ROLLUP_LATENESS_SECONDS"
+    ROLLUP_MINUTE_RETENTION_SECONDS = "ROLLUP_MINUTE_RETENTION_SECONDS"
+    ROLLUP_HOUR_RETENTION_SECONDS = "ROLLUP_HOUR_RETENTION_SECONDS"
+    REPLAY_WORKERS = "REPLAY_WORKERS"
+    REPLAY_CHUNK_SIZE = "REPLAY_CHUNK_SIZE"
+    # Ativa também o change stream dos sistemas (requer replica set), independente de WATER_SYSTEM_CACHE_CHANGE_STREAMS
+    CLUSTER_MODE_ENABLED = "CLUSTER_MODE_ENABLED"
+    CLUSTER_MEMBER_ID = "CLUSTER_MEMBER_ID"
+    CLUSTER_LEASE_SECONDS = "CLUSTER_LEASE_SECONDS"
+    CLUSTER_HEARTBEAT_SECONDS = "CLUSTER_HEARTBEAT_SECONDS"
+    LOG_LEVEL = "LOG_LEVEL"
+    LOG_LEVELS = "LOG_LEVELS"
+    LOG_FORMAT = "LOG_FORMAT"
+    LOG_HOT_PATH_RATE_PER_SECOND = "LOG_HOT_PATH_RATE_PER_SECOND"
 
 
 class EnvConfig:
     @staticmethod
-    def get(entry: EnvEntry) -> str:
-        return os.getenv(entry.value)
+    def get(entry: EnvEntry, default: str = None) -> str:
+        return os.getenv(entry.value, default)
@@ -0,0 +1,107 @@
+import functools
+import time
+
+from src.infrastructure.metrics.metrics_registry import metrics_registry
+
+MQTT_MESSAGES_RECEIVED = metrics_registry.counter(
+    "waterwise_mqtt_messages_received_total", "MQTT messages received from the broker", ["topic"]
+)
+MQTT_MESSAGES_DISPATCHED = metrics_registry.counter(
+    "waterwise_mqtt_messages_dispatched_total", "MQTT messages delivered to their handler", ["topic"]
+)
+MQTT_MESSAGES_FAILED = metrics_registry.counter(
+    "waterwise_mqtt_messages_failed_total", "MQTT messages that could not be processed", ["topic"]
+)
+MQTT_MESSAGES_DROPPED = metrics_registry.counter(
+    "waterwise_mqtt_messages_dropped_total", "MQTT messages dropped by the dispatch queue", ["topic"]
+)
+MQTT_DISPATCH_QUEUE_DEPTH = metrics_registry.gauge(
+    "waterwise_mqtt_dispatch_queue_depth", "MQTT messages waiting in the dispatch queue"
+)
+MQTT_HANDLER_DURATION = metrics_registry.histogram(
+    "waterwise_mqtt_handler_duration_seconds", "Latency of the sensor reading MQTT handler", ["topic"]
+)
+INGESTION_BUFFER_PENDING = metrics_registry.gauge(
+    "waterwise_ingestion_buffer_pending_readings", "Sensor readings waiting in the batch ingestion buffer"
+)
+INGESTION_MEASURE_UNIT_MISMATCHES = metrics_registry.counter(
+    "waterwise_ingestion_measure_unit_mismatches_total",
+    "Sensor readings accepted with a measure unit that does not match the sensor type", ["sensor"]
+)
+INGESTION_SPILLED_READINGS = metrics_registry.counter(
+    "waterwise_ingestion_spilled_readings_total", "Sensor readings written to the local spill log"
+)
+INGESTION_SPILL_DRAINED_READINGS = metrics_registry.counter(
+    "waterwise_ingestion_spill_drained_readings_total", "Spilled sensor readings replayed into MongoDB"
+)
+INGESTION_SPILL_PENDING_BYTES = metrics_registry.gauge(
+    "waterwise_ingestion_spill_pending_bytes", "Bytes of the local spill log not yet replayed into MongoDB"
+)
+
+MONGODB_OPERATION_DURATION = metrics_registry.histogram(
+    "waterwise_mongodb_operation_duration_seconds", "Latency of MongoDB repository operations",
+    ["repository", "operation"]
+)
+MONGODB_OPERATION_ERRORS = metrics_registry.counter(
+    "waterwise_mongodb_operation_errors_total", "MongoDB repository operations that raised an error",
+    ["repository", "operation"]
+)
+
+PIPELINE_TICK_DURATION = metrics_registry.histogram(
+    "waterwise_pipeline_tick_duration_seconds", "Duration of a processing pipeline tick (batch of Water Systems)",
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+)
+PIPELINE_WATER_SYSTEM_DURATION = metrics_registry.histogram(
+    "waterwise_pipeline_water_system_duration_seconds", "Twinning duration of a single Water System"
+)
+PIPELINE_WATER_SYSTEMS_PROCESSED = metrics_registry.counter(
+    "waterwise_pipeline_water_systems_processed_total", "Water Systems processed by the pipeline", ["result"]
+)
+PIPELINE_WINDOW_READINGS = metrics_registry.histogram(
+    "waterwise_pipeline_window_readings", "Sensor readings within a Water System twinning window",
+    buckets=(0, 10, 50, 100, 500, 1000, 5000, 10000, 50000, 100000, 500000)
+)
+
+HOT_WINDOW_STORE_BYTES = metrics_registry.gauge(
+    "waterwise_hot_window_store_bytes", "Memory allocated by the hot window store buffers"
+)
+HOT_WINDOW_STORE_WATER_SYSTEM_BYTES = metrics_registry.gauge(
+    "waterwise_hot_window_store_water_system_bytes",
+    "Memory allocated by the hot window store buffers of a Water System", ["water_system_id"]
+)
+
+LIVE_UPDATE_SUBSCRIBERS = metrics_registry.gauge(
+    "waterwise_live_update_subscribers", "Connections subscribed to live Water System updates", ["transport"]
+)
+LIVE_UPDATE_MESSAGES_SENT = metrics_registry.counter(
+    "waterwise_live_update_messages_sent_total", "Live Water System updates written to subscriber connections",
+    ["transport"]
+)
+LIVE_UPDATE_MESSAGES_COALESCED = metrics_registry.counter(
+    "waterwise_live_update_messages_coalesced_total",
+    "Live Water System updates replaced by a newer one before a slow subscriber read them"
+)
+
+EVENT_LOOP_LAG = metrics_registry.histogram(
+    "waterwise_event_loop_lag_seconds", "Delay between the scheduled and the actual wake-up of the event loop"
+)
+
+
+def timed_mongodb_operation(func):
+    """Decorator que mede a latência (e conta os erros) de um método assíncrono de repositório."""
+    repository, operation = func.__qualname__.split(".")[-2:]
+    duration = MONGODB_OPERATION_DURATION.labels(repository, operation)
+    errors = MONGODB_OPERATION_ERRORS.labels(repository, operation)
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        started_at = time.perf_counter()
+        try:
+            return await func(*args, **kwargs)
+        except Exception:
+            errors.inc()
+            raise
+        finally:
+            duration.observe(time.perf_counter() - started_at)
+
+    return wrapper
@@ -0,0 +1,35 @@
+import asyncio
+from typing import Optional
+
+from src.infrastructure.metrics.application_metrics import EVENT_LOOP_LAG
+
+
+class EventLoopLagMonitor:
+    def __init__(self, interval_seconds: float = 0.5):
+        """
+        Mede periodicamente o atraso do event loop: quanto um sleep de `interval_seconds` demora além do esperado.
+        Atrasos altos indicam trabalho síncrono bloqueando o loop.
+        """
+        self.interval_seconds = interval_seconds
+        self.last_lag_seconds = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._task = asyncio.get_event_loop().create_task(self._monitor())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _monitor(self):
+        loop = asyncio.get_event_loop()
+        while True:
+            scheduled_at = loop.time()
+            await asyncio.sleep(self.interval_seconds)
+            self.last_lag_seconds = max(0.0, loop.time() - scheduled_at - self.interval_seconds)
+            EVENT_LOOP_LAG.observe(self.last_lag_seconds)
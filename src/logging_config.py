@@ -1,8 +1,22 @@
+import atexit
+import json
 import logging
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional
+
 from colorama import Fore, Style, init
 
+from src.infrastructure.config.env_config import EnvConfig, EnvEntry
+
 init(autoreset=True)
 
+LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+LOG_DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
 class ColorfulFormatter(logging.Formatter):
     """
     Formatter customizado para adicionar cores às mensagens de log.
@@ -20,27 +34,129 @@ class ColorfulFormatter(logging.Formatter):
         message = super().format(record)
         return f"{log_color}{message}{Style.RESET_ALL}"
 
-def get_custom_logger(name: str) -> logging.Logger:
+class JsonFormatter(logging.Formatter):
     """
-    Cria e configura um logger customizado com cores.
-    :param name: Nome do logger.
-    :return: Logger configurado.
+    Formatter que emite cada registro como uma linha JSON, sem códigos de cor.
     """
-    logger = logging.getLogger(name)
-    logger.setLevel(logging.DEBUG)  # Ajuste o nível conforme necessário
+    def format(self, record):
+        entry = {
+            "timestamp": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "thread": record.threadName,
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+class LogRateLimiter:
+    """
+    Limita logs por mensagem do caminho quente (token bucket).
+    Os registros descartados são contados e podem ser reportados no próximo log permitido.
+    """
+    __slots__ = ("rate_per_second", "burst", "_tokens", "_updated_at", "_suppressed", "_lock")
+
+    def __init__(self, rate_per_second: float, burst: Optional[float] = None):
+        self.rate_per_second = rate_per_second
+        self.burst = burst if burst is not None else max(1.0, rate_per_second)
+        self._tokens = self.burst
+        self._updated_at = time.monotonic()
+        self._suppressed = 0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Indica se um log pode ser emitido agora; caso contrário, contabiliza-o como suprimido."""
+        if self.rate_per_second <= 0:
+            return True
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated_at) * self.rate_per_second)
+            self._updated_at = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+            self._suppressed += 1
+            return False
+
+    def take_suppressed(self) -> int:
+        """Retorna e zera a quantidade de logs suprimidos desde a última chamada."""
+        with self._lock:
+            suppressed, self._suppressed = self._suppressed, 0
+            return suppressed
+
+_lock = threading.Lock()
+_log_queue: Optional[queue.SimpleQueue] = None
+_listener: Optional[QueueListener] = None
+_queue_handler: Optional[QueueHandler] = None
+_default_level = logging.DEBUG
+_component_levels: Dict[str, int] = {}
+
+_LEVEL_NAMES = ("DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL")
+
+def _parse_level(raw: str, variable: str) -> int:
+    """Converte o nome de um nível ("info", "WARNING"...) no seu valor numérico."""
+    level = logging.getLevelName(raw.strip().upper())
+    if not isinstance(level, int):
+        raise ValueError(f"{variable}: unknown log level '{raw.strip()}' (use one of {', '.join(_LEVEL_NAMES)})")
+    return level
+
+def _parse_component_levels(raw: str) -> Dict[str, int]:
+    """Converte "EventService=INFO,MQTTBrokerAdapter=WARNING" em {nome: nível}."""
+    levels = {}
+    for item in (raw or "").split(","):
+        if "=" in item:
+            name, level = item.split("=", 1)
+            levels[name.strip()] = _parse_level(level, f"{EnvEntry.LOG_LEVELS.value} ({name.strip()})")
+    return levels
+
+def _ensure_listener():
+    """Cria (uma única vez) a fila de logs e a thread que escreve no console."""
+    global _log_queue, _listener, _queue_handler, _default_level, _component_levels
+    if _queue_handler is not None:
+        return
+
+    env_config = EnvConfig()
+    _default_level = _parse_level(env_config.get(EnvEntry.LOG_LEVEL, "DEBUG"), EnvEntry.LOG_LEVEL.value)
+    _component_levels = _parse_component_levels(env_config.get(EnvEntry.LOG_LEVELS, ""))
 
-    # Cria um handler para exibir logs no console
     console_handler = logging.StreamHandler()
     console_handler.setLevel(logging.DEBUG)
+    if env_config.get(EnvEntry.LOG_FORMAT, "color").lower() == "json":
+        console_handler.setFormatter(JsonFormatter())
+    else:
+        console_handler.setFormatter(ColorfulFormatter(LOG_FORMAT, datefmt=LOG_DATE_FORMAT))
+
+    # Quem loga apenas enfileira o registro; a escrita no console acontece na thread do listener
+    _log_queue = queue.SimpleQueue()
+    _queue_handler = QueueHandler(_log_queue)
+    _listener = QueueListener(_log_queue, console_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
 
-    # Define o formato das mensagens
-    formatter = ColorfulFormatter(
-        "%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-        datefmt="%Y-%m-%d %H:%M:%S"
-    )
-    console_handler.setFormatter(formatter)
+def stop_logging():
+    """Escreve os registros pendentes e encerra a thread de logs."""
+    global _listener
+    with _lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
 
-    # Adiciona o handler ao logger
-    logger.addHandler(console_handler)
+def get_custom_logger(name: str) -> logging.Logger:
+    """
+    Retorna o logger do componente, configurado uma única vez com o handler de fila compartilhado.
+    O nível vem de LOG_LEVELS (por componente) ou LOG_LEVEL.
+    :param name: Nome do logger.
+    :return: Logger configurado.
+    """
+    logger = logging.getLogger(name)
+    with _lock:
+        _ensure_listener()
+        if _queue_handler not in logger.handlers:
+            logger.setLevel(_component_levels.get(name, _default_level))
+            logger.addHandler(_queue_handler)
+    return logger
 
-    return logger
\ No newline at end of file
+def get_hot_path_rate_limiter() -> LogRateLimiter:
+    """Cria um limitador para logs emitidos a cada mensagem, com a taxa de LOG_HOT_PATH_RATE_PER_SECOND."""
+    return LogRateLimiter(float(EnvConfig().get(EnvEntry.LOG_HOT_PATH_RATE_PER_SECOND, "1")))
@@ -3,26 +3,195 @@ from contextlib import asynccontextmanager
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from fastapi import FastAPI
 
-from src.application.services.processing_pipeline.processing_pipeline_service import ProcessingPipelineService
+from src.application.services.cluster.cluster_membership_service import ClusterMembershipService
+from src.application.services.event.water_system_change_publisher import water_system_change_publisher
+from src.application.services.event.water_system_change_stream_watcher import WaterSystemChangeStreamWatcher
+from src.application.services.event.water_system_live_update_hub import WaterSystemLiveUpdateHub
+from src.application.services.processing_pipeline.hot_window_store import HotWindowStore
+from src.application.services.processing_pipeline.processing_pipeline_service import ProcessingPipelineService, \
+    TwinningWindowSource, PipelineSchedulingMode
+from src.application.services.processing_pipeline.sensor_window_aggregator import SensorWindowAggregator
+from src.application.services.processing_pipeline.twinning_scheduler import TwinningScheduler
+from src.application.services.replay.twin_history_replay_service import TwinHistoryReplayService
+from src.application.services.rest.water_system_cache import WaterSystemCache
+from src.application.services.rollup.sensor_reading_rollup_service import SensorReadingRollupService
+from src.application.services.schema.schema_provisioning_service import SchemaProvisioningService
 from src.controllers.event_driven_controller import EventDrivenController
+from src.controllers.live_update_controller import LiveUpdateController
+from src.controllers.metrics_controller import MetricsController
+from src.controllers.replay_controller import ReplayController
 from src.controllers.rest_controller import RestController
+from src.domain.repositories.water_system_repository import WaterSystemRepository
+from src.infrastructure.adapters.mongodb_adapter import MongoDBAdapter
+from src.infrastructure.config.env_config import EnvConfig, EnvEntry
+from src.infrastructure.metrics.event_loop_lag_monitor import EventLoopLagMonitor
+from src.infrastructure.metrics.metrics_registry import metrics_registry
+from src.logging_config import get_custom_logger
 
+logger = get_custom_logger("main")
 task_scheduler = AsyncIOScheduler()
 
 @asynccontextmanager
 async def lifespan(app_instance: FastAPI):
-    edc = EventDrivenController()
-    processing_pipeline_service = ProcessingPipelineService()
+    env_config = EnvConfig()
+    mongodb_adapter = MongoDBAdapter()
+    app_instance.state.mongodb_adapter = mongodb_adapter
+
+    if env_config.get(EnvEntry.MONGODB_PROVISION_SCHEMA, "true").lower() == "true":
+        try:
+            await SchemaProvisioningService(mongodb_adapter).provision()
+        except Exception as e:
+            logger.error(f"Error when provisioning MongoDB schema: {e}")
+
+    cluster_mode_enabled = env_config.get(EnvEntry.CLUSTER_MODE_ENABLED, "false").lower() == "true"
+
+    water_system_cache = None
+    if env_config.get(EnvEntry.WATER_SYSTEM_CACHE_ENABLED, "true").lower() == "true":
+        water_system_cache = WaterSystemCache(
+            max_entries=int(env_config.get(EnvEntry.WATER_SYSTEM_CACHE_MAX_ENTRIES, "10000")),
+            ttl_seconds=float(env_config.get(EnvEntry.WATER_SYSTEM_CACHE_TTL_SECONDS, "30"))
+        )
+        water_system_change_publisher.subscribe(water_system_cache.on_water_system_changed)
+    app_instance.state.water_system_cache = water_system_cache
+
+    # Em modo cluster as alterações feitas por outras réplicas só chegam pelo change stream; os eventos são
+    # republicados localmente para que o cache, o agendador e as atualizações ao vivo os recebam
+    change_stream_watcher = None
+    if cluster_mode_enabled or (
+            water_system_cache is not None
+            and env_config.get(EnvEntry.WATER_SYSTEM_CACHE_CHANGE_STREAMS, "false").lower() == "true"
+    ):
+        change_stream_watcher = WaterSystemChangeStreamWatcher(
+            WaterSystemRepository(mongodb_adapter), water_system_change_publisher.publish
+        )
+        change_stream_watcher.start()
+
+    live_update_hub = None
+    if env_config.get(EnvEntry.LIVE_UPDATES_ENABLED, "true").lower() == "true":
+        live_update_hub = WaterSystemLiveUpdateHub(
+            max_subscribers=int(env_config.get(EnvEntry.LIVE_UPDATES_MAX_SUBSCRIBERS, "10000")),
+            max_water_systems_per_subscriber=int(
+                env_config.get(EnvEntry.LIVE_UPDATES_MAX_WATER_SYSTEMS_PER_SUBSCRIBER, "100")
+            ),
+            keepalive_seconds=float(env_config.get(EnvEntry.LIVE_UPDATES_KEEPALIVE_SECONDS, "15")),
+            send_timeout_seconds=float(env_config.get(EnvEntry.LIVE_UPDATES_SEND_TIMEOUT_SECONDS, "10")),
+            change_stream_only=change_stream_watcher is not None
+        )
+        water_system_change_publisher.subscribe(live_update_hub.on_water_system_changed)
+        metrics_registry.add_collect_hook(live_update_hub.collect_metrics)
+    app_instance.state.live_update_hub = live_update_hub
+
+    cluster_membership = None
+    if cluster_mode_enabled:
+        cluster_membership = ClusterMembershipService(mongodb_adapter)
+        await cluster_membership.start()
+
+    # Em modo cluster cada réplica recebe só parte das leituras, então as janelas em memória ficam desativadas
+    sensor_window_aggregator = None
+    if env_config.get(EnvEntry.PIPELINE_WINDOW_SOURCE) == TwinningWindowSource.INCREMENTAL.value \
+            and cluster_membership is None:
+        sensor_window_aggregator = SensorWindowAggregator(
+            bucket_seconds=int(env_config.get(EnvEntry.PIPELINE_AGGREGATOR_BUCKET_SECONDS, "5")),
+            retention_seconds=int(env_config.get(EnvEntry.PIPELINE_AGGREGATOR_RETENTION_SECONDS, "3600"))
+        )
+
+    hot_window_store = None
+    if cluster_membership is None and (
+            env_config.get(EnvEntry.HOT_WINDOW_STORE_ENABLED, "false").lower() == "true"
+            or env_config.get(EnvEntry.PIPELINE_WINDOW_SOURCE) == TwinningWindowSource.HOT_WINDOW.value
+    ):
+        hot_window_store = HotWindowStore(
+            readings_per_second=float(env_config.get(EnvEntry.HOT_WINDOW_READINGS_PER_SECOND, "1")),
+            headroom=float(env_config.get(EnvEntry.HOT_WINDOW_HEADROOM, "1.5")),
+            default_twinning_rate_seconds=60
+        )
+        water_system_change_publisher.subscribe(hot_window_store.on_water_system_changed)
+        hot_window_store.start()
+    app_instance.state.hot_window_store = hot_window_store
+
+    edc = EventDrivenController(
+        sensor_window_aggregator, mongodb_adapter, hot_window_store,
+        cluster_member_id=cluster_membership.member_id if cluster_membership is not None else None
+    )
+    processing_pipeline_service = ProcessingPipelineService(
+        sensor_window_aggregator, mongodb_adapter, hot_window_store, cluster_membership
+    )
+
+    scheduling_mode = PipelineSchedulingMode(
+        env_config.get(EnvEntry.PIPELINE_SCHEDULING_MODE, PipelineSchedulingMode.INTERVAL.value)
+    )
+    twinning_scheduler = None
+    if scheduling_mode == PipelineSchedulingMode.PER_SYSTEM:
+        twinning_scheduler = TwinningScheduler(
+            processing_pipeline_service,
+            resync_interval_seconds=int(env_config.get(EnvEntry.PIPELINE_SCHEDULER_RESYNC_SECONDS, "300"))
+        )
+        water_system_change_publisher.subscribe(twinning_scheduler.on_water_system_changed)
+        if cluster_membership is not None:
+            cluster_membership.subscribe(twinning_scheduler.on_cluster_membership_changed)
+        twinning_scheduler.start()
+    else:
+        task_scheduler.add_job(processing_pipeline_service.run, "interval", seconds=60, max_instances=1, coalesce=True)
+
+    metrics_registry.add_collect_hook(edc.collect_metrics)
+    if hot_window_store is not None:
+        metrics_registry.add_collect_hook(hot_window_store.collect_metrics)
+    event_loop_lag_monitor = EventLoopLagMonitor()
+    event_loop_lag_monitor.start()
+
+    sensor_reading_rollup_service = None
+    if env_config.get(EnvEntry.ROLLUP_ENABLED, "false").lower() == "true":
+        sensor_reading_rollup_service = SensorReadingRollupService(mongodb_adapter, cluster_membership)
+        try:
+            await sensor_reading_rollup_service.provision()
+        except Exception as e:
+            logger.error(f"Error when provisioning sensor reading rollups: {e}")
+        task_scheduler.add_job(
+            sensor_reading_rollup_service.run, "interval",
+            seconds=int(env_config.get(EnvEntry.ROLLUP_INTERVAL_SECONDS, "60")), max_instances=1, coalesce=True
+        )
+    app_instance.state.sensor_reading_rollup_service = sensor_reading_rollup_service
+    twin_history_replay_service = TwinHistoryReplayService(mongodb_adapter)
+    app_instance.state.twin_history_replay_service = twin_history_replay_service
 
-    task_scheduler.add_job(processing_pipeline_service.run, "interval", seconds=60)
     task_scheduler.add_job(edc.start)
     task_scheduler.start()
     try:
         yield
     finally:
-        edc.stop()
+        await event_loop_lag_monitor.stop()
+        metrics_registry.remove_collect_hook(edc.collect_metrics)
+        if hot_window_store is not None:
+            metrics_registry.remove_collect_hook(hot_window_store.collect_metrics)
+            water_system_change_publisher.unsubscribe(hot_window_store.on_water_system_changed)
+            await hot_window_store.stop()
+        await edc.shutdown()
+        await twin_history_replay_service.stop()
         task_scheduler.shutdown()
+        if twinning_scheduler is not None:
+            water_system_change_publisher.unsubscribe(twinning_scheduler.on_water_system_changed)
+            if cluster_membership is not None:
+                cluster_membership.unsubscribe(twinning_scheduler.on_cluster_membership_changed)
+            await twinning_scheduler.stop()
+        processing_pipeline_service.stop()
+        if cluster_membership is not None:
+            await cluster_membership.stop()
+        if change_stream_watcher is not None:
+            await change_stream_watcher.stop()
+        if water_system_cache is not None:
+            water_system_change_publisher.unsubscribe(water_system_cache.on_water_system_changed)
+        if live_update_hub is not None:
+            water_system_change_publisher.unsubscribe(live_update_hub.on_water_system_changed)
+            metrics_registry.remove_collect_hook(live_update_hub.collect_metrics)
+        await mongodb_adapter.close()
 
 app = FastAPI(lifespan=lifespan)
+# Registrado antes do RestController para que /live não seja capturado por /{water_system_id}
+live_update_controller = LiveUpdateController()
+app.include_router(live_update_controller.router, prefix="/water-systems", tags=["Live Updates"])
 rest_controller = RestController()
 app.include_router(rest_controller.router, prefix="/water-systems", tags=["Water Systems"])
+metrics_controller = MetricsController()
+app.include_router(metrics_controller.router, tags=["Metrics"])
+replay_controller = ReplayController()
+app.include_router(replay_controller.router, tags=["Replays"])
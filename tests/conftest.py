@@ -0,0 +1,34 @@
+import os
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+os.environ.setdefault("MONGODB_WATER_SYSTEMS_COLLECTION", "water_systems")
+os.environ.setdefault("MONGODB_SENSOR_READINGS_COLLECTION", "sensor_readings")
+
+from benchmarks.local_stand_ins import InMemoryWaterSystemRepository  # noqa: E402
+from src.application.services.rest.rest_service import get_repository, get_water_system_cache  # noqa: E402
+from src.controllers.rest_controller import RestController  # noqa: E402
+
+
+@pytest.fixture
+def water_system_repository() -> InMemoryWaterSystemRepository:
+    return InMemoryWaterSystemRepository()
+
+
+@pytest.fixture
+def build_client():
+    """Fábrica de clientes da API REST servindo o repositório informado, sem cache."""
+    def build(repository) -> TestClient:
+        app = FastAPI()
+        app.include_router(RestController().router, prefix="/water-systems")
+        app.dependency_overrides[get_repository] = lambda: repository
+        app.dependency_overrides[get_water_system_cache] = lambda: None
+        return TestClient(app)
+    return build
+
+
+@pytest.fixture
+def client(build_client, water_system_repository) -> TestClient:
+    return build_client(water_system_repository)
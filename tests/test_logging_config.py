@@ -0,0 +1,25 @@
+import logging
+
+import pytest
+
+from src.logging_config import _parse_component_levels, _parse_level
+
+
+def test_parse_level_accepts_level_names_in_any_case():
+    assert _parse_level("debug", "LOG_LEVEL") == logging.DEBUG
+    assert _parse_level(" Warning ", "LOG_LEVEL") == logging.WARNING
+
+
+@pytest.mark.parametrize("raw", ["FOO", "", "10"])
+def test_parse_level_rejects_unknown_names_naming_the_variable(raw):
+    with pytest.raises(ValueError, match=f"LOG_LEVEL: unknown log level '{raw}'"):
+        _parse_level(raw, "LOG_LEVEL")
+
+
+def test_parse_component_levels():
+    assert _parse_component_levels("EventService=info, MQTTBrokerAdapter = ERROR,invalid") == {
+        "EventService": logging.INFO, "MQTTBrokerAdapter": logging.ERROR
+    }
+    assert _parse_component_levels("") == {}
+    with pytest.raises(ValueError, match=r"LOG_LEVELS \(EventService\): unknown log level 'VERBOSE'"):
+        _parse_component_levels("EventService=VERBOSE")
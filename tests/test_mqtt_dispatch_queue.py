@@ -0,0 +1,122 @@
+import asyncio
+import threading
+import time
+
+from src.infrastructure.adapters.mqtt_dispatch_queue import MQTTDispatchQueue, OverflowPolicy
+from src.infrastructure.metrics.application_metrics import MQTT_MESSAGES_DROPPED, MQTT_MESSAGES_DISPATCHED, \
+    MQTT_MESSAGES_FAILED
+
+
+class RecordingHandler:
+    def __init__(self, failing_payloads=()):
+        self.handled = []
+        self.failing_payloads = set(failing_payloads)
+
+    async def __call__(self, topic, payload):
+        if payload in self.failing_payloads:
+            raise ValueError(f"invalid payload {payload}")
+        self.handled.append(payload)
+
+
+def drain(dispatch_queue: MQTTDispatchQueue):
+    """Processa as mensagens enfileiradas em um event loop novo e encerra os consumidores."""
+    async def run():
+        dispatch_queue.start(asyncio.get_running_loop())
+        dispatch_queue.close()
+        await dispatch_queue.join()
+    asyncio.run(run())
+
+
+def test_drop_newest_rejects_incoming_message():
+    topic = "test/drop-newest"
+    dropped_before = MQTT_MESSAGES_DROPPED.labels(topic).value
+    dispatch_queue = MQTTDispatchQueue(maxsize=2, worker_count=1, overflow_policy=OverflowPolicy.DROP_NEWEST)
+    handler = RecordingHandler()
+
+    assert [dispatch_queue.put(handler, topic, payload) for payload in range(4)] == [True, True, False, False]
+    assert dispatch_queue.depth() == 2
+
+    drain(dispatch_queue)
+    assert handler.handled == [0, 1]
+    assert dispatch_queue.get_stats() == {"depth": 0, "received": 4, "dispatched": 2, "dropped": 2, "failed": 0}
+    assert MQTT_MESSAGES_DROPPED.labels(topic).value - dropped_before == 2
+
+
+def test_drop_oldest_evicts_queued_message():
+    topic = "test/drop-oldest"
+    dropped_before = MQTT_MESSAGES_DROPPED.labels(topic).value
+    dispatch_queue = MQTTDispatchQueue(maxsize=2, worker_count=1, overflow_policy=OverflowPolicy.DROP_OLDEST)
+    handler = RecordingHandler()
+
+    assert all(dispatch_queue.put(handler, topic, payload) for payload in range(4))
+    assert dispatch_queue.depth() == 2
+
+    drain(dispatch_queue)
+    assert handler.handled == [2, 3]
+    assert dispatch_queue.get_stats() == {"depth": 0, "received": 4, "dispatched": 2, "dropped": 2, "failed": 0}
+    assert MQTT_MESSAGES_DROPPED.labels(topic).value - dropped_before == 2
+
+
+def test_block_waits_for_a_free_slot():
+    topic = "test/block"
+    dispatch_queue = MQTTDispatchQueue(maxsize=1, worker_count=2, overflow_policy=OverflowPolicy.BLOCK)
+    handler = RecordingHandler()
+    assert dispatch_queue.put(handler, topic, 0)
+
+    # Como a thread do paho: bloqueia até que um consumidor retire uma mensagem da fila
+    results = []
+    producer = threading.Thread(target=lambda: results.extend(dispatch_queue.put(handler, topic, i) for i in (1, 2)))
+    producer.start()
+    time.sleep(0.05)
+    assert producer.is_alive() and results == []
+
+    async def run():
+        dispatch_queue.start(asyncio.get_running_loop())
+        while producer.is_alive() or dispatch_queue.depth():
+            await asyncio.sleep(0.001)
+        dispatch_queue.close()
+        await dispatch_queue.join()
+    asyncio.run(run())
+    producer.join()
+
+    assert results == [True, True]
+    assert handler.handled == [0, 1, 2]
+    assert dispatch_queue.dropped == 0
+
+
+def test_close_releases_blocked_producer():
+    dispatch_queue = MQTTDispatchQueue(maxsize=1, worker_count=1, overflow_policy=OverflowPolicy.BLOCK)
+    handler = RecordingHandler()
+    dispatch_queue.put(handler, "test/block-close", 0)
+
+    results = []
+    producer = threading.Thread(target=lambda: results.append(dispatch_queue.put(handler, "test/block-close", 1)))
+    producer.start()
+    time.sleep(0.05)
+    dispatch_queue.close()
+    producer.join(timeout=1)
+
+    assert results == [False]
+    assert dispatch_queue.dropped == 1
+    # Depois de fechada, a fila recusa novas mensagens, mas as já enfileiradas ainda são processadas
+    assert not dispatch_queue.put(handler, "test/block-close", 2)
+    drain(dispatch_queue)
+    assert handler.handled == [0]
+    assert dispatch_queue.get_stats()["dropped"] == 2
+
+
+def test_handler_exceptions_are_counted_and_do_not_stop_workers():
+    topic = "test/failures"
+    failed_before = MQTT_MESSAGES_FAILED.labels(topic).value
+    dispatched_before = MQTT_MESSAGES_DISPATCHED.labels(topic).value
+    dispatch_queue = MQTTDispatchQueue(maxsize=10, worker_count=1, overflow_policy=OverflowPolicy.BLOCK)
+    handler = RecordingHandler(failing_payloads={1, 3})
+
+    for payload in range(5):
+        dispatch_queue.put(handler, topic, payload)
+    drain(dispatch_queue)
+
+    assert handler.handled == [0, 2, 4]
+    assert dispatch_queue.get_stats() == {"depth": 0, "received": 5, "dispatched": 3, "dropped": 0, "failed": 2}
+    assert MQTT_MESSAGES_FAILED.labels(topic).value - failed_before == 2
+    assert MQTT_MESSAGES_DISPATCHED.labels(topic).value - dispatched_before == 3
@@ -0,0 +1,108 @@
+import os
+
+import pytest
+
+from src.infrastructure.adapters.segmented_spill_log import SegmentedSpillLog, SpillLogLockedError
+
+
+def segment_files(directory) -> list:
+    return sorted(name for name in os.listdir(directory) if name.startswith("segment-"))
+
+
+def records(count: int, start: int = 0) -> list:
+    return [f"record-{i:04d}".encode() for i in range(start, start + count)]
+
+
+def test_append_and_read(tmp_path):
+    spill_log = SegmentedSpillLog(str(tmp_path))
+    end_offset = spill_log.append(records(3))
+
+    payloads, next_offset = spill_log.read(0, 10)
+    assert payloads == records(3)
+    assert next_offset == end_offset == spill_log.end_offset
+    assert spill_log.pending_bytes() == end_offset
+
+    payloads, partial_offset = spill_log.read(0, 2)
+    assert payloads == records(2)
+    assert spill_log.read(partial_offset, 10) == (records(1, 2), end_offset)
+    spill_log.close()
+
+
+def test_read_across_segment_roll(tmp_path):
+    # Cada registro ocupa 8 bytes de cabeçalho + 11 de payload: o segmento rola a cada 2 anexações
+    spill_log = SegmentedSpillLog(str(tmp_path), segment_max_bytes=30)
+    for i in range(5):
+        spill_log.append(records(1, i))
+    assert len(segment_files(tmp_path)) == 3
+
+    payloads, next_offset = spill_log.read(0, 10)
+    assert payloads == records(5)
+    assert next_offset == spill_log.end_offset
+    spill_log.close()
+
+
+def test_commit_deletes_consumed_segments(tmp_path):
+    spill_log = SegmentedSpillLog(str(tmp_path), segment_max_bytes=30)
+    for i in range(5):
+        spill_log.append(records(1, i))
+
+    _, offset = spill_log.read(0, 2)
+    spill_log.commit(offset)
+    assert len(segment_files(tmp_path)) == 2
+    assert spill_log.read(spill_log.committed_offset, 10)[0] == records(3, 2)
+
+    spill_log.commit(spill_log.end_offset)
+    assert spill_log.pending_bytes() == 0
+    # Inteiramente consumido: resta apenas um segmento novo e vazio
+    assert len(segment_files(tmp_path)) == 1
+    assert os.path.getsize(tmp_path / segment_files(tmp_path)[0]) == 0
+    spill_log.close()
+
+
+def test_reopen_truncates_torn_tail(tmp_path):
+    spill_log = SegmentedSpillLog(str(tmp_path))
+    end_offset = spill_log.append(records(2))
+    spill_log.close()
+    # Simula uma escrita interrompida: um cabeçalho completo seguido de parte do payload
+    with open(tmp_path / segment_files(tmp_path)[-1], "ab") as file:
+        file.write(b"\x20\x00\x00\x00\x00\x00\x00\x00partial")
+
+    spill_log = SegmentedSpillLog(str(tmp_path))
+    assert spill_log.end_offset == end_offset
+    assert os.path.getsize(tmp_path / segment_files(tmp_path)[-1]) == end_offset
+    assert spill_log.read(0, 10)[0] == records(2)
+
+    spill_log.append(records(1, 2))
+    assert spill_log.read(0, 10)[0] == records(3)
+    spill_log.close()
+
+
+def test_reopen_resumes_from_committed_offset(tmp_path):
+    spill_log = SegmentedSpillLog(str(tmp_path), segment_max_bytes=30)
+    for i in range(5):
+        spill_log.append(records(1, i))
+    _, offset = spill_log.read(0, 3)
+    spill_log.commit(offset)
+    spill_log.close()
+
+    spill_log = SegmentedSpillLog(str(tmp_path), segment_max_bytes=30)
+    assert spill_log.committed_offset == offset
+    assert spill_log.read(spill_log.committed_offset, 10)[0] == records(2, 3)
+    spill_log.close()
+
+
+def test_directory_is_locked_while_open(tmp_path):
+    spill_log = SegmentedSpillLog(str(tmp_path))
+    with pytest.raises(SpillLogLockedError):
+        SegmentedSpillLog(str(tmp_path))
+
+    other_log = SegmentedSpillLog.open_first_available(str(tmp_path))
+    assert other_log.directory == os.path.join(str(tmp_path), "slot-1")
+    other_log.append(records(1))
+    assert spill_log.read(0, 10)[0] == []
+
+    other_log.close()
+    spill_log.close()
+    reopened = SegmentedSpillLog.open_first_available(str(tmp_path))
+    assert reopened.directory == str(tmp_path)
+    reopened.close()
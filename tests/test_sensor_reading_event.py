@@ -0,0 +1,63 @@
+import json
+from datetime import datetime, timezone
+
+import pytest
+from pydantic import ValidationError
+
+from src.application.utils.object_util import ObjectUtil
+from src.domain.events.sensor_reading_event import SensorReadingEvent, ENFORCE_MEASURE_UNITS
+
+PAYLOADS = [
+    # (payload, aceito no caminho original)
+    ({"sensor": "temperature", "value": 21.5, "measureUnit": "Celcius", "createDate": "2024-01-01T00:00:00Z",
+      "sensorId": "s1", "waterSystemId": "w1"}, True),
+    ({"sensor": "ph", "value": 7, "createDate": "2024-01-01T00:00:00+03:00", "sensorId": "s2"}, True),
+    ({"sensor": "turbidity", "value": "1.5", "measureUnit": "", "createDate": 1704067200}, True),
+    # Unidade divergente do tipo de sensor: aceita no caminho original, em que o validador nunca rodava
+    ({"sensor": "temperature", "value": 21.5, "measureUnit": "NTU", "createDate": "2024-01-01T00:00:00Z"}, True),
+    ({"sensor": "conductivity", "value": 10, "measureUnit": "mg/L", "createDate": "2024-01-01T00:00:00Z"}, True),
+    ({"sensor": "pressure", "value": 1, "createDate": "2024-01-01T00:00:00Z"}, False),
+    ({"sensor": "ph", "value": "abc", "createDate": "2024-01-01T00:00:00Z"}, False),
+    ({"sensor": "ph", "value": 7}, False),
+    ({"sensor": "ph", "value": 7, "measureUnit": "kg", "createDate": "2024-01-01T00:00:00Z"}, False),
+]
+
+
+def legacy_decode(payload: bytes):
+    """Caminho anterior: json.loads + model_validate + model_dump sem o id."""
+    try:
+        sensor_reading_event = SensorReadingEvent.model_validate(json.loads(payload))
+    except ValidationError:
+        return None
+    return ObjectUtil.remove_fields(sensor_reading_event.model_dump(), ["id"])
+
+
+def fast_decode(payload: bytes):
+    """Caminho atual: model_validate_json sobre os bytes + to_document."""
+    try:
+        return SensorReadingEvent.model_validate_json(payload).to_document()
+    except ValidationError:
+        return None
+
+
+@pytest.mark.parametrize("payload, accepted", PAYLOADS)
+def test_fast_decoding_matches_legacy_decoding(payload, accepted):
+    encoded = json.dumps(payload).encode()
+    legacy_document = legacy_decode(encoded)
+    assert (legacy_document is not None) == accepted
+    assert fast_decode(encoded) == legacy_document
+
+
+def test_measure_unit_mismatch_is_accepted_unless_enforced():
+    document = {"sensor": "temperature", "value": 21.5, "measure_unit": "NTU",
+                "create_date": datetime(2024, 1, 1, tzinfo=timezone.utc)}
+    # Caminho de leitura (find_readings): documentos já gravados continuam válidos
+    assert SensorReadingEvent(**document, id="r1").measure_unit == "NTU"
+
+    payload = json.dumps({"sensor": "temperature", "value": 21.5, "measureUnit": "NTU",
+                          "createDate": "2024-01-01T00:00:00Z"}).encode()
+    with pytest.raises(ValidationError):
+        SensorReadingEvent.model_validate_json(payload, context={ENFORCE_MEASURE_UNITS: True})
+    payload = json.dumps({"sensor": "temperature", "value": 21.5, "measureUnit": "Celcius",
+                          "createDate": "2024-01-01T00:00:00Z"}).encode()
+    assert SensorReadingEvent.model_validate_json(payload, context={ENFORCE_MEASURE_UNITS: True}).value == 21.5
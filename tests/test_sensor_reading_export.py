@@ -0,0 +1,101 @@
+import asyncio
+import io
+from datetime import datetime, timezone, timedelta
+
+import pytest
+from bson import ObjectId
+
+from src.application.services.export.sensor_reading_export_service import ExportFormat, SensorReadingExportService
+from src.application.services.rest.rest_service import get_sensor_reading_repository
+from src.domain.repositories.sensor_reading_repository import SensorReadingsQuery
+
+pa = pytest.importorskip("pyarrow")
+pytest.importorskip("pyarrow.parquet")
+
+START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def generate_documents(count: int) -> list:
+    # Documentos no formato entregue pelo driver, com um sensor_id ausente para testar valores nulos
+    return [{
+        "_id": ObjectId(),
+        "sensor": "ph",
+        "value": i * 0.5,
+        "measure_unit": "pH",
+        "create_date": START + timedelta(seconds=i),
+        "water_system_id": "w1",
+        **({"sensor_id": f"sensor-{i % 3}"} if i != 4 else {}),
+    } for i in range(count)]
+
+
+class StubReadingRepository:
+    def __init__(self, documents):
+        self.documents = documents
+        self.queries = []
+
+    async def iterate_reading_documents(self, query: SensorReadingsQuery, batch_size: int = 65536):
+        self.queries.append(query)
+        for start in range(0, len(self.documents), batch_size):
+            yield self.documents[start:start + batch_size]
+
+
+async def export(repository, export_format, compression=None) -> bytes:
+    export_service = SensorReadingExportService(repository, batch_size=4)
+    chunks = [data async for data in export_service.stream(SensorReadingsQuery(water_system_id="w1"),
+                                                            export_format, compression)]
+    return b"".join(chunks)
+
+
+def read_table(data: bytes, export_format: ExportFormat):
+    if export_format == ExportFormat.ARROW:
+        return pa.ipc.open_stream(pa.BufferReader(data)).read_all()
+    return pa.parquet.read_table(io.BytesIO(data))
+
+
+def assert_round_trip(table, documents):
+    assert table.num_rows == len(documents)
+    assert table.column("id").to_pylist() == [str(document["_id"]) for document in documents]
+    assert table.column("value").to_pylist() == [document["value"] for document in documents]
+    assert table.column("sensor_id").to_pylist() == [document.get("sensor_id") for document in documents]
+    assert table.column("create_date").to_pylist() == [document["create_date"] for document in documents]
+    assert set(table.column("water_system_id").to_pylist()) == {"w1"}
+
+
+@pytest.mark.parametrize("export_format, compression", [
+    (ExportFormat.ARROW, None),
+    (ExportFormat.ARROW, "zstd"),
+    (ExportFormat.PARQUET, None),
+    (ExportFormat.PARQUET, "snappy"),
+])
+def test_export_round_trip(export_format, compression):
+    documents = generate_documents(10)
+    data = asyncio.run(export(StubReadingRepository(documents), export_format, compression))
+    table = read_table(data, export_format)
+    assert_round_trip(table, documents)
+    if export_format == ExportFormat.PARQUET:
+        # Um row group por lote do cursor
+        assert pa.parquet.ParquetFile(io.BytesIO(data)).num_row_groups == 3
+
+
+def test_export_of_empty_range_is_a_valid_file():
+    for export_format in ExportFormat:
+        table = read_table(asyncio.run(export(StubReadingRepository([]), export_format)), export_format)
+        assert table.num_rows == 0
+        assert "create_date" in table.schema.names
+
+
+def test_export_endpoint_streams_file_and_validates_compression(client):
+    documents = generate_documents(10)
+    repository = StubReadingRepository(documents)
+    client.app.dependency_overrides[get_sensor_reading_repository] = lambda: repository
+
+    response = client.get("/water-systems/w1/readings/export", params={"start": "2024-01-01T00:00:00",
+                                                                       "format": "arrow"})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/vnd.apache.arrow.stream"
+    assert_round_trip(read_table(response.content, ExportFormat.ARROW), documents)
+    assert repository.queries[-1].start_date == START
+
+    response = client.get("/water-systems/w1/readings/export", params={"start": "2024-01-01T00:00:00",
+                                                                       "format": "arrow", "compression": "gzip"})
+    assert response.status_code == 400
@@ -0,0 +1,65 @@
+import math
+from datetime import datetime, timezone, timedelta
+
+import pytest
+
+from src.application.services.processing_pipeline.processing_pipeline_service import ProcessingPipelineService
+from src.domain.events.sensor_reading_event import SensorReadingEvent
+
+START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def reading(sensor_id, value, seconds) -> SensorReadingEvent:
+    fields = {"sensor_id": sensor_id} if sensor_id is not None else {}
+    return SensorReadingEvent(sensor="ph", value=value, create_date=START + timedelta(seconds=seconds),
+                              water_system_id="w1", **fields)
+
+
+READINGS = [
+    # Empate de data: a última leitura recebida é a "última"
+    reading("tie", 1.0, 10), reading("tie", 5.0, 0), reading("tie", 3.0, 10),
+    # NaN no meio e no fim: ignorado nos valores, mas a última data é a da leitura NaN
+    reading("nan", 2.0, 0), reading("nan", math.nan, 5), reading("nan", 4.0, 10), reading("nan", math.nan, 20),
+    # Sensor apenas com NaN: emitido com quantidade 0 e estatísticas NaN
+    reading("all-nan", math.nan, 0), reading("all-nan", math.nan, 30),
+    # Sem sensor_id: ignorada
+    reading(None, 100.0, 0),
+]
+
+
+def assert_same(actual, expected):
+    assert (math.isnan(actual) and math.isnan(expected)) if expected != expected else actual == expected
+
+
+def test_sensor_statistics_follow_legacy_semantics():
+    statistics = ProcessingPipelineService.compute_sensors_statistics(READINGS)
+    assert list(statistics) == ["all-nan", "nan", "tie"]
+
+    tie = statistics["tie"]
+    assert (tie.mean_value, tie.min_value, tie.max_value, tie.readings_count) == (3.0, 1.0, 5.0, 3)
+    assert (tie.last_value, tie.last_value_date) == (3.0, START + timedelta(seconds=10))
+
+    nan = statistics["nan"]
+    assert (nan.mean_value, nan.min_value, nan.max_value, nan.readings_count) == (3.0, 2.0, 4.0, 2)
+    assert (nan.last_value, nan.last_value_date) == (4.0, START + timedelta(seconds=20))
+
+    all_nan = statistics["all-nan"]
+    for value in (all_nan.mean_value, all_nan.min_value, all_nan.max_value, all_nan.last_value):
+        assert math.isnan(value)
+    assert all_nan.readings_count == 0
+    assert all_nan.last_value_date == START + timedelta(seconds=30)
+
+
+def test_sensor_statistics_match_pandas_implementation():
+    pytest.importorskip("pandas")
+    from benchmarks.twinning_aggregation_benchmark import legacy_compute_sensors_statistics
+
+    legacy = legacy_compute_sensors_statistics(READINGS)
+    statistics = ProcessingPipelineService.compute_sensors_statistics(READINGS)
+    assert list(statistics) == list(legacy)
+    for sensor_id, expected in legacy.items():
+        actual = statistics[sensor_id]
+        for field in ("mean_value", "min_value", "max_value", "last_value"):
+            assert_same(getattr(actual, field), getattr(expected, field))
+        assert actual.last_value_date == expected.last_value_date
+        assert actual.readings_count == expected.readings_count
@@ -0,0 +1,183 @@
+import asyncio
+
+import pytest
+
+from benchmarks.local_stand_ins import InMemoryWaterSystemRepository
+from src.application.services.processing_pipeline import twinning_scheduler as twinning_scheduler_module
+from src.application.services.processing_pipeline.twinning_scheduler import TwinningScheduler
+from src.domain.entities.water_system import WaterSystem, WaterSystemType
+from src.domain.events.water_system_changed_event import WaterSystemChangedEvent, WaterSystemChangeType
+
+# Múltiplo dos intervalos usados: os vencimentos ficam em now + fase * intervalo
+NOW = 1_080_000.0
+
+
+class FakeClock:
+    def __init__(self, now: float):
+        self.now = now
+
+    def time(self) -> float:
+        return self.now
+
+
+class FakePipeline:
+    """Substitui o ProcessingPipelineService: registra os lotes processados e a partição de sistemas deste membro."""
+
+    def __init__(self, water_systems):
+        self.water_system_repository = InMemoryWaterSystemRepository(water_systems)
+        self.owned_ids = None
+        self.processed = []
+        self.release = None
+
+    def owns_water_system(self, water_system_id: str) -> bool:
+        return self.owned_ids is None or water_system_id in self.owned_ids
+
+    async def process_water_systems(self, water_systems):
+        self.processed.append(sorted(ws.id for ws in water_systems))
+        if self.release is not None:
+            await self.release.wait()
+
+
+def water_system(water_system_id: str, twinning_rate_seconds: int = 60) -> WaterSystem:
+    return WaterSystem(id=water_system_id, name=water_system_id, system_type=WaterSystemType.RESERVOIR,
+                       twinning_rate_seconds=twinning_rate_seconds)
+
+
+@pytest.fixture
+def clock(monkeypatch) -> FakeClock:
+    clock = FakeClock(NOW)
+    monkeypatch.setattr(twinning_scheduler_module, "time", clock)
+    return clock
+
+
+def build_scheduler(*water_systems) -> TwinningScheduler:
+    return TwinningScheduler(FakePipeline(list(water_systems)), resync_interval_seconds=300)
+
+
+def build_scheduler_phase(water_system_id: str) -> float:
+    scheduler = build_scheduler(water_system(water_system_id))
+    asyncio.run(scheduler.resync())
+    return scheduler._entries[water_system_id].phase
+
+
+def test_resync_spreads_phases_and_uses_each_twinning_rate(clock):
+    scheduler = build_scheduler(water_system("d"), water_system("a"), water_system("c", 120), water_system("b"))
+    asyncio.run(scheduler.resync(spread_evenly=True))
+
+    entries = scheduler._entries
+    assert {water_system_id: entry.phase for water_system_id, entry in entries.items()} == \
+           {"a": 0.0, "b": 0.25, "c": 0.5, "d": 0.75}
+    for entry in entries.values():
+        # Vencimento no próximo instante alinhado à fase do sistema, dentro de um intervalo
+        assert NOW < entry.due_at <= NOW + entry.twinning_rate_seconds
+        assert entry.due_at % entry.twinning_rate_seconds == pytest.approx(entry.phase * entry.twinning_rate_seconds)
+    assert entries["c"].twinning_rate_seconds == 120
+    assert scheduler._next_resync_at == NOW + 300
+
+    # Sem spread_evenly, a fase é derivada do ID e preservada entre resyncs
+    phase = entries["a"].phase
+    asyncio.run(scheduler.resync())
+    assert entries["a"].phase == phase
+    assert build_scheduler_phase("a") == build_scheduler_phase("a") != build_scheduler_phase("b")
+
+
+def test_pop_due_reschedules_on_the_next_slot(clock):
+    scheduler = build_scheduler(water_system("a"), water_system("b", 90))
+    asyncio.run(scheduler.resync(spread_evenly=True))
+    due_at = {water_system_id: entry.due_at for water_system_id, entry in scheduler._entries.items()}
+    assert due_at == {"a": NOW + 60, "b": NOW + 45}
+
+    assert scheduler._pop_due(NOW + 44) == []
+    assert scheduler._pop_due(NOW + 45) == ["b"]
+    assert scheduler._entries["b"].due_at == NOW + 135
+    assert scheduler._pop_due(NOW + 60) == ["a"]
+    assert scheduler._entries["a"].due_at == NOW + 120
+
+    # Um atraso de vários intervalos agenda o próximo instante futuro, sem disparar os slots perdidos
+    late = NOW + 400
+    assert sorted(scheduler._pop_due(late)) == ["a", "b"]
+    assert scheduler._entries["a"].due_at == NOW + 420
+    assert scheduler._entries["b"].due_at == NOW + 405
+
+
+def test_update_and_delete_invalidate_stale_heap_entries(clock):
+    scheduler = build_scheduler(water_system("a"), water_system("b"), water_system("c"))
+    repository = scheduler.water_system_repository
+    asyncio.run(scheduler.resync(spread_evenly=True))
+    old_due_at = {water_system_id: entry.due_at for water_system_id, entry in scheduler._entries.items()}
+    old_generation = scheduler._entries["a"].generation
+
+    repository.documents["a"]["twinning_rate_seconds"] = 600
+    repository.documents["c"]["status"] = "offline"
+    for water_system_id, change_type in (("a", WaterSystemChangeType.UPDATED), ("b", WaterSystemChangeType.DELETED),
+                                         ("c", WaterSystemChangeType.UPDATED)):
+        scheduler.on_water_system_changed(WaterSystemChangedEvent(water_system_id=water_system_id,
+                                                                  change_type=change_type))
+    asyncio.run(scheduler._apply_pending_changes())
+
+    assert list(scheduler._entries) == ["a"]
+    entry = scheduler._entries["a"]
+    assert (entry.twinning_rate_seconds, entry.phase) == (600, 0.0)
+    assert entry.generation > old_generation
+    # As entradas antigas continuam no heap, mas são descartadas por geração (ou por não existirem mais)
+    assert scheduler._pop_due(max(old_due_at.values())) == []
+    assert scheduler._pop_due(entry.due_at) == ["a"]
+
+
+def test_twinned_changes_do_not_reschedule(clock):
+    scheduler = build_scheduler(water_system("a"))
+    scheduler.on_water_system_changed(WaterSystemChangedEvent(water_system_id="a",
+                                                              change_type=WaterSystemChangeType.TWINNED))
+    assert scheduler._pending_changes == {}
+
+
+def test_system_still_in_flight_skips_its_slot(clock):
+    async def run():
+        scheduler = build_scheduler(water_system("a"))
+        pipeline = scheduler.processing_pipeline_service
+        pipeline.release = asyncio.Event()
+        await scheduler.resync()
+        due_at = scheduler._entries["a"].due_at
+
+        due_ids = scheduler._pop_due(due_at)
+        scheduler._in_flight.update(due_ids)
+        batch = asyncio.get_running_loop().create_task(scheduler._process_batch(due_ids))
+        await asyncio.sleep(0)
+        assert pipeline.processed == [["a"]]
+
+        # O lote anterior ainda não terminou: o slot seguinte é pulado, mas o sistema continua agendado
+        assert scheduler._pop_due(due_at + 60) == []
+        assert scheduler._entries["a"].due_at == due_at + 120
+
+        pipeline.release.set()
+        await batch
+        assert scheduler._in_flight == set()
+        assert scheduler._pop_due(due_at + 120) == ["a"]
+    asyncio.run(run())
+
+
+def test_membership_change_triggers_resync_with_new_partition(clock):
+    expected_phase = build_scheduler_phase("c")
+
+    async def run():
+        scheduler = build_scheduler(water_system("a"), water_system("b"), water_system("c"))
+        pipeline = scheduler.processing_pipeline_service
+        pipeline.owned_ids = {"a", "b"}
+        scheduler.start()
+        for _ in range(3):
+            await asyncio.sleep(0)
+        assert sorted(scheduler._entries) == ["a", "b"]
+        b_entry = scheduler._entries["b"]
+
+        # Antes do próximo resync periódico, o membro passa a ser dono de "c" e cede "a"
+        pipeline.owned_ids = {"b", "c"}
+        scheduler.on_cluster_membership_changed(["member-1"])
+        for _ in range(3):
+            await asyncio.sleep(0)
+        assert sorted(scheduler._entries) == ["b", "c"]
+        assert scheduler._next_resync_at == NOW + 300
+        # O sistema mantido conserva o seu agendamento; o recebido entra com a fase derivada do ID
+        assert scheduler._entries["b"] is b_entry
+        assert scheduler._entries["c"].phase == expected_phase
+        await scheduler.stop()
+    asyncio.run(run())
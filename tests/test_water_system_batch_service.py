@@ -0,0 +1,130 @@
+import json
+
+import pytest
+from bson import ObjectId
+
+from src.application.services.event.water_system_change_publisher import water_system_change_publisher
+from src.application.services.rest.water_system_batch_service import BatchSettings, get_batch_settings
+from src.domain.events.water_system_changed_event import WaterSystemChangeType
+
+
+@pytest.fixture
+def published_changes():
+    events = []
+    water_system_change_publisher.subscribe(events.append)
+    yield events
+    water_system_change_publisher.unsubscribe(events.append)
+
+
+def ndjson(*items) -> str:
+    return "\n".join(item if isinstance(item, str) else json.dumps(item) for item in items)
+
+
+def parse_results(response) -> list:
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def override_batch_settings(client, **limits):
+    settings = BatchSettings()
+    for limit, value in limits.items():
+        setattr(settings, limit, value)
+    client.app.dependency_overrides[get_batch_settings] = lambda: settings
+
+
+def test_batch_create_reports_each_line(client, water_system_repository, published_changes):
+    # Lotes de 2 linhas: os resultados de cada lote são transmitidos na ordem das linhas
+    override_batch_settings(client, chunk_size=2)
+    body = ndjson(
+        {"name": "Reservatório", "system_type": "reservoir"},
+        "not json",
+        {"name": "Sem tipo"},
+        {"name": "Estação", "system_type": "treatment", "twinning_rate_seconds": 120},
+    )
+    response = client.post("/water-systems/batch", content=body)
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    results = parse_results(response)
+    assert [(result["index"], result["status"]) for result in results] == [(0, 201), (1, 422), (2, 422), (3, 201)]
+    assert results[2]["error"][0]["loc"] == ["system_type"]
+
+    created_ids = [results[0]["id"], results[3]["id"]]
+    assert sorted(water_system_repository.documents) == sorted(created_ids)
+    assert water_system_repository.documents[results[3]["id"]]["twinning_rate_seconds"] == 120
+    assert [(event.water_system_id, event.change_type) for event in published_changes] == \
+           [(water_system_id, WaterSystemChangeType.CREATED) for water_system_id in created_ids]
+
+
+def test_batch_get_reports_invalid_missing_and_found_ids(client, water_system_repository):
+    water_system_id = water_system_repository.add(name="Reservatório", system_type="reservoir")
+    missing_id = str(ObjectId())
+    body = ndjson(json.dumps(water_system_id), {"id": missing_id}, "not-an-id", json.dumps("abc"))
+
+    response = client.post("/water-systems/batch/get", content=body)
+    assert response.status_code == 200
+    found, missing, invalid, invalid_id = parse_results(response)
+    assert found["status"] == 200
+    assert found["id"] == found["water_system"]["id"] == water_system_id
+    assert found["water_system"]["name"] == "Reservatório"
+    assert (missing["status"], missing["id"]) == (404, missing_id)
+    assert (invalid["index"], invalid["status"]) == (2, 400)
+    assert (invalid_id["index"], invalid_id["status"]) == (3, 400)
+
+
+def test_batch_get_rejects_too_many_ids(client):
+    override_batch_settings(client, max_ids=2)
+    body = ndjson(*(json.dumps(str(ObjectId())) for _ in range(3)))
+    assert client.post("/water-systems/batch/get", content=body).status_code == 413
+
+
+def test_batch_delete_removes_existing_water_systems(client, water_system_repository, published_changes):
+    override_batch_settings(client, chunk_size=2)
+    kept_id = water_system_repository.add(name="Mantido", system_type="reservoir")
+    deleted_ids = [water_system_repository.add(name=f"Removido {i}", system_type="reservoir") for i in range(2)]
+    missing_id = str(ObjectId())
+    body = ndjson(json.dumps(deleted_ids[0]), {"id": missing_id}, "invalid", {"id": deleted_ids[1]})
+
+    response = client.post("/water-systems/batch/delete", content=body)
+    assert response.status_code == 200
+    assert [(result["index"], result["status"]) for result in parse_results(response)] == \
+           [(0, 200), (1, 404), (2, 400), (3, 200)]
+    assert list(water_system_repository.documents) == [kept_id]
+    assert [(event.water_system_id, event.change_type) for event in published_changes] == \
+           [(water_system_id, WaterSystemChangeType.DELETED) for water_system_id in deleted_ids]
+
+
+def test_batch_oversized_line_is_rejected_without_failing_the_batch(client, water_system_repository):
+    override_batch_settings(client, max_line_bytes=100)
+    body = ndjson(
+        {"name": "x" * 200, "system_type": "reservoir"},
+        {"name": "Reservatório", "system_type": "reservoir"},
+    )
+    response = client.post("/water-systems/batch", content=body)
+    assert response.status_code == 200
+    oversized, created = parse_results(response)
+    assert (oversized["index"], oversized["status"], oversized["error"]) == (0, 413, "Line too large")
+    assert created["status"] == 201
+    assert list(water_system_repository.documents) == [created["id"]]
+
+
+def test_batch_update_rejects_null_for_required_fields_and_list_keeps_working(client, water_system_repository):
+    water_system_id = water_system_repository.add(name="Reservatório", system_type="reservoir", status="online")
+
+    body = ndjson(
+        {"id": water_system_id, "system_type": None, "sensors": None,
+         "twinning_rate_seconds": None, "name": None, "status": None},
+        {"id": water_system_id, "location": None, "name": "Reservatório 2"},
+    )
+    response = client.patch("/water-systems/batch", content=body)
+    assert response.status_code == 200
+    results = parse_results(response)
+    assert results[0]["status"] == 422
+    assert {error["loc"][0] for error in results[0]["error"]} == \
+           {"system_type", "sensors", "twinning_rate_seconds", "name", "status"}
+    assert results[1]["status"] == 200
+
+    response = client.get("/water-systems")
+    assert response.status_code == 200
+    [water_system] = response.json()
+    assert water_system["name"] == "Reservatório 2"
+    assert water_system["system_type"] == "reservoir"
+    assert water_system["location"] is None
@@ -0,0 +1,111 @@
+import pytest
+
+from src.application.services.rest import water_system_cache as water_system_cache_module
+from src.application.services.rest.rest_service import get_water_system_cache
+from src.application.services.rest.water_system_cache import WaterSystemCache
+from src.domain.entities.water_system import WaterSystem, WaterSystemType
+from src.domain.events.water_system_changed_event import WaterSystemChangedEvent, WaterSystemChangeType
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch) -> FakeClock:
+    clock = FakeClock()
+    monkeypatch.setattr(water_system_cache_module, "time", clock)
+    return clock
+
+
+def water_system(water_system_id: str, name: str = "Reservatório") -> WaterSystem:
+    return WaterSystem(id=water_system_id, name=name, system_type=WaterSystemType.RESERVOIR)
+
+
+def test_lru_evicts_least_recently_used_entry(clock):
+    cache = WaterSystemCache(max_entries=2, ttl_seconds=60)
+    cache.put(water_system("a"), cache.version)
+    cache.put(water_system("b"), cache.version)
+    assert cache.get("a") is not None
+
+    cache.put(water_system("c"), cache.version)
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert (cache.hits, cache.misses) == (3, 1)
+
+
+def test_entries_expire_after_ttl(clock):
+    cache = WaterSystemCache(max_entries=10, ttl_seconds=60)
+    cache.put(water_system("a"), cache.version)
+    cache.put_list([water_system("a")], cache.version)
+
+    clock.now += 60
+    assert cache.get("a") is not None and cache.get_list() is not None
+    clock.now += 0.001
+    assert cache.get("a") is None and cache.get_list() is None
+    assert (cache.hits, cache.misses) == (2, 2)
+
+
+def test_put_after_invalidation_is_not_stored(clock):
+    cache = WaterSystemCache(max_entries=10, ttl_seconds=60)
+    # Leitura iniciada antes de uma alteração concorrente: o resultado é servido, mas não fica em cache
+    version = cache.version
+    cache.on_water_system_changed(WaterSystemChangedEvent(water_system_id="a",
+                                                          change_type=WaterSystemChangeType.UPDATED))
+    stale_entry = cache.put(water_system("a", "Antigo"), version)
+    stale_list = cache.put_list([water_system("a", "Antigo")], version)
+    assert b"Antigo" in stale_entry.body and b"Antigo" in stale_list.body
+    assert cache.get("a") is None and cache.get_list() is None
+
+    cache.put(water_system("a", "Novo"), cache.version)
+    assert b"Novo" in cache.get("a").body
+    cache.clear()
+    assert cache.get("a") is None
+
+
+def test_etag_changes_with_content(clock):
+    cache = WaterSystemCache(max_entries=10, ttl_seconds=60)
+    first = cache.put(water_system("a"), cache.version)
+    assert cache.put(water_system("a"), cache.version).etag == first.etag
+    assert cache.put(water_system("a", "Outro"), cache.version).etag != first.etag
+
+
+def test_get_endpoint_serves_cache_and_honours_if_none_match(build_client, water_system_repository):
+    water_system_id = water_system_repository.add(name="Reservatório", system_type="reservoir")
+    cache = WaterSystemCache(max_entries=10, ttl_seconds=60)
+    client = build_client(water_system_repository)
+    client.app.dependency_overrides[get_water_system_cache] = lambda: cache
+
+    response = client.get(f"/water-systems/{water_system_id}")
+    assert response.status_code == 200
+    assert response.json()["name"] == "Reservatório"
+    etag = response.headers["etag"]
+
+    # Servido do cache: a alteração direta no repositório não é vista até a invalidação
+    water_system_repository.documents[water_system_id]["name"] = "Alterado"
+    for if_none_match in (etag, f"W/{etag}", f'"other", {etag}', "*"):
+        response = client.get(f"/water-systems/{water_system_id}", headers={"If-None-Match": if_none_match})
+        assert (response.status_code, response.content, response.headers["etag"]) == (304, b"", etag)
+    response = client.get(f"/water-systems/{water_system_id}", headers={"If-None-Match": '"other"'})
+    assert (response.status_code, response.json()["name"]) == (200, "Reservatório")
+
+    cache.invalidate(water_system_id)
+    response = client.get(f"/water-systems/{water_system_id}", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()["name"] == "Alterado"
+    assert response.headers["etag"] != etag
+
+
+def test_list_endpoint_honours_if_none_match(build_client, water_system_repository):
+    water_system_repository.add(name="Reservatório", system_type="reservoir")
+    cache = WaterSystemCache(max_entries=10, ttl_seconds=60)
+    client = build_client(water_system_repository)
+    client.app.dependency_overrides[get_water_system_cache] = lambda: cache
+
+    response = client.get("/water-systems")
+    assert response.status_code == 200
+    assert client.get("/water-systems", headers={"If-None-Match": response.headers["etag"]}).status_code == 304
@@ -0,0 +1,16 @@
+from src.application.services.rest.rest_service import build_projection
+
+
+def test_projection_never_excludes_id():
+    assert build_projection(None, "_id,sensors") == {"sensors": 0}
+    assert build_projection("name,id,_id", None) == {"name": 1}
+
+
+def test_list_rejects_invalid_cursor_and_keeps_id_when_excluded(client, water_system_repository):
+    water_system_id = water_system_repository.add(name="Reservatório")
+
+    assert client.get("/water-systems", params={"after": "not-an-object-id"}).status_code == 400
+
+    response = client.get("/water-systems", params={"exclude": "_id"})
+    assert response.status_code == 200
+    assert response.json() == [{"name": "Reservatório", "id": water_system_id}]